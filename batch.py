@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Ollama Chat - Batch inference client
+Sends a JSONL file of prompts to /api/batch and appends the results as they complete
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Set, TextIO, Tuple
+
+import requests
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Ids (as JSON) of records that already have a successful result."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        # Una linea cortada por un crash no cuenta como terminada
+        return {line.rstrip("\n") for line in f if line.endswith("\n")}
+
+
+def pending_records(source: TextIO, done: Set[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Records not in the checkpoint; records without ``id`` get their line number."""
+    for number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            print(f"Linea {number} ignorada: {e}", file=sys.stderr)
+            continue
+        if isinstance(record, dict):
+            record.setdefault("id", number)
+        key = json.dumps(record.get("id") if isinstance(record, dict) else number)
+        if key not in done:
+            yield key, record
+
+
+def run_window(session: requests.Session, url: str, params: Dict[str, str],
+               window: List[Dict[str, Any]], output: TextIO, checkpoint: TextIO) -> Tuple[int, int]:
+    """Send one window of records and write its results; returns (ok, failed)."""
+    body = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in window).encode()
+    ok = failed = 0
+    with session.post(f"{url}/api/batch", params=params, data=body, stream=True,
+                      headers={"Content-Type": "application/x-ndjson"}, timeout=(10, None)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            result = json.loads(line)
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            if result.get("success"):
+                # Primero el resultado, despues el checkpoint: tras un crash a lo sumo se repite uno
+                checkpoint.write(json.dumps(result.get("id")) + "\n")
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+                ok += 1
+            else:
+                failed += 1
+    return ok, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ollama Chat - inferencia por lotes")
+    parser.add_argument("input", help="JSONL con un prompt por linea ('-' para stdin)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL de resultados (se agrega al final)")
+    parser.add_argument("--checkpoint", help="Ids terminados (por defecto <output>.checkpoint)")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--model", help="Modelo para las lineas que no lo indican")
+    parser.add_argument("--service-type", default="general")
+    parser.add_argument("--window", type=int, default=256, help="Prompts por peticion a /api/batch")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    done = load_checkpoint(checkpoint_path)
+    params = {"service_type": args.service_type}
+    if args.model:
+        params["model"] = args.model
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    totals = [0, 0]
+    with source, open(args.output, "a", encoding="utf-8") as output, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, requests.Session() as session:
+        records = (record for _, record in pending_records(source, done))
+        while True:
+            window = list(itertools.islice(records, args.window))
+            if not window:
+                break
+            ok, failed = run_window(session, args.url.rstrip("/"), params, window, output, checkpoint)
+            totals[0] += ok
+            totals[1] += failed
+            print(f"{totals[0]} ok, {totals[1]} con error", file=sys.stderr)
+
+    print(f"Listo: {totals[0]} ok, {totals[1]} con error, {len(done)} ya hechos (checkpoint)", file=sys.stderr)
+    sys.exit(1 if totals[1] else 0)
@@ -0,0 +1 @@
+"""Load-test benchmarks with a fake Ollama backend."""
@@ -0,0 +1,204 @@
+"""Local stand-in for the Docker Engine API used by ``DockerCommandsService``."""
+
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# /v1.45/containers/json -> /containers/json
+_VERSION_PREFIX_RE = re.compile(r"^/v\d+\.\d+")
+_ACTION_RE = re.compile(r"^/containers/(?P<container>[^/]+)/(?P<action>start|stop|restart)$")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeDockerEngine:
+    """Fake Engine API: /_ping, /version, /containers/json, start/stop/restart and /events.
+
+    Containers only have a name and a state. Start and stop take
+    ``action_delay`` seconds and publish the same container events as
+    Docker (``start``; ``kill``, ``die``, ``stop``; ``restart``) to every
+    ``/events`` subscriber.
+    """
+
+    def __init__(self, port: int = 0, containers: Optional[List[str]] = None,
+                 action_delay: float = 0.5, host: str = "127.0.0.1"):
+        self.action_delay = action_delay
+        self._lock = threading.Lock()
+        self._containers: Dict[str, Dict[str, Any]] = {}
+        for name in containers or ["ollama-service"]:
+            self._containers[name] = {"Id": uuid.uuid4().hex * 2, "Names": [f"/{name}"],
+                                      "Image": "ollama/ollama:latest", "State": "exited"}
+        self._subscribers: List[queue.Queue] = []
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def start(self) -> "FakeDockerEngine":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-docker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+        self._server.shutdown()
+        self._server.server_close()
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            return self._containers[name]["State"]
+
+    def _find(self, ref: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for name, container in self._containers.items():
+                if ref == name or container["Id"].startswith(ref):
+                    return container
+        return None
+
+    def _publish(self, container: Dict[str, Any], action: str) -> None:
+        name = container["Names"][0].lstrip("/")
+        event = {
+            "Type": "container", "Action": action, "status": action, "id": container["Id"],
+            "Actor": {"ID": container["Id"], "Attributes": {"name": name, "image": container["Image"]}},
+            "time": int(time.time())
+        }
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(event)
+
+    def _act(self, container: Dict[str, Any], action: str) -> int:
+        """Apply an action; returns the HTTP status Docker would reply."""
+        running = container["State"] == "running"
+        if action == "start" and running or action == "stop" and not running:
+            return 304
+        time.sleep(self.action_delay)
+        if action in ("stop", "restart") and running:
+            with self._lock:
+                container["State"] = "exited"
+            for step in ("kill", "die", "stop"):
+                self._publish(container, step)
+        if action in ("start", "restart"):
+            with self._lock:
+                container["State"] = "running"
+            self._publish(container, "start")
+            if action == "restart":
+                self._publish(container, "restart")
+        return 204
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, data: Any = None) -> None:
+                body = b"" if data is None else (data if isinstance(data, bytes) else json.dumps(data).encode())
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _route(self):
+                parsed = urlparse(self.path)
+                return _VERSION_PREFIX_RE.sub("", parsed.path), parse_qs(parsed.query)
+
+            def do_HEAD(self):
+                self._reply(200)
+
+            def do_GET(self):
+                path, query = self._route()
+                if path == "/_ping":
+                    self._reply(200, b"OK")
+                elif path == "/version":
+                    self._reply(200, {"Version": "fake", "ApiVersion": "1.45", "MinAPIVersion": "1.24"})
+                elif path == "/containers/json":
+                    filters = json.loads(query.get("filters", ["{}"])[0])
+                    names = filters.get("name", [])
+                    with fake._lock:
+                        listed = [
+                            dict(c) for c in fake._containers.values()
+                            if not names or any(n in c["Names"][0] for n in names)
+                        ]
+                    if query.get("all", ["0"])[0] in ("0", "false"):
+                        listed = [c for c in listed if c["State"] == "running"]
+                    self._reply(200, listed)
+                elif path == "/events":
+                    self._events()
+                else:
+                    self._reply(404, {"message": "page not found"})
+
+            def do_POST(self):
+                path, _ = self._route()
+                length = int(self.headers.get("Content-Length", 0))
+                if length:
+                    self.rfile.read(length)
+                match = _ACTION_RE.match(path)
+                container = fake._find(match.group("container")) if match else None
+                if container is None:
+                    self._reply(404, {"message": "No such container"})
+                    return
+                self._reply(fake._act(container, match.group("action")))
+
+            def _events(self):
+                subscriber: queue.Queue = queue.Queue()
+                with fake._lock:
+                    fake._subscribers.append(subscriber)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self.wfile.flush()
+                try:
+                    while True:
+                        event = subscriber.get()
+                        if event is None:
+                            break
+                        line = (json.dumps(event) + "\n").encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except OSError:
+                    pass
+                finally:
+                    with fake._lock:
+                        fake._subscribers.remove(subscriber)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fake Docker Engine API")
+    parser.add_argument("--port", type=int, default=2375)
+    parser.add_argument("--containers", default="ollama-service,ollama-code-processor,ollama-text-processor")
+    parser.add_argument("--action-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = FakeDockerEngine(args.port, args.containers.split(","), args.action_delay, host="0.0.0.0")
+    print(f"Fake Docker Engine escuchando en {server.url} (docker_base_url)")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
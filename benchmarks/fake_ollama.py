@@ -0,0 +1,195 @@
+"""Local stand-in for the Ollama HTTP API used by the load tests."""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+
+class FakeOllamaConfig:
+    """Behaviour of one fake backend."""
+
+    def __init__(self, token_rate: float = 50.0, tokens: int = 64, load_delay: float = 0.0,
+                 max_parallel: int = 2, failure_rate: float = 0.0,
+                 models: Optional[List[str]] = None):
+        self.token_rate = token_rate        # tokens/s generados
+        self.tokens = tokens                # tokens por respuesta (acotado por num_predict)
+        self.load_delay = load_delay        # segundos de carga la primera vez que se usa un modelo
+        self.max_parallel = max_parallel    # como OLLAMA_NUM_PARALLEL: el resto espera
+        self.failure_rate = failure_rate    # probabilidad de responder 500
+        self.models = models or ["bench-model"]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Backlog de listen amplio: con muchos clientes a la vez el de 5 por defecto resetea conexiones
+    request_queue_size = 1024
+
+
+class FakeOllama:
+    """Fake Ollama server: /api/tags, /api/ps, /api/generate, /api/embeddings, /api/pull.
+
+    Generations hold one of ``max_parallel`` slots, pay ``load_delay`` the
+    first time a model is used, produce tokens at ``token_rate`` and report
+    real elapsed times in the Ollama timing fields.
+    """
+
+    def __init__(self, port: int = 0, config: Optional[FakeOllamaConfig] = None, host: str = "127.0.0.1"):
+        self.config = config or FakeOllamaConfig()
+        self._slots = threading.Semaphore(self.config.max_parallel)
+        self._loaded = set()
+        self._load_lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _load(self, model: str) -> int:
+        """Simulate loading a model; returns load_duration in ns."""
+        with self._load_lock:
+            if model in self._loaded:
+                return 0
+            start = time.perf_counter_ns()
+            time.sleep(self.config.load_delay)
+            self._loaded.add(model)
+            return time.perf_counter_ns() - start
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Sin Nagle: cabeceras y cuerpo van en escrituras separadas
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, data: Dict[str, Any], status: int = 200) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunk(self, data: Dict[str, Any]) -> None:
+                line = (json.dumps(data) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._json({"models": [{"name": m} for m in fake.config.models]})
+                elif self.path == "/api/ps":
+                    self._json({"models": [{"name": m} for m in sorted(fake._loaded)]})
+                elif self.path == "/api/version":
+                    self._json({"version": "fake"})
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/generate":
+                    self._generate(body)
+                elif self.path == "/api/embeddings":
+                    random.seed(body.get("prompt", ""))
+                    self._json({"embedding": [random.random() for _ in range(64)]})
+                elif self.path == "/api/pull":
+                    self._json({"status": "success"})
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def _generate(self, body: Dict[str, Any]) -> None:
+                try:
+                    self._generate_reply(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente cancelo el stream (p.ej. la copia perdedora de un hedge)
+                    self.close_connection = True
+
+            def _generate_reply(self, body: Dict[str, Any]) -> None:
+                config = fake.config
+                if config.failure_rate and random.random() < config.failure_rate:
+                    self._json({"error": "injected failure"}, 500)
+                    return
+                model = body.get("model", "")
+                stream = body.get("stream", True)
+                num_predict = body.get("options", {}).get("num_predict", config.tokens)
+                tokens = min(config.tokens, num_predict) if num_predict > 0 else config.tokens
+                prompt = body.get("prompt", "")
+
+                with fake._slots:
+                    start = time.perf_counter_ns()
+                    load_duration = fake._load(model)
+                    if not prompt:
+                        # Peticion de warm-up: solo carga el modelo
+                        self._json({"model": model, "done": True, "load_duration": load_duration})
+                        return
+                    eval_start = time.perf_counter_ns()
+                    if stream:
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/x-ndjson")
+                        self.send_header("Transfer-Encoding", "chunked")
+                        self.end_headers()
+                        for i in range(tokens):
+                            time.sleep(1 / config.token_rate)
+                            self._chunk({"model": model, "response": f"t{i} ", "done": False})
+                    else:
+                        time.sleep(tokens / config.token_rate)
+                    final = {
+                        "model": model,
+                        "done": True,
+                        "context": [1, 2, 3],
+                        "load_duration": load_duration,
+                        "prompt_eval_count": max(1, len(prompt) // 4),
+                        "prompt_eval_duration": 0,
+                        "eval_count": tokens,
+                        "eval_duration": time.perf_counter_ns() - eval_start,
+                        "total_duration": time.perf_counter_ns() - start
+                    }
+                    if stream:
+                        self._chunk(dict(final, response=""))
+                        self.wfile.write(b"0\r\n\r\n")
+                    else:
+                        self._json(dict(final, response=" ".join(f"t{i}" for i in range(tokens))))
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fake Ollama backend")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--load-delay", type=float, default=0.0)
+    parser.add_argument("--max-parallel", type=int, default=2)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeOllama(args.port, FakeOllamaConfig(
+        args.token_rate, args.tokens, args.load_delay, args.max_parallel, args.failure_rate
+    ), host="0.0.0.0")
+    print(f"Fake Ollama escuchando en {server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
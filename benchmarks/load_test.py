@@ -0,0 +1,264 @@
+"""Load test of the Flask app against fake Ollama backends.
+
+Usage:
+    python -m benchmarks.load_test --levels 1,4,16 --duration 10
+    python -m benchmarks.load_test --compare benchmarks/baselines/baseline.json
+    python -m benchmarks.load_test --server async --endpoints chat --levels 64,256,1024
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from .fake_ollama import FakeOllama, FakeOllamaConfig
+
+ENDPOINTS = ("chat", "status", "history", "technical-stats")
+BENCH_MODEL = "bench-model"
+
+
+def configure_settings(backend_urls: Dict[str, str], data_dir: str, max_parallel: int) -> None:
+    """Point the app at the fake backends (before ``create_app``)."""
+    from src.config.settings import Settings
+
+    settings = Settings()
+    settings._services = dict(backend_urls)
+    settings._backend_pools = {
+        service_type: [{"url": url, "weight": 1, "gpu": service_type == "general"}]
+        for service_type, url in backend_urls.items()
+    }
+    settings._default_num_parallel = max_parallel
+    settings._history_db_path = os.path.join(data_dir, "chat_history.db")
+    settings._warmup_models = {}
+    settings._cascade_models = {}
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """No access log: printing every request would skew the numbers."""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class _AsyncServer:
+    """uvicorn running the ASGI app in a background thread."""
+
+    def __init__(self, port: int):
+        import uvicorn
+        from src.web.asgi import create_asgi_app
+
+        config = uvicorn.Config(create_asgi_app(), host="127.0.0.1", port=port,
+                                log_level="warning", access_log=False, backlog=4096)
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, name="bench-app", daemon=True).start()
+        while not self._server.started:
+            time.sleep(0.01)
+        self.server_port = self._server.servers[0].sockets[0].getsockname()[1]
+
+    def shutdown(self) -> None:
+        self._server.should_exit = True
+
+
+def start_app(port: int = 0, server: str = "flask"):
+    """Run the app on a threaded WSGI server or on uvicorn; returns (server, base_url)."""
+    if server == "async":
+        app_server = _AsyncServer(port)
+    else:
+        from src.web.app import create_app
+
+        app_server = make_server("127.0.0.1", port, create_app(), threaded=True, request_handler=_QuietHandler)
+        threading.Thread(target=app_server.serve_forever, name="bench-app", daemon=True).start()
+    return app_server, f"http://127.0.0.1:{app_server.server_port}"
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def _call(session: requests.Session, base_url: str, endpoint: str, worker: int, i: int):
+    """One request; returns (ok, backend_seconds, queue_seconds)."""
+    if endpoint == "chat":
+        response = session.post(f"{base_url}/api/chat", json={
+            "message": f"bench prompt {worker}-{i}",
+            "model": BENCH_MODEL,
+            "session_id": f"bench-{worker}"
+        }, timeout=300)
+        data = response.json()
+        metrics = data.get("metrics", {})
+        return (response.status_code == 200 and data.get("success", False),
+                metrics.get("total_duration", 0) / 1e9, metrics.get("queue_wait", 0) / 1e9)
+    path = {
+        "status": "/api/status",
+        "history": f"/api/history?session_id=bench-{worker}&limit=50",
+        "technical-stats": "/api/technical-stats"
+    }[endpoint]
+    response = session.get(f"{base_url}{path}", timeout=60)
+    return response.status_code == 200, 0.0, 0.0
+
+
+def run_step(base_url: str, endpoint: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    """Drive one endpoint with ``concurrency`` closed-loop workers for ``duration`` seconds."""
+    samples: List[tuple] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def _worker(worker: int) -> None:
+        session = requests.Session()
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok, backend, queue = _call(session, base_url, endpoint, worker, i)
+            except Exception:
+                ok, backend, queue = False, 0.0, 0.0
+            latency = time.perf_counter() - start
+            with lock:
+                if ok:
+                    samples.append((latency, backend, queue))
+                else:
+                    errors[0] += 1
+            i += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=_worker, args=(w,)) for w in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(s[0] for s in samples)
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(samples) + errors[0],
+        "errors": errors[0],
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0
+    }
+    if endpoint == "chat" and samples:
+        # Overhead de la app = latencia del cliente - generacion en el backend - espera en cola
+        backend = sorted(s[1] for s in samples)
+        queue = sorted(s[2] for s in samples)
+        overhead = sorted(s[0] - s[1] - s[2] for s in samples)
+        result.update({
+            "backend_p50_ms": round(percentile(backend, 50) * 1000, 2),
+            "queue_wait_p50_ms": round(percentile(queue, 50) * 1000, 2),
+            "queue_wait_p95_ms": round(percentile(queue, 95) * 1000, 2),
+            "overhead_p50_ms": round(percentile(overhead, 50) * 1000, 2),
+            "overhead_p95_ms": round(percentile(overhead, 95) * 1000, 2)
+        })
+    return result
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of p95 latency or throughput beyond ``tolerance``."""
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = previous.get((result["endpoint"], result["concurrency"]))
+        if base is None:
+            continue
+        label = f"{result['endpoint']} c={result['concurrency']}"
+        if base["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+        if base["throughput_rps"] and result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {base['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f"{'endpoint':<16}{'conc':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}{'overhead p50':>14}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        overhead = f"{r['overhead_p50_ms']:.1f}" if "overhead_p50_ms" in r else "-"
+        print(f"{r['endpoint']:<16}{r['concurrency']:>5}{r['throughput_rps']:>9.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>6}{overhead:>14}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la app contra backends Ollama falsos")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Niveles de concurrencia separados por coma")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por nivel y endpoint")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--token-rate", type=float, default=200.0)
+    parser.add_argument("--tokens", type=int, default=32)
+    parser.add_argument("--load-delay", type=float, default=0.0)
+    parser.add_argument("--max-parallel", type=int, default=2)
+    parser.add_argument("--server", choices=("flask", "async"), default="flask",
+                        help="Servidor de la app: Flask con hilos o uvicorn (main.py --async)")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="benchmarks/baselines/latest.json")
+    parser.add_argument("--compare", help="Baseline JSON contra el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Regresion tolerada (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.levels.split(",")]
+    endpoints = [e for e in args.endpoints.split(",") if e]
+    config = FakeOllamaConfig(args.token_rate, args.tokens, args.load_delay, args.max_parallel,
+                              args.failure_rate, models=[BENCH_MODEL])
+
+    from src.config.settings import Settings
+    fakes = {service_type: FakeOllama(0, config).start() for service_type in Settings().services}
+    data_dir = tempfile.mkdtemp(prefix="ollama-bench-")
+    configure_settings({s: fake.url for s, fake in fakes.items()}, data_dir, args.max_parallel)
+    server, base_url = start_app(server=args.server)
+
+    results = []
+    try:
+        for endpoint in endpoints:
+            for level in levels:
+                result = run_step(base_url, endpoint, level, args.duration)
+                results.append(result)
+                print(f"{endpoint} c={level}: {result['throughput_rps']} req/s, p95 {result['p95_ms']} ms",
+                      file=sys.stderr)
+    finally:
+        server.shutdown()
+        for fake in fakes.values():
+            fake.stop()
+
+    print_table(results)
+    report = {
+        "created": time.time(),
+        "platform": {"python": platform.python_version(), "machine": platform.machine(),
+                     "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regresiones:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("Sin regresiones respecto al baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
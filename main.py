@@ -4,8 +4,25 @@ Ollama Chat - Minimal Web Interface
 Main entry point for the application
 """
 
+import argparse
+
 from src.web.app import create_app
 
 if __name__ == "__main__":
-    app = create_app()
-    app.run(host="0.0.0.0", port=5000, debug=True) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ollama Chat")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Servir con uvicorn (ASGI): el chat no ocupa un hilo por generacion")
+    args = parser.parse_args()
+
+    if args.async_mode:
+        import uvicorn
+        from src.web.asgi import create_asgi_app
+
+        uvicorn.run(create_asgi_app(), host=args.host, port=args.port, backlog=4096)
+    else:
+        app = create_app()
+        # Sin reloader: create_app correria dos veces y con el las tareas de fondo
+        # (warm-up, health checks, seguimiento de logs y eventos de Docker)
+        app.run(host=args.host, port=args.port, debug=True, use_reloader=False)
@@ -18,6 +18,96 @@ class Settings:
                 "code": "http://localhost:11435", 
                 "text": "http://localhost:11436"
             }
+            # Pools de backends por tipo de servicio: agregar mas GPUs aqui
+            # p.ej. "general": [{"url": "http://localhost:11434", "weight": 4},
+            #                   {"url": "http://localhost:11435", "weight": 1}]
+            # "gpu": solo el servicio general usa GPU (OLLAMA_GPU_LAYERS=0 en code/text)
+            self._backend_pools = {
+                service_type: [{"url": url, "weight": 1, "gpu": service_type == "general"}]
+                for service_type, url in self._services.items()
+            }
+            self._load_balancing_strategy = "least_outstanding"  # o "ewma"
+            self._default_num_parallel = 2   # Igual a OLLAMA_NUM_PARALLEL del docker-compose
+            self._max_queue_depth = 8        # Peticiones en espera por backend antes de responder 429
+            self._queue_timeout = 60         # Maximo tiempo en cola (segundos)
+            self._conversation_max_sessions = 1000  # Sesiones con context en memoria
+            self._conversation_idle_timeout = 3600  # Olvidar sesiones inactivas (segundos)
+            self._history_max_messages = 200       # Ring buffer de mensajes por sesion
+            self._history_max_sessions = 1000      # Sesiones de historial en memoria
+            self._history_idle_timeout = 6 * 3600  # Descartar historial de sesiones inactivas
+            self._history_backend = "sqlite"       # "sqlite" (persistente) o "memory"
+            self._history_db_path = "data/chat_history.db"
+            self._history_batch_size = 100         # Mensajes por transaccion de escritura
+            self._history_flush_interval = 0.5     # Segundos entre escrituras en segundo plano
+            self._response_cache_enabled = True    # Cache exacto (solo temperature 0 o seed fijo)
+            self._response_cache_max_bytes = 64 * 1024 * 1024
+            self._response_cache_ttl = 3600
+            self._response_cache_spill_dir = None  # p.ej. "data/response_cache" para volcar a disco
+            self._semantic_cache_enabled = False   # Requiere numpy y un modelo de embeddings
+            self._semantic_cache_embedding_model = "nomic-embed-text"
+            self._semantic_cache_threshold = 0.95  # Similitud coseno minima para reutilizar respuesta
+            self._semantic_cache_max_entries = 100000
+            self._single_flight_enabled = True     # Unir peticiones identicas en curso a una sola generacion
+            self._cascade_enabled = False          # Responder primero con un modelo rapido (solo /api/chat sin streaming)
+            # Modelo pedido -> modelo rapido; deben compartir tokenizer (el context pasa de uno a otro)
+            self._cascade_models = {"llama3.2:3b": "llama3.2:1b"}
+            self._cascade_min_chars = 20           # Respuestas mas cortas se escalan al modelo pedido
+            self._default_keep_alive = "30m"     # Tiempo que Ollama mantiene el modelo en memoria
+            self._model_keep_alive = {}          # Por modelo, p.ej. {"llama3.2:1b": "2h"}
+            self._warmup_models = {}             # Precarga al iniciar, p.ej. {"general": ["llama3.2:3b"]}
+            self._warmup_interval = 60           # Segundos entre chequeos de modelos calientes
+            self._hot_model_window = 900         # Ventana para considerar un modelo "caliente"
+            self._hot_model_min_requests = 3     # Peticiones minimas en la ventana
+            self._max_loaded_models = 2          # Igual a OLLAMA_MAX_LOADED_MODELS
+            self._placement_refresh_interval = 5             # Segundos entre consultas a /api/ps
+            self._placement_expected_tokens = 256            # Tokens esperados por respuesta
+            self._placement_prior_tps = {"gpu": 40.0, "cpu": 8.0}          # Sin mediciones aun
+            self._placement_prior_load_seconds = {"gpu": 5.0, "cpu": 15.0}
+            self._autotune_profiles_path = "data/option_profiles.json"  # Mejores opciones por modelo y backend
+            self._autotune_grid = {
+                "num_batch": [64, 128, 256, 512],
+                "num_ctx": [2048, 4096],
+                "num_thread": None               # None: Ollama decide en GPU, mitad/todos los cores en CPU
+            }
+            self._autotune_num_predict = 64      # Tokens generados por prompt de prueba
+            self._max_pulls_per_backend = 1      # Descargas simultaneas por backend (comparten disco y red)
+            self._download_history_size = 50    # Descargas terminadas que se siguen mostrando
+            self._stats_container = "ollama-service"  # Contenedor cuyos logs alimentan las stats tecnicas
+            self._log_backfill_lines = 2000      # Lineas previas leidas al empezar a seguir el log
+            self._log_event_buffer_size = 1000   # Eventos parseados que se conservan
+            self._system_sample_interval = 2.0   # Segundos entre muestras de CPU/memoria/disco
+            self._system_sample_windows = {"1m": 60, "5m": 300, "15m": 900}  # Ventanas min/avg/p95
+            self._token_budget_enabled = True    # Elegir num_ctx por peticion segun los tokens estimados
+            self._num_ctx_buckets = [1024, 2048, 4096, 8192]  # Pocos tamaños: cada cambio recarga el modelo
+            self._max_num_ctx = 8192             # Contexto maximo por defecto
+            self._model_max_ctx = {}             # Contexto maximo por modelo (sobrescribe max_num_ctx)
+            self._num_ctx_shrink_after = 300     # Segundos sin necesitar el bucket grande antes de reducirlo
+            self._async_backend_connections = 200  # Conexiones HTTP a Ollama del cliente async
+            self._async_wsgi_workers = 32        # Hilos para las rutas Flask servidas en modo async
+            self._docker_base_url = None         # None = DOCKER_HOST o el socket local
+            self._docker_services = {            # Servicio de docker-compose -> container_name
+                "ollama": "ollama-service",
+                "ollama-code": "ollama-code-processor",
+                "ollama-text": "ollama-text-processor"
+            }
+            self._docker_default_services = ["ollama"]  # Servicios sin profile: se crean si faltan
+            self._docker_api_timeout = 10        # Segundos por llamada a la API de Docker
+            self._docker_stop_timeout = 10       # Segundos de gracia antes de matar un contenedor
+            self._docker_reconnect_delay = 5.0   # Espera antes de reconectar al stream de eventos
+            self._health_check_interval = 5.0    # Segundos entre probes de salud de cada backend
+            self._health_window_seconds = 60     # Ventana de errores y latencias por backend
+            self._health_min_samples = 5         # Resultados minimos en la ventana para juzgar la tasa de error
+            self._health_error_threshold = 0.5   # Tasa de error que abre el circuito
+            self._health_consecutive_failures = 3  # Fallos seguidos que abren el circuito
+            self._circuit_open_seconds = 10      # Primer enfriamiento; se duplica en cada apertura seguida
+            self._circuit_max_open_seconds = 120
+            self._hedging_enabled = False        # Segunda copia en otro backend si el primer token tarda
+            self._hedge_percentile = 95          # Percentil del TTFT reciente a partir del cual se duplica
+            self._hedge_min_samples = 20         # TTFTs por modelo antes de usar el percentil
+            self._hedge_default_delay = 2.0      # Espera (segundos) mientras no hay muestras suficientes
+            self._hedge_budget = 0.1             # Carga extra maxima: copias / peticiones elegibles
+            self._batch_concurrency_per_backend = 1  # Prompts de lotes en paralelo por backend (siempre queda un slot para el chat)
+            self._batch_max_body_bytes = 16 * 1024 * 1024  # Tamano maximo del cuerpo de /api/batch
             self._popular_models = [
                 "llama3.2:1b",      # Modelo más pequeño primero
                 "llama3.2:3b",
@@ -29,12 +119,309 @@ class Settings:
             self._pull_timeout = 600        # Aumentar timeout para descargas
             self._connection_timeout = 10   # Timeout de conexión rápido
             self._read_timeout = 90         # Timeout de lectura optimizado
+            self._probe_deadline = 3.0      # Deadline global para probes de estado
             Settings._initialized = True
     
     @property
     def services(self):
         return self._services
     
+    @property
+    def backend_pools(self):
+        return self._backend_pools
+    
+    @property
+    def load_balancing_strategy(self):
+        return self._load_balancing_strategy
+    
+    @property
+    def default_num_parallel(self):
+        return self._default_num_parallel
+    
+    @property
+    def max_queue_depth(self):
+        return self._max_queue_depth
+    
+    @property
+    def queue_timeout(self):
+        return self._queue_timeout
+    
+    @property
+    def conversation_max_sessions(self):
+        return self._conversation_max_sessions
+    
+    @property
+    def conversation_idle_timeout(self):
+        return self._conversation_idle_timeout
+    
+    @property
+    def history_max_messages(self):
+        return self._history_max_messages
+    
+    @property
+    def history_max_sessions(self):
+        return self._history_max_sessions
+    
+    @property
+    def history_idle_timeout(self):
+        return self._history_idle_timeout
+    
+    @property
+    def history_backend(self):
+        return self._history_backend
+    
+    @property
+    def history_db_path(self):
+        return self._history_db_path
+    
+    @property
+    def history_batch_size(self):
+        return self._history_batch_size
+    
+    @property
+    def history_flush_interval(self):
+        return self._history_flush_interval
+    
+    @property
+    def response_cache_enabled(self):
+        return self._response_cache_enabled
+    
+    @property
+    def response_cache_max_bytes(self):
+        return self._response_cache_max_bytes
+    
+    @property
+    def response_cache_ttl(self):
+        return self._response_cache_ttl
+    
+    @property
+    def response_cache_spill_dir(self):
+        return self._response_cache_spill_dir
+    
+    @property
+    def semantic_cache_enabled(self):
+        return self._semantic_cache_enabled
+    
+    @property
+    def semantic_cache_embedding_model(self):
+        return self._semantic_cache_embedding_model
+    
+    @property
+    def semantic_cache_threshold(self):
+        return self._semantic_cache_threshold
+    
+    @property
+    def semantic_cache_max_entries(self):
+        return self._semantic_cache_max_entries
+    
+    @property
+    def single_flight_enabled(self):
+        return self._single_flight_enabled
+    
+    @property
+    def cascade_enabled(self):
+        return self._cascade_enabled
+    
+    @property
+    def cascade_models(self):
+        return self._cascade_models
+    
+    @property
+    def cascade_min_chars(self):
+        return self._cascade_min_chars
+    
+    @property
+    def token_budget_enabled(self):
+        return self._token_budget_enabled
+    
+    @property
+    def num_ctx_buckets(self):
+        return self._num_ctx_buckets
+    
+    @property
+    def max_num_ctx(self):
+        return self._max_num_ctx
+    
+    @property
+    def model_max_ctx(self):
+        return self._model_max_ctx
+    
+    @property
+    def num_ctx_shrink_after(self):
+        return self._num_ctx_shrink_after
+    
+    @property
+    def async_backend_connections(self):
+        return self._async_backend_connections
+    
+    @property
+    def async_wsgi_workers(self):
+        return self._async_wsgi_workers
+    
+    @property
+    def docker_base_url(self):
+        return self._docker_base_url
+    
+    @property
+    def docker_services(self):
+        return self._docker_services
+    
+    @property
+    def docker_default_services(self):
+        return self._docker_default_services
+    
+    @property
+    def docker_api_timeout(self):
+        return self._docker_api_timeout
+    
+    @property
+    def docker_stop_timeout(self):
+        return self._docker_stop_timeout
+    
+    @property
+    def docker_reconnect_delay(self):
+        return self._docker_reconnect_delay
+    
+    @property
+    def health_check_interval(self):
+        return self._health_check_interval
+    
+    @property
+    def health_window_seconds(self):
+        return self._health_window_seconds
+    
+    @property
+    def health_min_samples(self):
+        return self._health_min_samples
+    
+    @property
+    def health_error_threshold(self):
+        return self._health_error_threshold
+    
+    @property
+    def health_consecutive_failures(self):
+        return self._health_consecutive_failures
+    
+    @property
+    def circuit_open_seconds(self):
+        return self._circuit_open_seconds
+    
+    @property
+    def circuit_max_open_seconds(self):
+        return self._circuit_max_open_seconds
+    
+    @property
+    def hedging_enabled(self):
+        return self._hedging_enabled
+    
+    @property
+    def hedge_percentile(self):
+        return self._hedge_percentile
+    
+    @property
+    def hedge_min_samples(self):
+        return self._hedge_min_samples
+    
+    @property
+    def hedge_default_delay(self):
+        return self._hedge_default_delay
+    
+    @property
+    def hedge_budget(self):
+        return self._hedge_budget
+    
+    @property
+    def batch_concurrency_per_backend(self):
+        return self._batch_concurrency_per_backend
+    
+    @property
+    def batch_max_body_bytes(self):
+        return self._batch_max_body_bytes
+    
+    @property
+    def default_keep_alive(self):
+        return self._default_keep_alive
+    
+    @property
+    def model_keep_alive(self):
+        return self._model_keep_alive
+    
+    @property
+    def warmup_models(self):
+        return self._warmup_models
+    
+    @property
+    def warmup_interval(self):
+        return self._warmup_interval
+    
+    @property
+    def hot_model_window(self):
+        return self._hot_model_window
+    
+    @property
+    def hot_model_min_requests(self):
+        return self._hot_model_min_requests
+    
+    @property
+    def max_loaded_models(self):
+        return self._max_loaded_models
+    
+    @property
+    def placement_refresh_interval(self):
+        return self._placement_refresh_interval
+    
+    @property
+    def placement_expected_tokens(self):
+        return self._placement_expected_tokens
+    
+    @property
+    def placement_prior_tps(self):
+        return self._placement_prior_tps
+    
+    @property
+    def placement_prior_load_seconds(self):
+        return self._placement_prior_load_seconds
+    
+    @property
+    def autotune_profiles_path(self):
+        return self._autotune_profiles_path
+    
+    @property
+    def autotune_grid(self):
+        return self._autotune_grid
+    
+    @property
+    def autotune_num_predict(self):
+        return self._autotune_num_predict
+    
+    @property
+    def max_pulls_per_backend(self):
+        return self._max_pulls_per_backend
+    
+    @property
+    def download_history_size(self):
+        return self._download_history_size
+    
+    @property
+    def stats_container(self):
+        return self._stats_container
+    
+    @property
+    def log_backfill_lines(self):
+        return self._log_backfill_lines
+    
+    @property
+    def log_event_buffer_size(self):
+        return self._log_event_buffer_size
+    
+    @property
+    def system_sample_interval(self):
+        return self._system_sample_interval
+    
+    @property
+    def system_sample_windows(self):
+        return self._system_sample_windows
+    
     @property
     def popular_models(self):
         return self._popular_models
@@ -53,4 +440,8 @@ class Settings:
     
     @property
     def read_timeout(self):
-        return self._read_timeout 
\ No newline at end of file
+        return self._read_timeout
+    
+    @property
+    def probe_deadline(self):
+        return self._probe_deadline
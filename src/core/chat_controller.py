@@ -1,14 +1,14 @@
 """Main chat controller with dependency injection."""
 
-from typing import List, Dict, Any
-import threading
+from typing import List, Dict, Any, AsyncIterator, Iterable, Iterator, Optional
 
 from .interfaces import (
     OllamaServiceInterface, 
     ModelRepositoryInterface, 
     ChatHistoryInterface,
     TechnicalStatsInterface,
-    DockerCommandsInterface
+    DockerCommandsInterface,
+    ConversationMemoryInterface
 )
 
 
@@ -21,13 +21,15 @@ class ChatController:
         model_repository: ModelRepositoryInterface,
         chat_history: ChatHistoryInterface,
         technical_stats: TechnicalStatsInterface,
-        docker_commands: DockerCommandsInterface
+        docker_commands: DockerCommandsInterface,
+        conversation_memory: ConversationMemoryInterface
     ):
         self._ollama_service = ollama_service
         self._model_repository = model_repository
         self._chat_history = chat_history
         self._technical_stats = technical_stats
         self._docker_commands = docker_commands
+        self._conversation_memory = conversation_memory
     
     def get_available_models(self, service_type: str = "general") -> List[str]:
         """Get available models for a service."""
@@ -37,55 +39,147 @@ class ChatController:
         """Get popular models."""
         return self._model_repository.get_popular_models()
     
-    def send_message(self, message: str, model: str, service_type: str = "general") -> Dict[str, Any]:
-        """Send a chat message."""
-        # Add user message to history TODO: integrar memory service
-        user_message = {
-            "type": "user",
-            "content": message,
-            "model": model,
-            "service": service_type
-        }
-        self._chat_history.add_message(user_message)
-        
-        # Get response from Ollama
-        response = self._ollama_service.chat(message, model, service_type)
+    def send_message(self, message: str, model: str, service_type: str = "general",
+                     session_id: str = "default",
+                     options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send a chat message continuing the session's conversation."""
+        # Get response from Ollama reusing the session context
+        context = self._record_user_message(message, model, service_type, session_id)
+        response = self._ollama_service.chat(message, model, service_type, context=context, options=options)
         
         # Add assistant response to history
         if response.get("success"):
-            assistant_message = {
-                "type": "assistant",
-                "content": response["response"],
-                "model": model,
-                "service": service_type
-            }
-            self._chat_history.add_message(assistant_message)
-        
+            self._record_reply(response, model, service_type, session_id)
+        return response
+    
+    def send_message_stream(self, message: str, model: str, service_type: str = "general",
+                            session_id: str = "default",
+                            options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Send a chat message and stream the response events."""
+        context = self._record_user_message(message, model, service_type, session_id)
+        for event in self._ollama_service.chat_stream(message, model, service_type, context=context, options=options):
+            # Guardar la respuesta completa cuando termina el stream
+            if event.get("type") == "done":
+                self._record_reply(event, model, service_type, session_id)
+            yield event
+    
+    async def asend_message(self, message: str, model: str, service_type: str = "general",
+                            session_id: str = "default",
+                            options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """``send_message`` for the async serving mode."""
+        context = self._record_user_message(message, model, service_type, session_id)
+        response = await self._ollama_service.achat(message, model, service_type, context=context, options=options)
+        if response.get("success"):
+            self._record_reply(response, model, service_type, session_id)
         return response
     
+    async def asend_message_stream(self, message: str, model: str, service_type: str = "general",
+                                   session_id: str = "default",
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """``send_message_stream`` for the async serving mode."""
+        context = self._record_user_message(message, model, service_type, session_id)
+        events = self._ollama_service.achat_stream(message, model, service_type, context=context, options=options)
+        try:
+            async for event in events:
+                if event.get("type") == "done":
+                    self._record_reply(event, model, service_type, session_id)
+                yield event
+        finally:
+            await events.aclose()
+    
+    def _record_user_message(self, message: str, model: str, service_type: str,
+                             session_id: str) -> Optional[List[int]]:
+        """Store the user message; returns the session context to continue from."""
+        self._chat_history.add_message({
+            "type": "user",
+            "content": message,
+            "model": model,
+            "service": service_type,
+            "session": session_id
+        })
+        return self._conversation_memory.get_context(session_id, model, service_type)
+    
+    def _record_reply(self, response: Dict[str, Any], model: str, service_type: str, session_id: str) -> None:
+        """Save the new context and store the assistant message."""
+        self._conversation_memory.save_context(session_id, model, service_type, response.pop("context", None))
+        self._chat_history.add_message({
+            "type": "assistant",
+            "content": response["response"],
+            "model": model,
+            "service": service_type,
+            "session": session_id
+        })
+    
     def download_model(self, model_name: str, service_type: str = "general") -> Dict[str, Any]:
-        """Download a model in background."""
-        def _download():
-            return self._ollama_service.pull_model(model_name, service_type)
-        
-        # Start download in background thread
-        thread = threading.Thread(target=_download)
-        thread.daemon = True
-        thread.start()
-        
-        return {"success": True, "message": f"Descarga de {model_name} iniciada en segundo plano"}
+        """Start a tracked model download; returns its job."""
+        return self._ollama_service.start_download(model_name, service_type)
+    
+    def get_downloads(self) -> List[Dict[str, Any]]:
+        """Get recent download jobs."""
+        return self._ollama_service.list_downloads()
+    
+    def get_download(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of one download job."""
+        return self._ollama_service.get_download(job_id)
+    
+    def watch_download(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream progress updates of one download job."""
+        return self._ollama_service.watch_download(job_id)
     
     def get_service_status(self) -> Dict[str, Any]:
         """Get status of all services."""
         return self._ollama_service.get_service_status()
     
-    def get_chat_history(self) -> List[Dict[str, Any]]:
-        """Get chat history."""
-        return self._chat_history.get_history()
+    def get_backend_pools(self) -> Dict[str, Any]:
+        """Get load-balancing state of the backend pools."""
+        return self._ollama_service.get_pool_status()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache counters."""
+        return self._ollama_service.get_cache_stats()
+    
+    def get_model_residency(self) -> Dict[str, Any]:
+        """Get per-model load statistics."""
+        return self._ollama_service.get_model_residency()
+    
+    def get_placement(self, model: str) -> Dict[str, Any]:
+        """Get placement state for a model across backends."""
+        return self._ollama_service.get_placement(model)
     
-    def clear_chat_history(self) -> None:
-        """Clear chat history."""
-        self._chat_history.clear_history()
+    def start_autotune(self, model: str, service_type: str = "general") -> Dict[str, Any]:
+        """Start tuning generation options for a model."""
+        return self._ollama_service.start_autotune(model, service_type)
+    
+    def get_autotune_status(self) -> Dict[str, Any]:
+        """Get tuned option profiles and autotune jobs."""
+        return self._ollama_service.get_autotune_status()
+    
+    def run_batch(self, records: Iterable[Any], model: Optional[str] = None, service_type: str = "general",
+                  options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Run a stream of prompts as a low-priority batch."""
+        return self._ollama_service.run_batch(records, model, service_type, options)
+    
+    def get_chat_history(self, session_id: str = "default", limit: int = 50,
+                         before: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of a session's chat history."""
+        return self._chat_history.get_history(session_id, limit, before)
+    
+    def export_chat_history(self, session_id: Optional[str] = None, model: Optional[str] = None,
+                            since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chat history for export."""
+        return self._chat_history.export_history(session_id, model, since)
+    
+    def clear_chat_history(self, session_id: Optional[str] = None) -> None:
+        """Clear chat history and conversation memory (one session or all)."""
+        self._chat_history.clear_history(session_id)
+        if session_id is None:
+            self._conversation_memory.clear_all()
+        else:
+            self._conversation_memory.clear_session(session_id)
+    
+    def reset_conversation(self, session_id: str) -> None:
+        """Start a new conversation for a session."""
+        self._conversation_memory.clear_session(session_id)
     
     def is_model_available(self, model: str, service_type: str = "general") -> bool:
         """Check if model is available."""
@@ -95,6 +189,10 @@ class ChatController:
         """Get comprehensive technical statistics."""
         return self._technical_stats.get_technical_stats()
     
+    def get_log_events(self, limit: int = 100, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get recent structured events from the Ollama container log."""
+        return self._technical_stats.get_log_events(limit, category)
+    
     def start_docker_services(self) -> Dict[str, Any]:
         """Start Docker services."""
         return self._docker_commands.start_services()
@@ -1,7 +1,7 @@
 """Interfaces for dependency inversion pattern."""
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterable, Iterator, Optional
 
 
 class OllamaServiceInterface(ABC):
@@ -13,19 +13,102 @@ class OllamaServiceInterface(ABC):
         pass
     
     @abstractmethod
-    def chat(self, message: str, model: str, service_type: str) -> Dict[str, Any]:
+    def chat(self, message: str, model: str, service_type: str,
+             context: Optional[List[int]] = None,
+             options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Send chat message to model."""
         pass
     
+    @abstractmethod
+    def chat_stream(self, message: str, model: str, service_type: str,
+                    context: Optional[List[int]] = None,
+                    options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chat response events from model."""
+        pass
+    
     @abstractmethod
     def pull_model(self, model_name: str, service_type: str) -> Dict[str, Any]:
-        """Download a model."""
+        """Download a model and wait for it to finish."""
+        pass
+    
+    @abstractmethod
+    def start_download(self, model_name: str, service_type: str) -> Dict[str, Any]:
+        """Start (or join) a tracked model download."""
+        pass
+    
+    @abstractmethod
+    def get_download(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of one download job."""
+        pass
+    
+    @abstractmethod
+    def list_downloads(self) -> List[Dict[str, Any]]:
+        """Get progress of recent download jobs."""
+        pass
+    
+    @abstractmethod
+    def watch_download(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream progress updates of one download job."""
         pass
     
     @abstractmethod
     def get_service_status(self) -> Dict[str, Any]:
         """Get status of all services."""
         pass
+    
+    @abstractmethod
+    def get_pool_status(self) -> Dict[str, Any]:
+        """Get load-balancing state of every backend pool."""
+        pass
+    
+    @abstractmethod
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache counters."""
+        pass
+    
+    @abstractmethod
+    def get_model_residency(self) -> Dict[str, Any]:
+        """Get per-model load statistics."""
+        pass
+    
+    @abstractmethod
+    def get_placement(self, model: str) -> Dict[str, Any]:
+        """Get placement state for a model across backends."""
+        pass
+    
+    @abstractmethod
+    def start_autotune(self, model: str, service_type: str) -> Dict[str, Any]:
+        """Start tuning generation options for a model."""
+        pass
+    
+    @abstractmethod
+    def get_autotune_status(self) -> Dict[str, Any]:
+        """Get tuned option profiles and autotune jobs."""
+        pass
+    
+    @abstractmethod
+    def run_batch(self, records: Iterable[Any], model: Optional[str] = None, service_type: str = "general",
+                  options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Run a stream of prompts at low priority, yielding results as they complete."""
+        pass
+
+
+class AsyncOllamaServiceInterface(ABC):
+    """Interface for chat operations awaited on an event loop."""
+    
+    @abstractmethod
+    async def achat(self, message: str, model: str, service_type: str,
+                    context: Optional[List[int]] = None,
+                    options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send chat message to model."""
+        pass
+    
+    @abstractmethod
+    def achat_stream(self, message: str, model: str, service_type: str,
+                     context: Optional[List[int]] = None,
+                     options: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream chat events from model."""
+        pass
 
 
 class ModelRepositoryInterface(ABC):
@@ -51,13 +134,44 @@ class ChatHistoryInterface(ABC):
         pass
     
     @abstractmethod
-    def get_history(self) -> List[Dict[str, Any]]:
-        """Get chat history."""
+    def get_history(self, session_id: str = "default", limit: int = 50,
+                    before: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of a session's chat history."""
+        pass
+    
+    @abstractmethod
+    def clear_history(self, session_id: Optional[str] = None) -> None:
+        """Clear chat history of one session, or all of it."""
+        pass
+    
+    @abstractmethod
+    def export_history(self, session_id: Optional[str] = None, model: Optional[str] = None,
+                       since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chat history messages, optionally filtered."""
+        pass
+
+
+class ConversationMemoryInterface(ABC):
+    """Interface for per-session conversation memory."""
+    
+    @abstractmethod
+    def get_context(self, session_id: str, model: str, service_type: str) -> Optional[List[int]]:
+        """Get stored model context for a session."""
+        pass
+    
+    @abstractmethod
+    def save_context(self, session_id: str, model: str, service_type: str, context: List[int]) -> None:
+        """Store model context for a session."""
+        pass
+    
+    @abstractmethod
+    def clear_session(self, session_id: str) -> None:
+        """Forget one session."""
         pass
     
     @abstractmethod
-    def clear_history(self) -> None:
-        """Clear chat history."""
+    def clear_all(self) -> None:
+        """Forget all sessions."""
         pass
 
 
@@ -68,6 +182,11 @@ class TechnicalStatsInterface(ABC):
     def get_technical_stats(self) -> Dict[str, Any]:
         """Get comprehensive technical statistics."""
         pass
+    
+    @abstractmethod
+    def get_log_events(self, limit: int = 100, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get recent structured events parsed from the container log."""
+        pass
 
 
 class DockerCommandsInterface(ABC):
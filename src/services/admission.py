@@ -0,0 +1,219 @@
+"""Per-backend admission control with a bounded FIFO wait queue."""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+
+
+class AdmissionError(Exception):
+    """Request could not be admitted to a backend."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(AdmissionError):
+    """The backend wait queue is full (maps to HTTP 429)."""
+
+    status_code = 429
+
+
+class QueueTimeoutError(AdmissionError):
+    """The request waited too long in the queue (maps to HTTP 503)."""
+
+
+class _AsyncWaiter:
+    """Queue entry for a coroutine; ``set`` may be called from any thread."""
+
+    __slots__ = ("_loop", "future")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.future = loop.create_future()
+
+    def set(self) -> None:
+        self._loop.call_soon_threadsafe(self._grant)
+
+    def _grant(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionLimiter:
+    """Bounded concurrency limiter with a FIFO wait queue.
+
+    At most ``max_concurrency`` requests run at once (mirrors
+    ``OLLAMA_NUM_PARALLEL``); up to ``max_queue`` more wait in arrival order.
+    Anything beyond that is rejected immediately. Background requests (batch
+    jobs) wait in a separate unbounded queue that only gets a slot when no
+    interactive request is waiting.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 8, queue_timeout: float = 60.0):
+        self._max_concurrency = max(1, int(max_concurrency))
+        self._max_queue = max(0, int(max_queue))
+        self._queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()
+        self._background: deque = deque()
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+        self._service_time = 0.0  # EWMA de duracion por peticion (segundos)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def has_free_slot(self) -> bool:
+        """Whether a request would be admitted right now without queueing."""
+        with self._lock:
+            return self._active < self._max_concurrency and not self._waiters
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a queued slot frees up."""
+        per_request = self._service_time or 1.0
+        backlog = (len(self._waiters) + 1) / self._max_concurrency
+        return max(1, math.ceil(backlog * per_request))
+
+    def acquire(self) -> float:
+        """Wait for a slot in FIFO order; returns the time spent queued."""
+        start = time.perf_counter()
+        with self._lock:
+            if self._active < self._max_concurrency and not self._waiters:
+                self._active += 1
+                self._record_wait(0.0)
+                return 0.0
+            if len(self._waiters) >= self._max_queue:
+                self._rejected += 1
+                raise QueueFullError("Cola del backend llena", self._retry_after())
+            event = threading.Event()
+            self._waiters.append(event)
+
+        if not event.wait(self._queue_timeout):
+            with self._lock:
+                if event in self._waiters:
+                    self._waiters.remove(event)
+                    self._timed_out += 1
+                    raise QueueTimeoutError("Tiempo de espera en cola agotado", self._retry_after())
+            # El slot se concedio justo al vencer el timeout: continuar
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._record_wait(waited)
+        return waited
+
+    async def acquire_async(self) -> float:
+        """Like ``acquire`` but waits on the event loop instead of blocking a thread.
+
+        Sync and async callers share the same FIFO queue.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if self._active < self._max_concurrency and not self._waiters:
+                self._active += 1
+                self._record_wait(0.0)
+                return 0.0
+            if len(self._waiters) >= self._max_queue:
+                self._rejected += 1
+                raise QueueFullError("Cola del backend llena", self._retry_after())
+            waiter = _AsyncWaiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait({waiter.future}, timeout=self._queue_timeout)
+        except asyncio.CancelledError:
+            # El cliente se fue mientras esperaba: salir de la cola o devolver el slot ya concedido
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            if not queued:
+                self.release()
+            raise
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._timed_out += 1
+                raise QueueTimeoutError("Tiempo de espera en cola agotado", self._retry_after())
+            # Slot concedido (quizas justo al vencer el timeout)
+            waited = time.perf_counter() - start
+            self._record_wait(waited)
+        return waited
+
+    def acquire_background(self) -> float:
+        """Wait for a slot behind every interactive request (no queue limit, no timeout)."""
+        start = time.perf_counter()
+        with self._lock:
+            if self._active < self._max_concurrency and not self._waiters and not self._background:
+                self._active += 1
+                self._record_wait(0.0)
+                return 0.0
+            event = threading.Event()
+            self._background.append(event)
+
+        event.wait()
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._record_wait(waited)
+        return waited
+
+    def release(self, service_time: float = 0.0) -> None:
+        """Free a slot, handing it directly to the oldest waiter if any."""
+        with self._lock:
+            if service_time:
+                self._service_time = service_time if not self._service_time else \
+                    self._service_time + 0.2 * (service_time - self._service_time)
+            if self._waiters:
+                # El slot pasa al siguiente en la cola sin liberar _active
+                self._waiters.popleft().set()
+            elif self._background:
+                # Los lotes solo reciben slots que ninguna peticion interactiva espera
+                self._background.popleft().set()
+            else:
+                self._active -= 1
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """Hold a slot for the duration of the block; yields queue wait seconds."""
+        waited = self.acquire()
+        start = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def _record_wait(self, waited: float) -> None:
+        self._admitted += 1
+        self._total_wait += waited
+        self._last_wait = waited
+        self._max_wait = max(self._max_wait, waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current queue state and wait-time counters."""
+        with self._lock:
+            return {
+                "max_concurrency": self._max_concurrency,
+                "max_queue": self._max_queue,
+                "active": self._active,
+                "queue_depth": len(self._waiters),
+                "background_waiting": len(self._background),
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "avg_wait_ms": round(self._total_wait / self._admitted * 1000, 1) if self._admitted else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 1),
+                "last_wait_ms": round(self._last_wait * 1000, 1)
+            }
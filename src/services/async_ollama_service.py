@@ -0,0 +1,325 @@
+"""Ollama service with coroutine chat methods for the async serving mode."""
+
+import asyncio
+import json
+import time
+from typing import List, Dict, Any, AsyncIterator, Optional
+
+import httpx
+
+from ..core.interfaces import AsyncOllamaServiceInterface
+from .admission import AdmissionError
+from .hedging import HedgeRace, PRIMARY, HEDGE
+from .ollama_service import OllamaService
+from .response_cache import ResponseCache
+from .single_flight import AsyncSingleFlight
+from .token_budget import ContextBudgetError
+
+
+class AsyncOllamaService(OllamaService, AsyncOllamaServiceInterface):
+    """``OllamaService`` plus ``achat``/``achat_stream`` for the event loop.
+
+    Caches, placement, token budget, cascade and metrics are the same
+    objects the sync methods use. Only the Ollama calls (``httpx``) and the
+    wait for a backend slot are async, so an in-flight generation holds a
+    coroutine instead of a thread.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._async_flight = AsyncSingleFlight() if self._settings.single_flight_enabled else None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Se crea dentro del event loop que lo va a usar
+        if self._client is None:
+            connections = self._settings.async_backend_connections
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+                timeout=httpx.Timeout(self._settings.request_timeout, connect=self._settings.connection_timeout),
+                transport=httpx.AsyncHTTPTransport(retries=2)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the async HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get cache counters, including coalescing of async requests."""
+        stats = super().get_cache_stats()
+        stats["single_flight_async"] = (
+            {"enabled": True, **self._async_flight.get_stats()}
+            if self._async_flight is not None else {"enabled": False}
+        )
+        return stats
+
+    async def _acache_lookup(self, payload: Dict[str, Any], service_type: str):
+        if self._semantic_cache is not None and not payload.get("context") \
+                and ResponseCache.is_cacheable(payload["options"]):
+            # El embedding es una llamada HTTP corta: fuera del event loop
+            return await asyncio.to_thread(self._cache_lookup, payload, service_type)
+        return self._cache_lookup(payload, service_type)
+
+    async def achat(self, message: str, model: str, service_type: str = "general",
+                    context: Optional[List[int]] = None,
+                    options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Coroutine version of ``chat``."""
+        start = time.perf_counter()
+        hedge, options = self._hedge_hint(options)
+        fast_model, options = self._cascade.plan(model, options)
+        result = None
+        if fast_model:
+            result = await self._achat(message, fast_model, service_type, context, options, hedge)
+            reason = self._cascade.escalation_reason(result, self._num_predict(fast_model, options))
+            self._metrics.observe_cascade(model, fast_model, result, reason)
+            if reason is not None:
+                result = None
+        if result is None:
+            result = await self._achat(message, model, service_type, context, options, hedge)
+        self._metrics.observe_generation("generate", result.get("model", model), result, time.perf_counter() - start)
+        return result
+
+    async def _achat(self, message: str, model: str, service_type: str,
+                     context: Optional[List[int]], options: Optional[Dict[str, Any]],
+                     hedge: bool = False) -> Dict[str, Any]:
+        try:
+            payload = self._build_generate_payload(message, model, stream=False, context=context, options=options)
+            if self._token_budget is not None:
+                self._token_budget.fit(payload, options)
+            cache_ticket, cached = await self._acache_lookup(payload, service_type)
+            if cached is not None:
+                return cached
+
+            def _upstream():
+                if hedge:
+                    return self._acollect(self._ahedged_stream(dict(payload, stream=True), service_type,
+                                                               cache_ticket, options))
+                return self._agenerate(payload, service_type, cache_ticket, options)
+
+            if self._async_flight is None:
+                return await _upstream()
+            return await self._async_flight.do(self._flight_key(payload, service_type), _upstream)
+
+        except AdmissionError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "status_code": e.status_code,
+                "retry_after": e.retry_after
+            }
+        except ContextBudgetError as e:
+            return {"success": False, "error": str(e), "status_code": e.status_code}
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e) or type(e).__name__
+            }
+
+    async def _agenerate(self, payload: Dict[str, Any], service_type: str,
+                         cache_ticket: Optional[Dict[str, Any]],
+                         options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run one non-streaming generation on a leased backend."""
+        model = payload["model"]
+        pool, placed = self._place(model, service_type)
+        async with pool.lease_async(placed) as lease:
+            backend = lease.backend
+            response = await self.client.post(
+                f"{backend.url}/api/generate",
+                json=self._with_profile(payload, backend.url, options)
+            )
+
+            if response.status_code != 200:
+                return self._status_error(lease, response.status_code, response.text)
+            chat_response = self._result_response(response.json(), model, pool, lease)
+            self._after_generation(payload, service_type, cache_ticket, chat_response)
+            return chat_response
+
+    async def achat_stream(self, message: str, model: str, service_type: str = "general",
+                           context: Optional[List[int]] = None,
+                           options: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Coroutine version of ``chat_stream`` (same events)."""
+        start = time.perf_counter()
+        ttft = None
+        hedge, options = self._hedge_hint(options)
+        # Sin cascada en streaming (ver chat_stream)
+        _, options = self._cascade.plan(model, options)
+
+        events = self._achat_stream(message, model, service_type, context, options, hedge)
+        try:
+            async for event in events:
+                event_type = event.get("type")
+                if event_type == "token" and ttft is None:
+                    ttft = time.perf_counter() - start
+                elif event_type in ("done", "error"):
+                    self._metrics.observe_generation("generate_stream", model, event,
+                                                     time.perf_counter() - start, ttft)
+                yield event
+        finally:
+            await events.aclose()
+
+    async def _achat_stream(self, message: str, model: str, service_type: str,
+                            context: Optional[List[int]],
+                            options: Optional[Dict[str, Any]],
+                            hedge: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            payload = self._build_generate_payload(message, model, stream=True, context=context, options=options)
+            if self._token_budget is not None:
+                self._token_budget.fit(payload, options)
+            cache_ticket, cached = await self._acache_lookup(payload, service_type)
+        except ContextBudgetError as e:
+            yield {"type": "error", "success": False, "error": str(e), "status_code": e.status_code}
+            return
+        except Exception as e:
+            # Algunas excepciones de httpx (ReadError, ConnectError...) no traen mensaje
+            yield {"type": "error", "success": False, "error": str(e) or type(e).__name__}
+            return
+
+        if cached is not None:
+            yield {"type": "token", "content": cached["response"]}
+            yield dict(cached, type="done")
+            return
+
+        def _upstream():
+            if hedge:
+                return self._ahedged_stream(payload, service_type, cache_ticket, options)
+            return self._agenerate_stream(payload, service_type, cache_ticket, options)
+
+        events = _upstream() if self._async_flight is None else \
+            self._async_flight.stream(self._flight_key(payload, service_type), _upstream)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+
+    async def _agenerate_stream(self, payload: Dict[str, Any], service_type: str,
+                                cache_ticket: Optional[Dict[str, Any]],
+                                options: Optional[Dict[str, Any]] = None,
+                                placement=None) -> AsyncIterator[Dict[str, Any]]:
+        """Run one streaming generation on a leased backend (``placement`` pins pool and backend)."""
+        model = payload["model"]
+        try:
+            start = time.perf_counter_ns()
+            first_token_at = None
+            parts: List[str] = []
+
+            pool, placed = placement or self._place(model, service_type)
+            async with pool.lease_async(placed) as lease:
+                backend = lease.backend
+                yield {"type": "admitted", "backend": backend.url, "queue_wait": int(lease.queue_wait * 1e9)}
+
+                async with self.client.stream(
+                    "POST",
+                    f"{backend.url}/api/generate",
+                    json=self._with_profile(payload, backend.url, options),
+                    timeout=httpx.Timeout(self._settings.read_timeout, connect=self._settings.connection_timeout)
+                ) as response:
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode(errors="replace")
+                        yield {"type": "error", **self._status_error(lease, response.status_code, body)}
+                        return
+
+                    # Ollama envia NDJSON: un objeto por linea
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            lease.fail()
+                            yield {"type": "error", "success": False, "error": chunk["error"]}
+                            return
+
+                        token = chunk.get("response", "")
+                        if token:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter_ns()
+                            parts.append(token)
+                            yield {"type": "token", "content": token}
+
+                        if chunk.get("done"):
+                            done_event = {"type": "done", **self._result_response(
+                                chunk, model, pool, lease, "".join(parts),
+                                time_to_first_token=(first_token_at - start) if first_token_at else 0
+                            )}
+                            self._after_generation(payload, service_type, cache_ticket, done_event)
+                            yield done_event
+                            return
+
+            yield {"type": "error", "success": False, "error": "Stream finalizado sin respuesta completa"}
+
+        except AdmissionError as e:
+            yield {
+                "type": "error",
+                "success": False,
+                "error": str(e),
+                "status_code": e.status_code,
+                "retry_after": e.retry_after
+            }
+        except Exception as e:
+            # Algunas excepciones de httpx (ReadError, ConnectError...) no traen mensaje
+            yield {"type": "error", "success": False, "error": str(e) or type(e).__name__}
+
+    async def _ahedged_stream(self, payload: Dict[str, Any], service_type: str,
+                              cache_ticket: Optional[Dict[str, Any]],
+                              options: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Coroutine version of ``_hedged_stream``; the losing copy is cancelled at once."""
+        model = payload["model"]
+        self._hedging.begin()
+        start = time.perf_counter()
+        deadline = start + self._hedging.delay(model)
+        sink: asyncio.Queue = asyncio.Queue()
+        race = HedgeRace()
+        tried = False
+        tasks = {PRIMARY: asyncio.create_task(
+            self._apump(PRIMARY, self._agenerate_stream(payload, service_type, cache_ticket, options), sink)
+        )}
+        try:
+            while not race.finished:
+                timeout = None if tried or race.winner is not None else max(0.0, deadline - time.perf_counter())
+                try:
+                    source, event = await asyncio.wait_for(sink.get(), timeout)
+                except asyncio.TimeoutError:
+                    tried = True
+                    target = self._hedge_target(model, race)
+                    if target is not None:
+                        race.start_hedge()
+                        tasks[HEDGE] = asyncio.create_task(self._apump(
+                            HEDGE, self._agenerate_stream(payload, service_type, cache_ticket, options, target), sink
+                        ))
+                    continue
+
+                undecided = race.winner is None
+                forward, cancel = race.feed(source, event)
+                if cancel is not None:
+                    # Cancelar la tarea cierra su stream de httpx: Ollama deja de generar
+                    tasks[cancel].cancel()
+                if undecided and race.winner is not None:
+                    self._hedge_settled(model, race, event, time.perf_counter() - start)
+                if forward:
+                    yield event
+                    if source == race.winner and event.get("type") in ("done", "error"):
+                        return
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    @staticmethod
+    async def _apump(source: int, events: AsyncIterator[Dict[str, Any]], sink: asyncio.Queue) -> None:
+        try:
+            async for event in events:
+                sink.put_nowait((source, event))
+        finally:
+            await events.aclose()
+            sink.put_nowait((source, None))
+
+    @staticmethod
+    async def _acollect(events: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        result = {"success": False, "error": "Stream finalizado sin respuesta completa"}
+        async for event in events:
+            if event.get("type") in ("done", "error"):
+                result = {k: v for k, v in event.items() if k != "type"}
+        return result
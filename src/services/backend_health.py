@@ -0,0 +1,252 @@
+"""Background health checks and per-backend circuit breakers."""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from ..config.settings import Settings
+from .admission import AdmissionError
+from .service_probe import ServiceProbe
+
+
+class CircuitOpenError(AdmissionError):
+    """No backend of the pool is accepting requests (maps to HTTP 503)."""
+
+
+class CircuitBreaker:
+    """Rolling error window and breaker state of one backend.
+
+    Closed until the window's error rate reaches ``error_threshold`` (with
+    at least ``min_samples`` outcomes) or ``consecutive_failures`` in a row.
+    Open rejects requests for a cool-down that doubles on each new trip.
+    After the cool-down it is half-open: one trial (a probe or a single
+    request) decides between closed and open again. Each trial gets a
+    number, so only the request that holds it can hand it back. Not
+    thread-safe; the owning ``BackendHealth`` serializes access.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window_seconds: float, min_samples: int, error_threshold: float,
+                 consecutive_failures: int, open_seconds: float, max_open_seconds: float):
+        self._window_seconds = window_seconds
+        self._min_samples = min_samples
+        self._error_threshold = error_threshold
+        self._consecutive_limit = consecutive_failures
+        self._open_seconds = open_seconds
+        self._max_open_seconds = max_open_seconds
+        self._outcomes: deque = deque()   # (instante, ok)
+        self._latencies: deque = deque()  # (instante, ms) de los probes
+        self._consecutive = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._cooldown = 0.0
+        self._trips = 0
+        self._trial_in_flight = False
+        self._trials = 0  # numero de la ultima prueba entregada en half-open
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self._window_seconds
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            self._outcomes.popleft()
+        while self._latencies and self._latencies[0][0] < horizon:
+            self._latencies.popleft()
+
+    def state(self, now: float) -> str:
+        if self._state == self.OPEN and now - self._opened_at >= self._cooldown:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def available(self, now: float) -> bool:
+        state = self.state(now)
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self._trial_in_flight)
+
+    def acquire(self, now: float) -> Optional[int]:
+        """Permission for one request: None if refused, else its trial number.
+
+        In half-open only the first caller gets permission, with a new trial
+        number; any other admitted request gets 0.
+        """
+        if not self.available(now):
+            return None
+        if self._state != self.HALF_OPEN:
+            return 0
+        self._trial_in_flight = True
+        self._trials += 1
+        return self._trials
+
+    def release(self, trial: int) -> None:
+        """The request holding ``trial`` ended without an outcome (e.g. the client went away)."""
+        # Solo la peticion que tiene la prueba en curso puede devolverla
+        if trial and trial == self._trials:
+            self._trial_in_flight = False
+
+    def record(self, ok: bool, now: float, latency_ms: Optional[float] = None) -> None:
+        state = self.state(now)
+        self._outcomes.append((now, ok))
+        if latency_ms is not None:
+            self._latencies.append((now, latency_ms))
+        self._prune(now)
+        self._consecutive = 0 if ok else self._consecutive + 1
+
+        if state == self.HALF_OPEN:
+            if ok:
+                # Recuperado: la ventana vieja ya no representa al backend
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._trips = 0
+                self._trial_in_flight = False
+            else:
+                self._trip(now)
+        elif state == self.CLOSED and not ok:
+            errors = sum(1 for _, outcome in self._outcomes if not outcome)
+            samples = len(self._outcomes)
+            if self._consecutive >= self._consecutive_limit or (
+                    samples >= self._min_samples and errors / samples >= self._error_threshold):
+                self._trip(now)
+
+    def _trip(self, now: float) -> None:
+        self._trips += 1
+        self._state = self.OPEN
+        self._opened_at = now
+        self._cooldown = min(self._open_seconds * 2 ** (self._trips - 1), self._max_open_seconds)
+        self._trial_in_flight = False
+
+    def retry_after(self, now: float) -> int:
+        if self.state(now) != self.OPEN:
+            return 1
+        return max(1, math.ceil(self._opened_at + self._cooldown - now))
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        self._prune(now)
+        samples = len(self._outcomes)
+        errors = sum(1 for _, ok in self._outcomes if not ok)
+        latencies = sorted(ms for _, ms in self._latencies)
+        return {
+            "state": self.state(now),
+            "samples": samples,
+            "error_rate": round(errors / samples, 3) if samples else 0.0,
+            "consecutive_failures": self._consecutive,
+            "latency_avg_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+            "latency_p95_ms": latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+            if latencies else None,
+            "retry_after": self.retry_after(now) if self._state == self.OPEN else 0
+        }
+
+
+class BackendHealth:
+    """Probe every backend in the background and hold its circuit breaker (Singleton).
+
+    Request outcomes reported by the backend pools and the periodic
+    ``/api/tags`` probes feed the same breaker. ``get_snapshot`` serves the
+    last probe of each backend without any HTTP call.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self._settings = Settings()
+            self._probe = ServiceProbe()
+            self._lock = threading.Lock()
+            self._breakers: Dict[str, CircuitBreaker] = {}
+            self._probes: Dict[str, Dict[str, Any]] = {}
+            self._ready = threading.Event()
+            self._stop = threading.Event()
+            self._thread = None
+            BackendHealth._initialized = True
+
+    def _urls(self) -> List[str]:
+        urls = dict.fromkeys(self._settings.services.values())
+        for backends in self._settings.backend_pools.values():
+            urls.update(dict.fromkeys(b["url"] for b in backends))
+        return list(urls)
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        breaker = self._breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                self._settings.health_window_seconds,
+                self._settings.health_min_samples,
+                self._settings.health_error_threshold,
+                self._settings.health_consecutive_failures,
+                self._settings.circuit_open_seconds,
+                self._settings.circuit_max_open_seconds
+            )
+            self._breakers[url] = breaker
+        return breaker
+
+    def start(self) -> None:
+        """Start probing backends every ``health_check_interval`` seconds."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="backend-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while True:
+            self.probe_now()
+            if self._stop.wait(self._settings.health_check_interval):
+                break
+
+    def probe_now(self) -> None:
+        """Probe every backend once (in parallel) and feed the breakers."""
+        results = self._probe.probe_all({url: url for url in self._urls()})
+        now = time.monotonic()
+        with self._lock:
+            for url, probe in results.items():
+                ok = probe["reachable"] and probe["status_code"] == 200
+                self._probes[url] = dict(probe, checked_at=time.time())
+                self._breaker(url).record(ok, now, probe.get("latency_ms"))
+        self._ready.set()
+
+    def available(self, url: str) -> bool:
+        """Whether a request could be sent now (does not reserve the trial)."""
+        with self._lock:
+            return self._breaker(url).available(time.monotonic())
+
+    def acquire(self, url: str) -> Optional[int]:
+        """Reserve permission to send one request to a backend (see ``CircuitBreaker.acquire``)."""
+        with self._lock:
+            return self._breaker(url).acquire(time.monotonic())
+
+    def release(self, url: str, trial: int) -> None:
+        with self._lock:
+            self._breaker(url).release(trial)
+
+    def record(self, url: str, ok: bool) -> None:
+        """Record the outcome of one request."""
+        with self._lock:
+            self._breaker(url).record(ok, time.monotonic())
+
+    def retry_after(self, url: str) -> int:
+        with self._lock:
+            return self._breaker(url).retry_after(time.monotonic())
+
+    def circuit(self, url: str) -> Dict[str, Any]:
+        """Breaker state and rolling window of one backend."""
+        with self._lock:
+            return self._breaker(url).snapshot(time.monotonic())
+
+    def get_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Last probe and breaker state per backend URL (waits for the first round)."""
+        self._ready.wait(self._settings.probe_deadline)
+        now = time.monotonic()
+        with self._lock:
+            return {
+                url: {**self._probes.get(url, {"reachable": False, "status_code": None, "models": 0}),
+                      "circuit": self._breaker(url).snapshot(now)}
+                for url in self._urls()
+            }
@@ -0,0 +1,228 @@
+"""Load-balanced pool of Ollama backends for one service type."""
+
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
+
+from .admission import AdmissionLimiter
+from .backend_health import BackendHealth, CircuitOpenError
+
+
+class Backend:
+    """Runtime state of a single Ollama endpoint."""
+
+    __slots__ = ("url", "weight", "outstanding", "ewma_latency", "requests", "errors", "limiter")
+
+    def __init__(self, url: str, weight: float = 1.0, max_parallel: int = 2,
+                 max_queue: int = 8, queue_timeout: float = 60.0):
+        self.url = url
+        self.weight = max(float(weight), 0.01)
+        self.limiter = AdmissionLimiter(max_parallel, max_queue, queue_timeout)
+        self.outstanding = 0
+        self.ewma_latency = 0.0  # segundos, 0 = sin muestras todavia
+        self.requests = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "admission": self.limiter.snapshot()
+        }
+
+
+class Lease:
+    """A backend reserved for one request."""
+
+    __slots__ = ("backend", "queue_wait", "failed", "trial")
+
+    def __init__(self, backend: Backend, queue_wait: float = 0.0, trial: int = 0):
+        self.backend = backend
+        self.queue_wait = queue_wait
+        self.failed = False
+        self.trial = trial  # numero de prueba half-open que tiene esta peticion (0: ninguna)
+
+    def fail(self) -> None:
+        """Count this request as a backend failure when the lease ends."""
+        self.failed = True
+
+
+class BackendPool:
+    """Route requests across N backends by least-outstanding or EWMA latency.
+
+    With ``health``, backends whose circuit is open are skipped and each
+    lease reports its outcome to the backend's breaker.
+    """
+
+    STRATEGIES = ("least_outstanding", "ewma")
+
+    def __init__(self, service_type: str, backends: List[Dict[str, Any]],
+                 strategy: str = "least_outstanding", ewma_alpha: float = 0.3,
+                 max_parallel: int = 2, max_queue: int = 8, queue_timeout: float = 60.0,
+                 health: Optional[BackendHealth] = None):
+        if not backends:
+            raise ValueError(f"El pool '{service_type}' necesita al menos un backend")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Estrategia desconocida: {strategy}")
+        self.service_type = service_type
+        self._backends = [
+            Backend(
+                b["url"],
+                b.get("weight", 1.0),
+                b.get("max_parallel", max_parallel),
+                b.get("max_queue", max_queue),
+                queue_timeout
+            )
+            for b in backends
+        ]
+        self._strategy = strategy
+        self._alpha = ewma_alpha
+        self._health = health
+        self._lock = threading.Lock()
+
+    @property
+    def backends(self) -> List[Backend]:
+        return list(self._backends)
+
+    @property
+    def primary(self) -> Backend:
+        """First configured backend, used for non-routed calls."""
+        return self._backends[0]
+
+    def _score(self, backend: Backend) -> tuple:
+        load = (backend.outstanding + 1) / backend.weight
+        if self._strategy == "ewma":
+            # Latencia esperada: EWMA escalada por la cola; sin muestras se prueba primero
+            return (backend.ewma_latency * load, load)
+        return (load, backend.ewma_latency)
+
+    def select(self) -> Backend:
+        """Pick the best backend right now (does not reserve it)."""
+        with self._lock:
+            return min(self._candidates() or self._backends, key=self._score)
+
+    def _candidates(self) -> List[Backend]:
+        if self._health is None:
+            return self._backends
+        return [b for b in self._backends if self._health.available(b.url)]
+
+    def is_available(self, backend: Backend) -> bool:
+        """Whether the backend's circuit accepts requests."""
+        return self._health is None or self._health.available(backend.url)
+
+    @contextmanager
+    def lease(self, backend: Optional[Backend] = None, background: bool = False) -> Iterator[Lease]:
+        """Reserve a backend for the duration of one request.
+
+        ``backend`` prefers a specific member of the pool (e.g. chosen by the
+        placement engine); otherwise the pool's strategy picks one. Backends
+        with an open circuit are skipped, and ``CircuitOpenError`` is raised
+        when none is left. Blocks in the backend's FIFO queue while all its
+        slots are busy and raises ``AdmissionError`` when the queue is full
+        or the wait times out. ``background`` requests queue behind every
+        interactive one, without limit or timeout.
+        """
+        backend, trial = self._reserve(backend)
+        try:
+            queue_wait = backend.limiter.acquire_background() if background else backend.limiter.acquire()
+        except BaseException:
+            self._unreserve(backend, trial)
+            raise
+        lease = Lease(backend, queue_wait, trial)
+        start = time.perf_counter()
+        outcome = None
+        try:
+            yield lease
+            outcome = not lease.failed
+        except Exception:
+            outcome = False
+            raise
+        finally:
+            self._finish(lease, time.perf_counter() - start, outcome)
+
+    @asynccontextmanager
+    async def lease_async(self, backend: Optional[Backend] = None) -> AsyncIterator[Lease]:
+        """``lease`` for coroutines: queues on the event loop, no thread held."""
+        backend, trial = self._reserve(backend)
+        try:
+            queue_wait = await backend.limiter.acquire_async()
+        except BaseException:
+            self._unreserve(backend, trial)
+            raise
+        lease = Lease(backend, queue_wait, trial)
+        start = time.perf_counter()
+        outcome = None
+        try:
+            yield lease
+            outcome = not lease.failed
+        except Exception:
+            outcome = False
+            raise
+        finally:
+            self._finish(lease, time.perf_counter() - start, outcome)
+
+    def _reserve(self, backend: Optional[Backend]) -> Tuple[Backend, int]:
+        """Pick and count a backend; returns it with its half-open trial number (0: none)."""
+        with self._lock:
+            backend, trial = self._pick(backend)
+            backend.outstanding += 1
+            backend.requests += 1
+        return backend, trial
+
+    def _pick(self, preferred: Optional[Backend]) -> Tuple[Backend, int]:
+        if self._health is None:
+            return preferred or min(self._backends, key=self._score), 0
+        candidates = sorted(self._candidates(), key=self._score)
+        if preferred in candidates:
+            candidates.remove(preferred)
+            candidates.insert(0, preferred)
+        for backend in candidates:
+            # En half-open solo pasa una peticion de prueba: si otra la tomo, probar el siguiente
+            trial = self._health.acquire(backend.url)
+            if trial is not None:
+                return backend, trial
+        retry_after = min(self._health.retry_after(b.url) for b in self._backends)
+        raise CircuitOpenError(f"Ningun backend de '{self.service_type}' disponible (circuito abierto)", retry_after)
+
+    def _unreserve(self, backend: Backend, trial: int) -> None:
+        if self._health is not None:
+            self._health.release(backend.url, trial)
+        with self._lock:
+            backend.outstanding -= 1
+
+    def _finish(self, lease: Lease, elapsed: float, outcome: Optional[bool]) -> None:
+        """Free the slot and report the outcome (None: cancelled, no verdict)."""
+        backend = lease.backend
+        if outcome is False:
+            self.mark_failed(backend)
+        if self._health is not None:
+            if outcome is None:
+                self._health.release(backend.url, lease.trial)
+            else:
+                self._health.record(backend.url, outcome)
+        backend.limiter.release(elapsed)
+        with self._lock:
+            backend.outstanding -= 1
+            if backend.ewma_latency == 0.0:
+                backend.ewma_latency = elapsed
+            else:
+                backend.ewma_latency += self._alpha * (elapsed - backend.ewma_latency)
+
+    def mark_failed(self, backend: Backend) -> None:
+        """Record a failed request on a backend."""
+        with self._lock:
+            backend.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state of the pool."""
+        with self._lock:
+            backends = [b.to_dict() for b in self._backends]
+        if self._health is not None:
+            for backend in backends:
+                backend["circuit"] = self._health.circuit(backend["url"])
+        return {"strategy": self._strategy, "backends": backends}
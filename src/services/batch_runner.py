@@ -0,0 +1,134 @@
+"""Bulk inference: a stream of prompts spread over every backend."""
+
+import json
+import queue
+import threading
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+Record = Union[str, bytes, Dict[str, Any]]
+
+
+class BatchRunner:
+    """Run batch records on fixed sets of backend slots, one worker thread each.
+
+    ``slots`` maps a route key (e.g. a service type) to its slots and
+    ``route`` gives each record's key, so a record only runs on slots of its
+    own route. Workers pull from small bounded queues fed from the input, so
+    a faster backend takes more records and the input is read only as fast
+    as it is processed. Results carry the record's ``id`` and are yielded in
+    completion order. Closing the result iterator stops reading the input;
+    records already running finish first.
+    """
+
+    def __init__(self, run_one: Callable[[Dict[str, Any], Tuple], Dict[str, Any]],
+                 slots: Dict[str, List[Tuple]], route: Callable[[Dict[str, Any]], str]):
+        self._run_one = run_one
+        self._slots = {key: group for key, group in slots.items() if group}
+        self._route = route
+
+    @staticmethod
+    def _parse(index: int, record: Record, defaults: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]],
+                                                                             Optional[Dict[str, Any]]]:
+        """Return (record, None) or (None, error result); blank lines give (None, None)."""
+        if isinstance(record, (str, bytes)):
+            if not record.strip():
+                return None, None
+            try:
+                record = json.loads(record)
+            except ValueError as e:
+                return None, {"id": index, "success": False, "error": f"JSON invalido: {e}"}
+        if not isinstance(record, dict):
+            return None, {"id": index, "success": False, "error": "Cada linea debe ser un objeto JSON"}
+
+        record_id = record.get("id", index)
+        message = record.get("message") or record.get("prompt")
+        model = record.get("model") or defaults.get("model")
+        if not message or not model:
+            return None, {"id": record_id, "success": False, "error": "Mensaje y modelo requeridos"}
+        options = {**(defaults.get("options") or {}), **(record.get("options") or {})}
+        return {
+            "id": record_id,
+            "message": message,
+            "model": model,
+            "service_type": record.get("service_type") or defaults.get("service_type") or "general",
+            "options": options or None
+        }, None
+
+    def run(self, records: Iterable[Record], defaults: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield one result per input record, in completion order.
+
+        ``records`` are dicts or JSON lines with ``message`` (or ``prompt``)
+        and optionally ``id``, ``model``, ``service_type`` and ``options``;
+        ``defaults`` fills the missing fields. Records without ``id`` are
+        numbered by position (from 1).
+        """
+        defaults = defaults or {}
+        inboxes = {key: queue.Queue(maxsize=2 * len(group)) for key, group in self._slots.items()}
+        outbox: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        def _put(inbox: queue.Queue, item) -> bool:
+            # Con la cola llena, volver a mirar cada tanto si el lote se cancelo
+            while not stop.is_set():
+                try:
+                    inbox.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _feed():
+            try:
+                for index, record in enumerate(records, start=1):
+                    if stop.is_set():
+                        break
+                    parsed, error = self._parse(index, record, defaults)
+                    if parsed is not None:
+                        key = self._route(parsed)
+                        if key not in inboxes:
+                            error = {"id": parsed["id"], "success": False,
+                                     "error": f"Ningun backend de '{key}' admite lotes (requiere max_parallel >= 2)"}
+                        elif not _put(inboxes[key], parsed):
+                            break
+                    if error is not None:
+                        outbox.put(error)
+            except Exception as e:
+                print(f"Error reading batch input: {e}")
+                outbox.put({"id": None, "success": False, "error": f"Error leyendo la entrada: {e}"})
+            finally:
+                for key, group in self._slots.items():
+                    for _ in group:
+                        _put(inboxes[key], None)
+                outbox.put(None)
+
+        def _work(inbox: queue.Queue, slot):
+            try:
+                while not stop.is_set():
+                    try:
+                        record = inbox.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if record is None:
+                        break
+                    result = self._run_one(record, slot)
+                    outbox.put({"id": record["id"], **{k: v for k, v in result.items() if k != "context"}})
+            finally:
+                outbox.put(None)
+
+        threading.Thread(target=_feed, name="batch-feed", daemon=True).start()
+        running = 1  # el lector tambien avisa al terminar
+        for key, group in self._slots.items():
+            for number, slot in enumerate(group):
+                threading.Thread(target=_work, args=(inboxes[key], slot), name=f"batch-{key}-{number}",
+                                 daemon=True).start()
+                running += 1
+
+        try:
+            while running:
+                result = outbox.get()
+                if result is None:
+                    running -= 1
+                    continue
+                yield result
+        finally:
+            stop.set()
@@ -1,36 +1,154 @@
 """Chat history service implementation."""
 
-from typing import List, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime
 
 from ..core.interfaces import ChatHistoryInterface
+from ..config.settings import Settings
+
+
+class _Message:
+    """Compact record of one chat message."""
+
+    __slots__ = ("seq", "type", "content", "model", "service", "timestamp")
+
+    def __init__(self, seq: int, message: Dict[str, Any], timestamp: float):
+        self.seq = seq
+        self.type = message.get("type", "")
+        self.content = message.get("content", "")
+        self.model = message.get("model", "")
+        self.service = message.get("service", "")
+        self.timestamp = timestamp
+
+    def to_dict(self, session_id: str) -> Dict[str, Any]:
+        return {
+            "id": self.seq,
+            "type": self.type,
+            "content": self.content,
+            "model": self.model,
+            "service": self.service,
+            "session": session_id,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+
+class _SessionLog:
+    """Fixed-size ring buffer of messages for one session."""
+
+    __slots__ = ("buffer", "capacity", "next_seq", "updated")
+
+    def __init__(self, capacity: int):
+        self.buffer: List[_Message] = []
+        self.capacity = capacity
+        self.next_seq = 0
+        self.updated = time.monotonic()
+
+    def append(self, message: Dict[str, Any]) -> None:
+        record = _Message(self.next_seq, message, time.time())
+        if len(self.buffer) < self.capacity:
+            self.buffer.append(record)
+        else:
+            # Buffer lleno: sobrescribir el mensaje mas antiguo
+            self.buffer[self.next_seq % self.capacity] = record
+        self.next_seq += 1
+        self.updated = time.monotonic()
+
+    @property
+    def oldest_seq(self) -> int:
+        return max(0, self.next_seq - self.capacity)
+
+    def page(self, limit: int, before: Optional[int]) -> List[_Message]:
+        """Return up to ``limit`` messages older than ``before`` in O(limit)."""
+        end = self.next_seq if before is None else min(before, self.next_seq)
+        start = max(self.oldest_seq, end - limit)
+        return [self.buffer[seq % self.capacity] for seq in range(start, end)]
 
 
 class ChatHistory(ChatHistoryInterface):
-    """Implementation of chat history operations using Singleton pattern."""
-    
+    """Implementation of chat history operations using Singleton pattern.
+
+    History is sharded by session id; each session keeps at most
+    ``history_max_messages`` in a ring buffer and idle sessions are evicted.
+    """
+
     _instance = None
     _initialized = False
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
-    
+
     def __init__(self):
         if not self._initialized:
-            self._messages: List[Dict[str, Any]] = []
+            self._settings = Settings()
+            self._sessions: "OrderedDict[str, _SessionLog]" = OrderedDict()
+            self._lock = threading.Lock()
             ChatHistory._initialized = True
-    
+
     def add_message(self, message: Dict[str, Any]) -> None:
-        """Add message to history."""
-        message["timestamp"] = datetime.now().isoformat()
-        self._messages.append(message)
-    
-    def get_history(self) -> List[Dict[str, Any]]:
-        """Get chat history."""
-        return self._messages.copy()
-    
-    def clear_history(self) -> None:
-        """Clear chat history."""
-        self._messages.clear() 
\ No newline at end of file
+        """Add message to its session history."""
+        session_id = message.get("session", "default")
+        with self._lock:
+            log = self._sessions.get(session_id)
+            if log is None:
+                log = _SessionLog(self._settings.history_max_messages)
+                self._sessions[session_id] = log
+            else:
+                self._sessions.move_to_end(session_id)
+            log.append(message)
+            self._evict()
+
+    def get_history(self, session_id: str = "default", limit: int = 50,
+                    before: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of a session's history, oldest first.
+
+        ``next_cursor`` is passed back as ``before`` to fetch older messages.
+        """
+        with self._lock:
+            log = self._sessions.get(session_id)
+            if log is None:
+                return {"session_id": session_id, "messages": [], "next_cursor": None}
+            records = log.page(limit, before)
+            oldest_seq = log.oldest_seq
+
+        messages = [record.to_dict(session_id) for record in records]
+        next_cursor = records[0].seq if records and records[0].seq > oldest_seq else None
+        return {"session_id": session_id, "messages": messages, "next_cursor": next_cursor}
+
+    def clear_history(self, session_id: Optional[str] = None) -> None:
+        """Clear one session's history, or all of it."""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def export_history(self, session_id: Optional[str] = None, model: Optional[str] = None,
+                       since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Stream messages still held in memory, optionally filtered."""
+        with self._lock:
+            sessions = [(sid, log.page(log.capacity, None))
+                        for sid, log in self._sessions.items()
+                        if session_id is None or sid == session_id]
+        for sid, records in sessions:
+            for record in records:
+                if model is not None and record.model != model:
+                    continue
+                if since is not None and record.timestamp < since:
+                    continue
+                yield record.to_dict(sid)
+
+    def _evict(self) -> None:
+        """Drop idle sessions and the least recently used beyond the cap."""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if (len(self._sessions) > self._settings.history_max_sessions or
+                    now - oldest.updated > self._settings.history_idle_timeout):
+                del self._sessions[session_id]
+            else:
+                break
@@ -0,0 +1,189 @@
+"""Incremental follower of the Ollama container log."""
+
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+# Un solo patron por linea: cada alternativa nombra sus grupos "categoria__dato".
+# El orden importa cuando un patron contiene a otro ("prompt eval time" antes que "eval time").
+# Las claves GGUF terminan en \b: "head_count" no debe tomar la linea de "head_count_kv".
+# total/available sueltos son de la GPU, no los "memory.available=..." de la linea de offload.
+_FACT_PATTERNS = [
+    # GPU
+    r"Device \d+: (?P<gpu__name>.+?), compute capability (?P<gpu__compute_capability>\d+\.\d+)",
+    r'(?<!\.)total="(?P<gpu__total_memory>[^"]+)"',
+    r'(?<!\.)available="(?P<gpu__available_memory>[^"]+)"',
+    r"CUDA\.0\.ARCHS=(?P<gpu__cuda_version>[0-9,]+)",
+    r"driver=(?P<gpu__driver_version>\d+\.\d+)",
+    # Modelo
+    r"general\.architecture\b.*?=\s*(?P<model__architecture>\w+)",
+    r"general\.name\b.*?=\s*(?P<model__name>.+)",
+    r"llama\.context_length\b.*?=\s*(?P<model__context_length>\d+)",
+    r"llama\.embedding_length\b.*?=\s*(?P<model__embedding_length>\d+)",
+    r"llama\.block_count\b.*?=\s*(?P<model__block_count>\d+)",
+    r"llama\.attention\.head_count\b.*?=\s*(?P<model__attention_heads>\d+)",
+    r"file size\s*=\s*(?P<model__file_size>[\d.]+ \w+)",
+    r"model params\s*=\s*(?P<model__model_params>[\d.]+ \w+)",
+    r"file type\s*=\s*(?P<model__quantization>\w+)",
+    r"n_vocab\s*=\s*(?P<model__vocab_size>\d+)",
+    # Memoria
+    r'memory\.required\.full="(?P<memory__gpu_memory_required>[^"]+)"',
+    r'memory\.required\.allocations="\[(?P<memory__gpu_memory_allocated>[^\]]+)\]"',
+    r'memory\.weights\.total="(?P<memory__weights_total>[^"]+)"',
+    r'memory\.required\.kv="(?P<memory__kv_memory>[^"]+)"',
+    r'memory\.graph\.full="(?P<memory__graph_memory>[^"]+)"',
+    r"CUDA0 model buffer size\s*=\s*(?P<memory__cuda_buffer>[\d.]+ \w+)",
+    r"CUDA0 KV buffer size\s*=\s*(?P<memory__kv_buffer>[\d.]+ \w+)",
+    r"CUDA0 compute buffer size\s*=\s*(?P<memory__compute_buffer>[\d.]+ \w+)",
+    r"offloaded (?P<memory__layers_offloaded>\d+/\d+) layers to GPU",
+    # Rendimiento
+    r"load time\s*=\s*(?P<performance__load_time>[\d.]+ ms)",
+    r"sample time\s*=\s*(?P<performance__sample_time>[\d.]+ ms)",
+    r"prompt eval time\s*=\s*(?P<performance__prompt_eval_time>[\d.]+ ms)",
+    r"eval time\s*=\s*(?P<performance__eval_time>[\d.]+ ms)",
+    r"total time\s*=\s*(?P<performance__total_time>[\d.]+ ms)",
+    r"(?P<performance__tokens_per_second>\d+\.?\d*) tokens per second",
+    r"prompt eval count:\s*(?P<performance__prompt_tokens>\d+)",
+    r"eval count:\s*(?P<performance__generated_tokens>\d+)",
+    r"inference:\s*(?P<performance__inference_speed>[\d.]+ ms/token)",
+    r"batch size:\s*(?P<performance__batch_size>\d+)",
+]
+_FACTS_RE = re.compile("|".join(_FACT_PATTERNS))
+
+CATEGORIES = ("gpu", "model", "memory", "performance")
+
+
+def parse_line(line: str) -> Dict[str, Dict[str, str]]:
+    """Extract every known fact from one log line, grouped by category."""
+    facts: Dict[str, Dict[str, str]] = {}
+    # Los logs de acceso HTTP son la mayoria de las lineas y no traen datos
+    if line.startswith("[GIN]"):
+        return facts
+    for match in _FACTS_RE.finditer(line):
+        for name, value in match.groupdict().items():
+            if value is not None:
+                category, key = name.split("__", 1)
+                facts.setdefault(category, {})[key] = value.strip()
+    return facts
+
+
+class ContainerLogFollower:
+    """Follow ``docker logs`` of a container and keep the latest parsed facts.
+
+    One long-lived ``docker logs --follow`` process feeds a background
+    thread that parses each line once. Lines with facts become structured
+    events in a bounded ring buffer, and the latest value of every fact is
+    kept per category so readers never touch the log text.
+    """
+
+    ATTACH_GRACE = 2.0  # Segundos vivo para dar por buena una (re)conexion
+
+    def __init__(self, container: str, max_events: int = 1000, backfill_lines: int = 2000,
+                 reconnect_delay: float = 30.0):
+        self._container = container
+        self._backfill_lines = backfill_lines
+        self._reconnect_delay = reconnect_delay
+        self._lock = threading.Lock()
+        self._events: deque = deque(maxlen=max_events)
+        self._latest: Dict[str, Dict[str, str]] = {category: {} for category in CATEGORIES}
+        self._lines = 0
+        self._last_line_at = 0.0
+        self._error: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start following the container log in the background."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="container-log-follower", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        process = self._process
+        if process is not None:
+            process.terminate()
+
+    def _command(self) -> List[str]:
+        command = ["docker", "logs", "--follow"]
+        if self._last_line_at:
+            # Reconexion: continuar desde la ultima linea leida
+            command += ["--since", str(int(self._last_line_at))]
+        else:
+            command += ["--tail", str(self._backfill_lines)]
+        return command + [self._container]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._process = subprocess.Popen(
+                    self._command(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, encoding="utf-8", errors="ignore", bufsize=1
+                )
+                attached_at = time.monotonic()
+                last_line = ""
+                for line in self._process.stdout:
+                    self.feed(line)
+                    last_line = line
+                    # stderr va mezclado con los logs: solo un proceso que sigue vivo limpia el error
+                    if self._error is not None and time.monotonic() - attached_at >= self.ATTACH_GRACE \
+                            and self._process.poll() is None:
+                        with self._lock:
+                            self._error = None
+                self._process.wait()
+                if self._process.returncode:
+                    # La ultima linea suele ser el error del daemon (p.ej. "No such container")
+                    self._error = f"docker logs termino con codigo {self._process.returncode}: {last_line.strip()}"
+            except Exception as e:
+                if self._error != str(e):
+                    print(f"Error following container logs: {e}")
+                self._error = str(e)
+            finally:
+                self._process = None
+            # El contenedor se detuvo o docker no esta disponible: reintentar mas tarde
+            self._stop.wait(self._reconnect_delay)
+
+    def feed(self, line: str) -> None:
+        """Parse one log line and record its facts."""
+        now = time.time()
+        facts = parse_line(line)
+        with self._lock:
+            self._lines += 1
+            self._last_line_at = now
+            if not facts:
+                return
+            for category, values in facts.items():
+                self._latest[category].update(values)
+            self._events.append({"time": now, "facts": facts})
+
+    def latest(self) -> Dict[str, Dict[str, str]]:
+        """Latest value of every fact, grouped by category."""
+        with self._lock:
+            return {category: dict(values) for category, values in self._latest.items()}
+
+    def events(self, limit: int = 100, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent structured events, newest first."""
+        with self._lock:
+            result = []
+            for event in reversed(self._events):
+                if category is None or category in event["facts"]:
+                    result.append(event)
+                    if len(result) >= limit:
+                        break
+            return result
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "container": self._container,
+                "following": self._process is not None,
+                "lines": self._lines,
+                "events": len(self._events),
+                "last_line_at": self._last_line_at,
+                "error": self._error
+            }
@@ -0,0 +1,90 @@
+"""Conversation memory service implementation."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from ..core.interfaces import ConversationMemoryInterface
+from ..config.settings import Settings
+
+
+class _Conversation:
+    """Ollama context kept for one session."""
+
+    __slots__ = ("model", "service_type", "context", "turns", "updated")
+
+    def __init__(self, model: str, service_type: str, context: List[int]):
+        self.model = model
+        self.service_type = service_type
+        self.context = context
+        self.turns = 1
+        self.updated = time.monotonic()
+
+
+class ConversationMemory(ConversationMemoryInterface):
+    """Keep the ``context`` returned by Ollama per session so follow-up turns
+    continue the conversation instead of re-sending the whole transcript.
+
+    Sessions are evicted LRU once ``conversation_max_sessions`` is reached and
+    after ``conversation_idle_timeout`` seconds without activity.
+    """
+
+    def __init__(self):
+        self._settings = Settings()
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_context(self, session_id: str, model: str, service_type: str) -> Optional[List[int]]:
+        """Get the stored context if it belongs to the same model."""
+        with self._lock:
+            conversation = self._conversations.get(session_id)
+            if conversation is None:
+                return None
+            if time.monotonic() - conversation.updated > self._settings.conversation_idle_timeout:
+                del self._conversations[session_id]
+                return None
+            # El context son tokens del modelo: no sirve si el modelo cambio
+            if conversation.model != model:
+                return None
+            self._conversations.move_to_end(session_id)
+            return conversation.context
+
+    def save_context(self, session_id: str, model: str, service_type: str, context: List[int]) -> None:
+        """Store the context returned by the latest turn."""
+        if not context:
+            return
+        with self._lock:
+            conversation = self._conversations.get(session_id)
+            if conversation is not None and conversation.model == model:
+                conversation.context = context
+                conversation.service_type = service_type
+                conversation.turns += 1
+                conversation.updated = time.monotonic()
+                self._conversations.move_to_end(session_id)
+            else:
+                self._conversations[session_id] = _Conversation(model, service_type, context)
+                self._conversations.move_to_end(session_id)
+            self._evict()
+
+    def clear_session(self, session_id: str) -> None:
+        """Forget the context of one session."""
+        with self._lock:
+            self._conversations.pop(session_id, None)
+
+    def clear_all(self) -> None:
+        """Forget every session."""
+        with self._lock:
+            self._conversations.clear()
+
+    def _evict(self) -> None:
+        """Drop idle sessions and the least recently used beyond the cap."""
+        now = time.monotonic()
+        idle_timeout = self._settings.conversation_idle_timeout
+        while self._conversations:
+            session_id, oldest = next(iter(self._conversations.items()))
+            if (len(self._conversations) > self._settings.conversation_max_sessions or
+                    now - oldest.updated > idle_timeout):
+                del self._conversations[session_id]
+            else:
+                break
@@ -1,84 +1,262 @@
 """Docker commands service implementation."""
 
 import subprocess
-import requests
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+import docker
+from docker.utils import kwargs_from_env
 
 from ..core.interfaces import DockerCommandsInterface
 from ..config.settings import Settings
+from .service_probe import ServiceProbe
+
+# Accion del evento de Docker -> estado del contenedor
+_EVENT_STATES = {
+    "create": "created",
+    "start": "running",
+    "restart": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "die": "exited",
+    "stop": "exited",
+    "destroy": "missing"
+}
 
 
 class DockerCommandsService(DockerCommandsInterface):
-    """Implementation of Docker commands operations."""
-    
+    """Docker control through one persistent Engine API client.
+
+    A background thread follows the container event stream and keeps an
+    in-memory status table, so status reads never call Docker. Start, stop
+    and restart act on the compose services' containers in parallel; only
+    containers that do not exist yet are created with ``docker-compose``.
+    ``docker_base_url`` can point at a stand-in API
+    (``benchmarks/fake_docker.py``).
+    """
+
     def __init__(self):
         self._settings = Settings()
-    
+        self._probe = ServiceProbe()
+        # container_name -> servicio de compose
+        self._services = {name: service for service, name in self._settings.docker_services.items()}
+        self._lock = threading.Lock()
+        self._client: Optional[docker.APIClient] = None
+        self._containers: Dict[str, Dict[str, Any]] = {}
+        self._synced_at: Optional[float] = None
+        self._engine_error: Optional[str] = None
+        self._events = None
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self._services)), thread_name_prefix="docker")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _get_client(self) -> docker.APIClient:
+        with self._lock:
+            if self._client is None:
+                kwargs = {"base_url": self._settings.docker_base_url} if self._settings.docker_base_url \
+                    else kwargs_from_env()
+                self._client = docker.APIClient(version="auto", timeout=self._settings.docker_api_timeout, **kwargs)
+            return self._client
+
+    def start_background_tasks(self) -> None:
+        """Start following the container event stream."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name="docker-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        events = self._events
+        if events is not None:
+            events.close()
+
+    def _watch(self) -> None:
+        while not self._stop.is_set():
+            try:
+                client = self._get_client()
+                # Eventos desde antes del listado: lo que pase entre medio se aplica dos veces, no se pierde
+                since = int(time.time())
+                self._sync(client)
+                self._events = client.events(since=since, decode=True, filters={"type": "container"})
+                for event in self._events:
+                    self._apply(event)
+                if not self._stop.is_set():
+                    raise ConnectionError("El stream de eventos de Docker se cerro")
+            except Exception as e:
+                self._set_engine_error(str(e))
+                with self._lock:
+                    self._client = None
+            finally:
+                self._events = None
+            if self._stop.wait(self._settings.docker_reconnect_delay):
+                break
+
+    def _set_engine_error(self, error: Optional[str]) -> None:
+        if error and error != self._engine_error:
+            print(f"Error following Docker events: {error}")
+        self._engine_error = error
+
+    def _sync(self, client: docker.APIClient) -> None:
+        """Rebuild the status table from a container listing."""
+        found = {}
+        for container in client.containers(all=True, filters={"name": list(self._services)}):
+            for name in container.get("Names", []):
+                name = name.lstrip("/")
+                if name in self._services:
+                    found[name] = container
+        now = time.time()
+        table = {}
+        for name, service in self._services.items():
+            container = found.get(name)
+            table[name] = {
+                "name": name,
+                "service": service,
+                "id": container["Id"][:12] if container else None,
+                "image": container.get("Image") if container else None,
+                "state": container.get("State", "unknown") if container else "missing",
+                "health": None,
+                "updated_at": now
+            }
+        with self._lock:
+            self._containers = table
+            self._synced_at = now
+        self._set_engine_error(None)
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        """Update the status table from one container event."""
+        attributes = event.get("Actor", {}).get("Attributes", {})
+        name = attributes.get("name")
+        if name not in self._services:
+            return
+        action = event.get("Action") or event.get("status", "")
+        with self._lock:
+            entry = self._containers.get(name)
+            if entry is None:
+                return
+            if action.startswith("health_status:"):
+                entry["health"] = action.split(":", 1)[1].strip()
+            elif action in _EVENT_STATES:
+                entry["state"] = _EVENT_STATES[action]
+                if action == "create":
+                    entry["id"] = event.get("id", "")[:12]
+                    entry["image"] = attributes.get("image")
+            else:
+                return
+            entry["updated_at"] = event.get("time", time.time())
+
+    def _ensure_synced(self, client: docker.APIClient) -> None:
+        if self._synced_at is None:
+            self._sync(client)
+
+    def _names_in_state(self, *states: str, exclude: bool = False) -> List[str]:
+        with self._lock:
+            return [
+                name for name, entry in self._containers.items()
+                if (entry["state"] in states) != exclude
+            ]
+
+    def _run_parallel(self, names: List[str], action: Callable[[str], None]) -> Dict[str, str]:
+        """Run ``action`` on every container at once; returns name -> "ok" or error."""
+        futures = {name: self._executor.submit(action, name) for name in names}
+        results = {}
+        for name, future in futures.items():
+            try:
+                future.result()
+                results[name] = "ok"
+            except Exception as e:
+                results[name] = str(e)
+        return results
+
+    @staticmethod
+    def _outcome(results: Dict[str, str], message: str) -> Dict[str, Any]:
+        failed = {name: error for name, error in results.items() if error != "ok"}
+        if failed:
+            return {"success": False, "error": "; ".join(f"{n}: {e}" for n, e in failed.items()),
+                    "containers": results}
+        return {"success": True, "message": message, "containers": results}
+
+    def _create_missing(self, client: docker.APIClient) -> Optional[str]:
+        """Create default services that have no container yet (only case that needs compose)."""
+        missing = [
+            service for service in self._settings.docker_default_services
+            if self._settings.docker_services.get(service) in self._names_in_state("missing")
+        ]
+        if not missing:
+            return None
+        result = subprocess.run(["docker-compose", "up", "--no-start", *missing],
+                                capture_output=True, text=True, timeout=120)
+        if result.returncode != 0:
+            return result.stderr
+        self._sync(client)
+        return None
+
     def start_services(self) -> Dict[str, Any]:
         """Start all Docker services."""
         try:
-            result = subprocess.run(["docker-compose", "up", "-d"], 
-                                  capture_output=True, text=True, timeout=30)
-            if result.returncode == 0:
-                return {"success": True, "message": "Servicios iniciados correctamente"}
-            else:
-                return {"success": False, "error": result.stderr}
+            client = self._get_client()
+            self._ensure_synced(client)
+            error = self._create_missing(client)
+            if error:
+                return {"success": False, "error": error}
+            names = self._names_in_state("missing", "running", exclude=True)
+            results = self._run_parallel(names, client.start)
+            return self._outcome(results, "Servicios iniciados correctamente")
         except Exception as e:
             return {"success": False, "error": str(e)}
-    
+
     def stop_services(self) -> Dict[str, Any]:
         """Stop all Docker services."""
         try:
-            result = subprocess.run(["docker-compose", "down"], 
-                                  capture_output=True, text=True, timeout=30)
-            if result.returncode == 0:
-                return {"success": True, "message": "Servicios detenidos correctamente"}
-            else:
-                return {"success": False, "error": result.stderr}
+            client = self._get_client()
+            self._ensure_synced(client)
+            names = self._names_in_state("running", "paused", "restarting")
+            results = self._run_parallel(
+                names, lambda name: client.stop(name, timeout=self._settings.docker_stop_timeout)
+            )
+            return self._outcome(results, "Servicios detenidos correctamente")
         except Exception as e:
             return {"success": False, "error": str(e)}
-    
+
     def restart_services(self) -> Dict[str, Any]:
         """Restart all Docker services."""
         try:
-            result = subprocess.run(["docker-compose", "restart"], 
-                                  capture_output=True, text=True, timeout=60)
-            if result.returncode == 0:
-                return {"success": True, "message": "Servicios reiniciados correctamente"}
-            else:
-                return {"success": False, "error": result.stderr}
+            client = self._get_client()
+            self._ensure_synced(client)
+            names = self._names_in_state("missing", exclude=True)
+            results = self._run_parallel(
+                names, lambda name: client.restart(name, timeout=self._settings.docker_stop_timeout)
+            )
+            return self._outcome(results, "Servicios reiniciados correctamente")
         except Exception as e:
             return {"success": False, "error": str(e)}
-    
+
     def get_container_status(self) -> Dict[str, Any]:
-        """Get status of Docker containers."""
-        try:
-            result = subprocess.run(["docker-compose", "ps", "--format", "json"], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                return {"success": True, "status": result.stdout}
-            else:
-                return {"success": False, "error": result.stderr}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-    
+        """Get status of Docker containers (from the event-fed table)."""
+        with self._lock:
+            containers = [dict(entry) for entry in self._containers.values()]
+            synced_at = self._synced_at
+        status = {"success": self._engine_error is None and synced_at is not None,
+                  "containers": containers, "synced_at": synced_at}
+        if self._engine_error:
+            status["error"] = f"Docker no disponible: {self._engine_error}"
+        elif synced_at is None:
+            status["error"] = "Estado de Docker aun no sincronizado"
+        return status
+
     def test_connection(self) -> Dict[str, Any]:
-        """Test connectivity with all services."""
+        """Test connectivity with all services (probed in parallel)."""
         results = {}
-        services = {
-            "General": "http://localhost:11434",
-            "Code": "http://localhost:11435", 
-            "Text": "http://localhost:11436"
-        }
-        
-        for name, url in services.items():
-            try:
-                response = requests.get(f"{url}/api/tags", timeout=5)
-                if response.status_code == 200:
-                    results[name] = {"status": "connected", "models": len(response.json().get("models", []))}
-                else:
-                    results[name] = {"status": "error", "code": response.status_code}
-            except Exception as e:
-                results[name] = {"status": "unavailable", "error": str(e)}
-        
-        return {"success": True, "connections": results} 
\ No newline at end of file
+
+        for service_name, probe in self._probe.probe_all().items():
+            name = service_name.capitalize()
+            if not probe["reachable"]:
+                results[name] = {"status": "unavailable", "error": probe.get("error", "")}
+            elif probe["status_code"] == 200:
+                results[name] = {"status": "connected", "models": probe["models"], "latency_ms": probe["latency_ms"]}
+            else:
+                results[name] = {"status": "error", "code": probe["status_code"]}
+
+        return {"success": True, "connections": results}
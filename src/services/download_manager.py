@@ -0,0 +1,246 @@
+"""Managed model downloads with streamed progress."""
+
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+import requests
+
+from ..config.settings import Settings
+
+
+class _DownloadJob:
+    """State of one model pull."""
+
+    __slots__ = ("id", "model", "service_type", "backend", "status", "message", "layers",
+                 "bytes_per_second", "created", "started", "finished", "error", "version",
+                 "_rate_bytes", "_rate_time")
+
+    def __init__(self, job_id: str, model: str, service_type: str, backend: str):
+        self.id = job_id
+        self.model = model
+        self.service_type = service_type
+        self.backend = backend
+        self.status = "queued"          # queued -> downloading -> completed | failed
+        self.message = "En cola"
+        self.layers: Dict[str, List[int]] = {}  # digest -> [total, completed]
+        self.bytes_per_second = 0.0
+        self.created = time.time()
+        self.started = 0.0
+        self.finished = 0.0
+        self.error: Optional[str] = None
+        self.version = 0
+        self._rate_bytes = 0
+        self._rate_time = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "downloading")
+
+    def totals(self):
+        total = sum(layer[0] for layer in self.layers.values())
+        completed = sum(layer[1] for layer in self.layers.values())
+        return total, completed
+
+    def to_dict(self) -> Dict[str, Any]:
+        total, completed = self.totals()
+        remaining = total - completed
+        return {
+            "job_id": self.id,
+            "model": self.model,
+            "service": self.service_type,
+            "backend": self.backend,
+            "status": self.status,
+            "message": self.message,
+            "total": total,
+            "completed": completed,
+            "percent": round(completed * 100 / total, 1) if total else 0.0,
+            "bytes_per_second": round(self.bytes_per_second),
+            "eta_seconds": round(remaining / self.bytes_per_second) if self.bytes_per_second and remaining else None,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error
+        }
+
+
+class DownloadManager:
+    """Run model pulls as tracked jobs.
+
+    Each job streams ``/api/pull`` and folds the NDJSON progress lines into
+    per-layer byte counts as they arrive. A model already being pulled is
+    not pulled again: the caller gets the running job. All backends share
+    the ``ollama_data`` volume, so a model is deduplicated across services
+    too. At most ``max_pulls_per_backend`` pulls run on one backend; the
+    rest wait queued.
+    """
+
+    # Ventana minima para medir throughput (segundos)
+    RATE_WINDOW = 0.5
+    ALPHA = 0.3
+
+    def __init__(self, session: requests.Session, backends_by_service: Dict[str, List[str]],
+                 on_complete: Optional[Callable[[str], None]] = None):
+        self._settings = Settings()
+        self._session = session
+        self._backends_by_service = backends_by_service
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs: "OrderedDict[str, _DownloadJob]" = OrderedDict()
+        self._active_by_model: Dict[str, _DownloadJob] = {}
+        self._slots = {
+            url: threading.BoundedSemaphore(self._settings.max_pulls_per_backend)
+            for urls in backends_by_service.values() for url in urls
+        }
+        self._ids = itertools.count(1)
+
+    def start(self, model: str, service_type: str = "general") -> Dict[str, Any]:
+        """Start pulling a model, or return the job already pulling it."""
+        with self._lock:
+            job = self._active_by_model.get(model)
+            if job is not None:
+                return {"success": True, "deduplicated": True, **job.to_dict(),
+                        "message": f"{model} ya se esta descargando"}
+            backend = self._pick_backend(service_type)
+            job = _DownloadJob(f"dl-{next(self._ids)}", model, service_type, backend)
+            self._jobs[job.id] = job
+            self._active_by_model[model] = job
+            self._prune()
+
+        threading.Thread(target=self._run, args=(job,), name=f"pull-{job.id}", daemon=True).start()
+        return {"success": True, "deduplicated": False, **job.to_dict(),
+                "message": f"Descarga de {model} iniciada"}
+
+    def _pick_backend(self, service_type: str) -> str:
+        """Backend of the service with the fewest pulls running or queued."""
+        urls = self._backends_by_service.get(service_type) or self._backends_by_service["general"]
+        busy = {url: 0 for url in urls}
+        for job in self._active_by_model.values():
+            if job.backend in busy:
+                busy[job.backend] += 1
+        return min(urls, key=lambda url: busy[url])
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond the history size."""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self._settings.download_history_size)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: _DownloadJob) -> None:
+        with self._slots[job.backend]:
+            self._update(job, status="downloading", message="Iniciando descarga", started=time.time())
+            try:
+                self._pull(job)
+            except Exception as e:
+                self._finish(job, error=str(e))
+                return
+        if self._on_complete:
+            self._on_complete(job.model)
+
+    def _pull(self, job: _DownloadJob) -> None:
+        response = self._session.post(
+            f"{job.backend}/api/pull",
+            json={"name": job.model, "stream": True},
+            stream=True,
+            # pull_timeout limita el silencio entre lineas, no la descarga completa
+            timeout=(self._settings.connection_timeout, self._settings.pull_timeout)
+        )
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(f"Error descargando modelo: {response.status_code}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                progress = json.loads(line)
+                if "error" in progress:
+                    raise RuntimeError(progress["error"])
+                self._apply(job, progress)
+                if progress.get("status") == "success":
+                    self._finish(job)
+                    return
+        raise RuntimeError("Descarga interrumpida sin confirmacion de Ollama")
+
+    def _apply(self, job: _DownloadJob, progress: Dict[str, Any]) -> None:
+        """Fold one progress line into the job."""
+        now = time.time()
+        with self._lock:
+            job.message = progress.get("status", job.message)
+            digest = progress.get("digest")
+            if digest and "total" in progress:
+                job.layers[digest] = [progress["total"], progress.get("completed", 0)]
+                _, completed = job.totals()
+                if not job._rate_time:
+                    job._rate_bytes, job._rate_time = completed, now
+                elif now - job._rate_time >= self.RATE_WINDOW:
+                    rate = (completed - job._rate_bytes) / (now - job._rate_time)
+                    job.bytes_per_second = (rate if not job.bytes_per_second else
+                                            job.bytes_per_second + self.ALPHA * (rate - job.bytes_per_second))
+                    job._rate_bytes, job._rate_time = completed, now
+            job.version += 1
+            self._changed.notify_all()
+
+    def _update(self, job: _DownloadJob, **fields) -> None:
+        with self._lock:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _finish(self, job: _DownloadJob, error: Optional[str] = None) -> None:
+        with self._lock:
+            job.status = "failed" if error else "completed"
+            job.message = f"Error: {error}" if error else f"Modelo {job.model} descargado correctamente"
+            job.error = error
+            job.finished = time.time()
+            job.bytes_per_second = 0.0 if error else job.bytes_per_second
+            if self._active_by_model.get(job.model) is job:
+                del self._active_by_model[job.model]
+            job.version += 1
+            self._changed.notify_all()
+        if error:
+            print(f"Error pulling {job.model} on {job.backend}: {error}")
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """All tracked jobs, newest first."""
+        with self._lock:
+            return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until a job finishes; returns its final state."""
+        deadline = time.time() + timeout if timeout else None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            while job is not None and job.active:
+                remaining = deadline - time.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return job.to_dict() if job else None
+
+    def watch(self, job_id: str, heartbeat: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """Yield the job state on every change until it finishes."""
+        seen = -1
+        while True:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                # Otros jobs tambien notifican: esperar un cambio de este job
+                deadline = time.time() + heartbeat
+                while job.version == seen and job.active and time.time() < deadline:
+                    self._changed.wait(deadline - time.time())
+                snapshot = job.to_dict()
+                seen = job.version
+                active = job.active
+            yield snapshot
+            if not active:
+                return
@@ -0,0 +1,123 @@
+"""Hedged generations: a second backend when the first token is late."""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+
+PRIMARY, HEDGE = 0, 1
+
+
+class HedgePolicy:
+    """When to hedge and whether the load budget allows it.
+
+    The delay is a percentile of the model's recent time-to-first-token
+    (``default_delay`` until ``min_samples`` are known). The budget keeps
+    hedges at most ``budget`` of the hedge-eligible requests, counted with
+    an exponential decay over roughly the last ``window`` requests.
+    """
+
+    def __init__(self, percentile: float = 95, min_samples: int = 20, default_delay: float = 2.0,
+                 min_delay: float = 0.05, budget: float = 0.1, window: int = 1000):
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._default_delay = default_delay
+        self._min_delay = min_delay
+        self._budget = budget
+        self._decay = 1 - 1 / window
+        self._lock = threading.Lock()
+        self._ttft: Dict[str, deque] = {}
+        self._requests = 0.0
+        self._hedges = 0.0
+        self._outcomes = {"primary_won": 0, "hedge_won": 0, "over_budget": 0, "no_backend": 0}
+
+    def delay(self, model: str) -> float:
+        """Seconds to wait for the first token before hedging."""
+        with self._lock:
+            samples = sorted(self._ttft.get(model, ()))
+        if len(samples) < self._min_samples:
+            return self._default_delay
+        rank = math.ceil(self._percentile / 100 * len(samples))
+        return max(self._min_delay, samples[min(max(rank, 1), len(samples)) - 1])
+
+    def observe_ttft(self, model: str, seconds: float) -> None:
+        with self._lock:
+            series = self._ttft.get(model)
+            if series is None:
+                series = self._ttft[model] = deque(maxlen=200)
+            series.append(seconds)
+
+    def begin(self) -> None:
+        """Count one hedge-eligible request towards the budget."""
+        with self._lock:
+            self._requests = self._requests * self._decay + 1
+            self._hedges *= self._decay
+
+    def allow(self) -> bool:
+        """Take budget for one hedge, if the cap allows it."""
+        with self._lock:
+            if (self._hedges + 1) / self._requests > self._budget:
+                return False
+            self._hedges += 1
+            return True
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._outcomes[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hedge rate within the budget window, outcomes and current delays."""
+        with self._lock:
+            models = list(self._ttft)
+            stats = {
+                "budget": self._budget,
+                "hedge_rate": round(self._hedges / self._requests, 4) if self._requests else 0.0,
+                **self._outcomes
+            }
+        stats["delay_seconds"] = {model: round(self.delay(model), 3) for model in models}
+        return stats
+
+
+class HedgeRace:
+    """Which events of the primary and hedge streams reach the client.
+
+    Before a winner exists only the primary's ``admitted`` event is
+    forwarded, and an error from one copy is dropped while the other is
+    still running. The first copy to produce a token (or finish) wins; the
+    caller then cancels the other one.
+    """
+
+    def __init__(self):
+        self.winner: Optional[int] = None
+        self.active = {PRIMARY}
+        self.primary_backend: Optional[str] = None
+        self.hedged = False
+
+    def start_hedge(self) -> None:
+        self.active.add(HEDGE)
+        self.hedged = True
+
+    def feed(self, source: int, event: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[int]]:
+        """Return (forward the event, source to cancel). ``None`` marks a finished stream."""
+        if event is None:
+            self.active.discard(source)
+            return False, None
+        if self.winner is None:
+            kind = event.get("type")
+            if kind == "admitted":
+                if source == PRIMARY:
+                    self.primary_backend = event.get("backend")
+                    return True, None
+                return False, None
+            if kind == "error" and len(self.active) > 1:
+                # La otra copia sigue viva: este fallo no llega al cliente
+                self.active.discard(source)
+                return False, None
+            self.winner = source
+            other = HEDGE if source == PRIMARY else PRIMARY
+            return True, other if other in self.active else None
+        return source == self.winner, None
+
+    @property
+    def finished(self) -> bool:
+        return not self.active
@@ -0,0 +1,236 @@
+"""Counters and histograms exported in Prometheus text format."""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+QUEUE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+LOAD_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter family keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram family keyed by label values.
+
+    The bucket index is found outside the lock; the lock only covers the
+    three increments of one observation.
+    """
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [conteo por bucket (+Inf al final), suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(values, list(s[0]), s[1], s[2]) for values, s in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labels, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labels, values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class ServingMetrics:
+    """Serving metrics shared by the Ollama service and the web layer (Singleton).
+
+    The ``model`` label only takes installed models (registered from the
+    model list or proven by a successful generation); any other name the
+    client sends is counted as ``"other"``.
+    """
+
+    OTHER_MODEL = "other"
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            generation = ("model", "backend", "endpoint")
+            self.requests = Counter(
+                "ollama_generation_requests_total", "Generations by outcome.", generation + ("status",))
+            self.errors = Counter(
+                "ollama_generation_errors_total", "Failed or rejected generations.", generation)
+            self.cache_hits = Counter(
+                "ollama_cache_hits_total", "Responses served from a cache.", ("model", "cache"))
+            self.coalesced = Counter(
+                "ollama_coalesced_requests_total", "Requests attached to an identical in-flight generation.",
+                ("model", "endpoint"))
+            self.prompt_tokens = Counter(
+                "ollama_prompt_tokens_total", "Prompt tokens evaluated.", ("model", "backend"))
+            self.generated_tokens = Counter(
+                "ollama_generated_tokens_total", "Tokens generated.", ("model", "backend"))
+            self.latency = Histogram(
+                "ollama_request_duration_seconds", "End-to-end generation latency.", generation, LATENCY_BUCKETS)
+            self.ttft = Histogram(
+                "ollama_time_to_first_token_seconds", "Time to first streamed token.",
+                ("model", "backend"), TTFT_BUCKETS)
+            self.tokens_per_second = Histogram(
+                "ollama_tokens_per_second", "Generation speed (eval_count / eval_duration).",
+                ("model", "backend"), TOKENS_PER_SECOND_BUCKETS)
+            self.queue_wait = Histogram(
+                "ollama_queue_wait_seconds", "Time waiting for a backend slot.",
+                ("model", "backend"), QUEUE_BUCKETS)
+            self.load_duration = Histogram(
+                "ollama_load_duration_seconds", "Model load time reported by Ollama.",
+                ("model", "backend"), LOAD_BUCKETS)
+            self.gpu_seconds = Counter(
+                "ollama_generation_seconds_total", "Backend time spent generating (total_duration).",
+                ("model", "backend"))
+            self.cascade = Counter(
+                "ollama_cascade_total", "Cascade attempts on the fast model by outcome.",
+                ("model", "fast_model", "outcome"))
+            self.hedges = Counter(
+                "ollama_hedge_total", "Late first tokens by hedging outcome.", ("model", "outcome"))
+            self.http_requests = Counter(
+                "http_requests_total", "HTTP requests by route and status.", ("endpoint", "method", "status"))
+            self.http_latency = Histogram(
+                "http_request_duration_seconds", "HTTP request latency until the response is closed.",
+                ("endpoint", "method"), LATENCY_BUCKETS)
+            self._families = [
+                self.requests, self.errors, self.cache_hits, self.coalesced, self.prompt_tokens,
+                self.generated_tokens, self.latency, self.ttft, self.tokens_per_second,
+                self.queue_wait, self.load_duration, self.gpu_seconds, self.cascade,
+                self.hedges, self.http_requests, self.http_latency
+            ]
+            self._known_models = set()
+            ServingMetrics._initialized = True
+
+    def register_models(self, models) -> None:
+        """Mark installed models as valid ``model`` label values."""
+        self._known_models.update(models)
+
+    def model_label(self, model: str) -> str:
+        """``model`` if it is installed, else ``"other"`` (bounds label cardinality)."""
+        return model if model in self._known_models else self.OTHER_MODEL
+
+    def observe_generation(self, endpoint: str, model: str, result: Dict[str, Any], elapsed: float,
+                           ttft: Optional[float] = None) -> None:
+        """Record one finished generation from its result (or error) dict."""
+        backend = result.get("backend", "none")
+        if result.get("success"):
+            # Solo un modelo instalado puede generar una respuesta
+            self._known_models.add(model)
+        model = self.model_label(model)
+        if not result.get("success"):
+            status = "rejected" if "retry_after" in result else "error"
+            self.requests.inc(model, backend, endpoint, status)
+            self.errors.inc(model, backend, endpoint)
+            return
+
+        cached = result.get("cached")
+        status = "cached" if cached else "ok"
+        self.requests.inc(model, backend, endpoint, status)
+        self.latency.observe(elapsed, model, backend, endpoint)
+        if ttft is not None:
+            self.ttft.observe(ttft, model, backend)
+        if cached:
+            self.cache_hits.inc(model, "semantic" if cached == "semantic" else "exact")
+            return
+        if result.get("coalesced"):
+            # El lider ya registro los tiempos de Ollama de esta generacion
+            self.coalesced.inc(model, endpoint)
+            return
+
+        metrics = result.get("metrics", {})
+        eval_count = metrics.get("eval_count", 0)
+        eval_duration = metrics.get("eval_duration", 0)
+        if eval_count and eval_duration:
+            self.tokens_per_second.observe(eval_count / (eval_duration / 1e9), model, backend)
+        self.queue_wait.observe(metrics.get("queue_wait", 0) / 1e9, model, backend)
+        self.load_duration.observe(metrics.get("load_duration", 0) / 1e9, model, backend)
+        self.gpu_seconds.inc(model, backend, amount=metrics.get("total_duration", 0) / 1e9)
+        self.prompt_tokens.inc(model, backend, amount=metrics.get("prompt_eval_count", 0))
+        self.generated_tokens.inc(model, backend, amount=eval_count)
+
+    def observe_cascade(self, model: str, fast_model: str, fast_result: Dict[str, Any],
+                        reason: Optional[str]) -> None:
+        """Record a fast-model attempt; escalated attempts still cost backend time."""
+        if fast_result.get("success"):
+            self._known_models.add(fast_model)
+        model, fast_model = self.model_label(model), self.model_label(fast_model)
+        self.cascade.inc(model, fast_model, reason or "accepted")
+        if reason is not None and fast_result.get("success") and not fast_result.get("cached"):
+            backend = fast_result.get("backend", "none")
+            self.gpu_seconds.inc(fast_model, backend,
+                                 amount=fast_result.get("metrics", {}).get("total_duration", 0) / 1e9)
+
+    def observe_http(self, endpoint: str, method: str, status: int, elapsed: float) -> None:
+        self.http_requests.inc(endpoint, method, str(status))
+        self.http_latency.observe(elapsed, endpoint, method)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format."""
+        lines: List[str] = []
+        for family in self._families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
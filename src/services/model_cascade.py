@@ -0,0 +1,54 @@
+"""Small-model-first cascade for chat requests."""
+
+import re
+from typing import Dict, Any, Optional, Tuple
+
+# Frases de rechazo o baja confianza que justifican pasar al modelo grande
+_LOW_CONFIDENCE_RE = re.compile(
+    r"\b(no estoy seguro|no lo s[eé]|no s[eé]|no tengo (suficiente )?informaci[oó]n|"
+    r"no puedo (ayudar|responder)|lo siento, pero|"
+    r"i'?m not (sure|certain)|i don'?t know|i cannot|i can'?t (help|answer)|as an ai)\b",
+    re.IGNORECASE
+)
+
+
+class ModelCascade:
+    """Decide when a request can be answered by a faster model.
+
+    ``cascade_models`` maps a requested model to its fast model. The fast
+    answer is kept unless a cheap check fails: error, too short, cut at
+    ``num_predict``, or a refusal/low-confidence phrase. Each pair must share
+    a tokenizer, since the conversation ``context`` moves between them.
+    Only used when ``enabled`` or when the request opts in.
+    """
+
+    def __init__(self, cascade_models: Dict[str, str], min_chars: int = 20, enabled: bool = False):
+        self._cascade_models = cascade_models
+        self._min_chars = min_chars
+        self._enabled = enabled
+
+    def plan(self, model: str, options: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Return (fast_model or None, options without the cascade hint).
+
+        ``options["cascade"]`` is the client hint to turn the cascade on or
+        off for one request, overriding ``cascade_enabled``.
+        """
+        wanted = self._enabled
+        if options and "cascade" in options:
+            options = dict(options)
+            wanted = bool(options.pop("cascade"))
+        fast_model = self._cascade_models.get(model) if wanted else None
+        return fast_model, options
+
+    def escalation_reason(self, result: Dict[str, Any], num_predict: int) -> Optional[str]:
+        """Why the fast answer is not good enough, or None to keep it."""
+        if not result.get("success"):
+            return "error"
+        text = result.get("response", "").strip()
+        if len(text) < self._min_chars:
+            return "too_short"
+        if num_predict > 0 and result.get("metrics", {}).get("eval_count", 0) >= num_predict:
+            return "truncated"
+        if _LOW_CONFIDENCE_RE.search(text):
+            return "low_confidence"
+        return None
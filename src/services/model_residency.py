@@ -0,0 +1,146 @@
+"""Model warm-up and keep-alive manager."""
+
+import threading
+import time
+from collections import deque, defaultdict
+from typing import Dict, Any, Callable, List, Set
+
+import requests
+
+from ..config.settings import Settings
+
+
+class _ModelLoadStats:
+    """Load history of one model on one backend."""
+
+    __slots__ = ("requests", "load_samples", "cold_loads", "last_used", "last_warmup")
+
+    def __init__(self):
+        self.requests: deque = deque(maxlen=1000)     # timestamps de uso
+        self.load_samples: deque = deque(maxlen=100)  # (timestamp, load_duration ns)
+        self.cold_loads = 0
+        self.last_used = 0.0
+        self.last_warmup = 0.0
+
+
+class ModelResidencyManager:
+    """Keep frequently used models resident in Ollama.
+
+    Preloads configured models at startup, assigns a per-model
+    ``keep_alive``, records ``load_duration`` per model and backend, and
+    re-warms hot models in the background once Ollama has evicted them.
+    ``load(backend_url, model)`` performs the actual warm-up request and
+    returns whether the model was loaded.
+    """
+
+    # load_duration por encima de esto cuenta como carga en frio (ns)
+    COLD_LOAD_THRESHOLD = 500_000_000
+
+    def __init__(self, session: requests.Session, backends_by_service: Dict[str, List[str]],
+                 load: Callable[[str, str], bool]):
+        self._settings = Settings()
+        self._session = session
+        self._load = load
+        self._backends_by_service = backends_by_service
+        self._stats: Dict[tuple, _ModelLoadStats] = defaultdict(_ModelLoadStats)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def keep_alive_for(self, model: str) -> str:
+        """keep_alive to send with requests for a model."""
+        return self._settings.model_keep_alive.get(model, self._settings.default_keep_alive)
+
+    def record(self, model: str, backend_url: str, load_duration: int) -> None:
+        """Record one served request and its load_duration."""
+        now = time.time()
+        with self._lock:
+            stats = self._stats[(backend_url, model)]
+            stats.requests.append(now)
+            stats.last_used = now
+            stats.load_samples.append((now, load_duration))
+            if load_duration > self.COLD_LOAD_THRESHOLD:
+                stats.cold_loads += 1
+
+    def start(self) -> None:
+        """Preload configured models and start the background re-warm loop."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="model-residency", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        for service_type, models in self._settings.warmup_models.items():
+            for url in self._backends_by_service.get(service_type, []):
+                for model in models:
+                    self._warm(url, model)
+        while not self._stop.wait(self._settings.warmup_interval):
+            try:
+                self._rewarm_hot_models()
+            except Exception as e:
+                print(f"Error re-warming models: {e}")
+
+    def _warm(self, backend_url: str, model: str) -> bool:
+        """Load a model into memory without generating anything."""
+        if not self._load(backend_url, model):
+            return False
+        with self._lock:
+            self._stats[(backend_url, model)].last_warmup = time.time()
+        return True
+
+    def _loaded_models(self, backend_url: str) -> Set[str]:
+        """Models currently loaded on a backend (/api/ps)."""
+        response = self._session.get(f"{backend_url}/api/ps", timeout=self._settings.probe_deadline)
+        if response.status_code != 200:
+            return set()
+        return {m.get("name") for m in response.json().get("models", [])}
+
+    def _hot_models(self, backend_url: str) -> List[str]:
+        """Models used often enough recently on this backend, hottest first."""
+        since = time.time() - self._settings.hot_model_window
+        with self._lock:
+            counts = {
+                model: sum(1 for t in stats.requests if t >= since)
+                for (url, model), stats in self._stats.items()
+                if url == backend_url
+            }
+        hot = [m for m, count in counts.items() if count >= self._settings.hot_model_min_requests]
+        hot.sort(key=lambda m: counts[m], reverse=True)
+        # No pedir mas modelos de los que Ollama mantiene cargados a la vez
+        return hot[:self._settings.max_loaded_models]
+
+    def _rewarm_hot_models(self) -> None:
+        urls = {url for urls in self._backends_by_service.values() for url in urls}
+        for url in urls:
+            hot = self._hot_models(url)
+            if not hot:
+                continue
+            try:
+                loaded = self._loaded_models(url)
+            except Exception:
+                continue  # backend caido: lo reportan los probes
+            for model in hot:
+                if model not in loaded:
+                    self._warm(url, model)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model load statistics."""
+        with self._lock:
+            items = list(self._stats.items())
+            result = {}
+            for (url, model), stats in items:
+                loads = [d for _, d in stats.load_samples]
+                result.setdefault(model, {})[url] = {
+                    "requests": len(stats.requests),
+                    "cold_loads": stats.cold_loads,
+                    "last_load_ms": round(loads[-1] / 1e6, 1) if loads else 0.0,
+                    "avg_load_ms": round(sum(loads) / len(loads) / 1e6, 1) if loads else 0.0,
+                    "max_load_ms": round(max(loads) / 1e6, 1) if loads else 0.0,
+                    "keep_alive": self.keep_alive_for(model),
+                    "last_used": stats.last_used,
+                    "last_warmup": stats.last_warmup
+                }
+        return result
@@ -3,11 +3,29 @@
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+import json
+import queue
+import threading
 import time
 
 from ..core.interfaces import OllamaServiceInterface
 from ..config.settings import Settings
+from .backend_health import BackendHealth
+from .backend_pool import BackendPool
+from .admission import AdmissionError
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .model_residency import ModelResidencyManager
+from .download_manager import DownloadManager
+from .placement import PlacementEngine
+from .option_tuner import OptionTuner
+from .single_flight import SingleFlight
+from .metrics import ServingMetrics
+from .model_cascade import ModelCascade
+from .token_budget import TokenBudget, ContextBudgetError
+from .hedging import HedgePolicy, HedgeRace, PRIMARY, HEDGE
+from .batch_runner import BatchRunner
 
 
 class OllamaService(OllamaServiceInterface):
@@ -16,6 +34,57 @@ class OllamaService(OllamaServiceInterface):
     def __init__(self):
         self._settings = Settings()
         self._session = self._create_optimized_session()
+        self._health = BackendHealth()
+        self._pools = {
+            service_type: BackendPool(
+                service_type,
+                backends,
+                self._settings.load_balancing_strategy,
+                max_parallel=self._settings.default_num_parallel,
+                max_queue=self._settings.max_queue_depth,
+                queue_timeout=self._settings.queue_timeout,
+                health=self._health
+            )
+            for service_type, backends in self._settings.backend_pools.items()
+        }
+        self._response_cache = ResponseCache(
+            max_bytes=self._settings.response_cache_max_bytes,
+            ttl=self._settings.response_cache_ttl,
+            spill_dir=self._settings.response_cache_spill_dir
+        ) if self._settings.response_cache_enabled else None
+        self._semantic_cache = self._create_semantic_cache()
+        self._single_flight = SingleFlight() if self._settings.single_flight_enabled else None
+        self._placement = PlacementEngine(self._session, self._pools)
+        self._tuner = OptionTuner(self._session, self._pools)
+        backends_by_service = {
+            service_type: [b.url for b in pool.backends] for service_type, pool in self._pools.items()
+        }
+        self._residency = ModelResidencyManager(self._session, backends_by_service, load=self._warm_model)
+        self._downloads = DownloadManager(self._session, backends_by_service, on_complete=self._on_model_pulled)
+        self._metrics = ServingMetrics()
+        # Siempre presente: tambien quita la pista "cascade" de las options
+        self._cascade = ModelCascade(
+            self._settings.cascade_models, self._settings.cascade_min_chars, self._settings.cascade_enabled
+        )
+        self._token_budget = TokenBudget(
+            self._settings.num_ctx_buckets,
+            self._settings.max_num_ctx,
+            self._settings.model_max_ctx,
+            self._settings.num_ctx_shrink_after
+        ) if self._settings.token_budget_enabled else None
+        self._hedging = HedgePolicy(
+            self._settings.hedge_percentile,
+            self._settings.hedge_min_samples,
+            self._settings.hedge_default_delay,
+            budget=self._settings.hedge_budget
+        )
+        # Con un solo backend no hay donde duplicar
+        self._hedgeable = len({url for urls in backends_by_service.values() for url in urls}) > 1
+        # Limite de prompts de lotes por backend, compartido por todos los lotes en curso
+        self._batch_limits = {
+            backend.url: threading.BoundedSemaphore(self._batch_width(backend))
+            for pool in self._pools.values() for backend in pool.backends if self._batch_width(backend)
+        }
         self._model_cache = {}
         self._cache_timeout = 60  # Cache de modelos por 60 segundos
     
@@ -23,12 +92,14 @@ class OllamaService(OllamaServiceInterface):
         """Create an optimized requests session with connection pooling and retries."""
         session = requests.Session()
         
-        # Configurar estrategia de retry
+        # Configurar estrategia de retry: los POST de generacion no se reintentan por 5xx,
+        # un backend enfermo lo detecta el circuit breaker en vez de sumar segundos de backoff
         retry_strategy = Retry(
             total=3,
+            connect=1,
             status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
-            backoff_factor=1
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
+            backoff_factor=0.2
         )
         
         # Configurar adapter con connection pooling
@@ -67,6 +138,7 @@ class OllamaService(OllamaServiceInterface):
             if response.status_code == 200:
                 data = response.json()
                 models = [model["name"] for model in data.get("models", [])]
+                self._metrics.register_models(models)
                 
                 # Guardar en cache
                 self._model_cache[cache_key] = {
@@ -82,94 +154,697 @@ class OllamaService(OllamaServiceInterface):
             cache_key = f"models_{service_type}"
             return self._model_cache.get(cache_key, {}).get('models', [])
     
-    def chat(self, message: str, model: str, service_type: str = "general") -> Dict[str, Any]:
-        """Send chat message to model with optimized configuration."""
+    def _get_pool(self, service_type: str) -> BackendPool:
+        """Get the backend pool for a service type (falls back to general)."""
+        return self._pools.get(service_type, self._pools["general"])
+    
+    def get_pool_status(self) -> Dict[str, Any]:
+        """Get load-balancing state of every backend pool."""
+        return {service_type: pool.snapshot() for service_type, pool in self._pools.items()}
+    
+    def start_background_tasks(self) -> None:
+        """Start health checks, model warm-up, background re-warming and placement refresh."""
+        self._health.start()
+        self._residency.start()
+        self._placement.start()
+    
+    def get_placement(self, model: str) -> Dict[str, Any]:
+        """Get placement state and expected completion time per backend."""
+        return {**self._placement.get_stats(), "hedging": self._hedging.get_stats(),
+                "candidates": self._placement.list_candidates(model) if model else []}
+    
+    def _place(self, model: str, service_type: str):
+        """Resolve (pool, backend) for a request; backend None lets the pool decide.
+
+        ``service_type="auto"`` places the request on whichever backend of any
+        service is expected to finish it first.
+        """
+        if service_type == "auto":
+            return self._placement.choose(model)
+        return self._get_pool(service_type), None
+    
+    def _warm_model(self, backend_url: str, model: str) -> bool:
+        """Load a model on one backend with the runner options real requests will use.
+
+        Ollama reloads the model when ``num_ctx``, ``num_batch``, ``use_mlock``
+        or the tuned profile differ, so the warm-up goes through the same
+        payload and profile as a chat. It waits behind interactive requests
+        and skips backends whose circuit is open.
+        """
+        pool = backend = None
+        for candidate in self._pools.values():
+            backend = next((b for b in candidate.backends if b.url == backend_url), None)
+            if backend is not None:
+                pool = candidate
+                break
+        if backend is None or not pool.is_available(backend):
+            return False
+        # Prompt vacio: Ollama solo carga el modelo
+        payload = self._with_profile(self._build_generate_payload("", model, stream=False), backend_url, None)
         try:
-            service_url = self._settings.services.get(service_type, self._settings.services["general"])
-            
-            payload = {
-                "model": model,
-                "prompt": message,
-                "stream": False,
-                "options": {
-                    "num_predict": 512,  # Limitar tokens de respuesta
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "num_ctx": 2048,  # Contexto más pequeño para respuestas más rápidas
-                    "num_batch": 128,
-                    "num_gqa": 1,
-                    "num_gpu": -1,  # Usar toda la GPU disponible
-                    "main_gpu": 0,
-                    "low_vram": False,
-                    "f16_kv": True,
-                    "use_mlock": True,
-                    "use_mmap": True
-                }
+            with pool.lease(backend, background=True) as lease:
+                if lease.backend is not backend:
+                    # El circuito se abrio entre medio: no cargar el modelo en otro backend
+                    return False
+                response = self._session.post(
+                    f"{backend_url}/api/generate", json=payload, timeout=self._settings.request_timeout
+                )
+                if response.status_code == 200:
+                    return True
+                if response.status_code >= 500:
+                    lease.fail()
+                print(f"Warm-up of {model} on {backend_url} failed: {response.status_code}")
+        except AdmissionError:
+            return False
+        except Exception as e:
+            print(f"Warm-up of {model} on {backend_url} failed: {e}")
+        return False
+    
+    def get_model_residency(self) -> Dict[str, Any]:
+        """Get per-model load statistics."""
+        return self._residency.get_stats()
+    
+    def _create_semantic_cache(self) -> Optional[SemanticCache]:
+        """Create the semantic cache if enabled and numpy is installed."""
+        if not self._settings.semantic_cache_enabled:
+            return None
+        try:
+            return SemanticCache(
+                threshold=self._settings.semantic_cache_threshold,
+                max_entries=self._settings.semantic_cache_max_entries
+            )
+        except ImportError as e:
+            print(f"Semantic cache disabled: {e}")
+            return None
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss counters."""
+        stats = {"enabled": False}
+        if self._response_cache is not None:
+            stats = {"enabled": True, **self._response_cache.get_stats()}
+        stats["semantic"] = (
+            {"enabled": True, **self._semantic_cache.get_stats()}
+            if self._semantic_cache is not None else {"enabled": False}
+        )
+        stats["single_flight"] = (
+            {"enabled": True, **self._single_flight.get_stats()}
+            if self._single_flight is not None else {"enabled": False}
+        )
+        return stats
+    
+    @staticmethod
+    def _flight_key(payload: Dict[str, Any], service_type: str) -> str:
+        """Identity of a generation for in-flight de-duplication."""
+        return ResponseCache.make_key(
+            payload["model"], payload["prompt"], service_type, payload["options"], payload.get("context")
+        )
+    
+    def _embed(self, text: str, service_type: str) -> Optional[List[float]]:
+        """Get a prompt embedding through the pool (routing, admission and circuit breaker).
+
+        Returns None, so the request just skips the semantic cache, when no
+        backend of the pool is available or its queue rejects the call.
+        """
+        pool = self._get_pool(service_type)
+        if not any(pool.is_available(backend) for backend in pool.backends):
+            return None
+        try:
+            with pool.lease() as lease:
+                response = self._session.post(
+                    f"{lease.backend.url}/api/embeddings",
+                    json={"model": self._settings.semantic_cache_embedding_model, "prompt": text},
+                    timeout=(self._settings.connection_timeout, 10)
+                )
+                if response.status_code == 200:
+                    return response.json().get("embedding") or None
+                if response.status_code >= 500:
+                    lease.fail()
+        except AdmissionError:
+            # Cola llena o circuito abierto: seguir sin cache semantico
+            return None
+        except Exception as e:
+            print(f"Error getting embedding: {e}")
+        return None
+    
+    def _cache_lookup(self, payload: Dict[str, Any], service_type: str):
+        """Return (cache_ticket, cached_response) for the request.
+
+        Deterministic requests use the exact cache; single-turn prompts can
+        also be answered by the semantic cache. The ticket is passed to
+        ``_cache_store`` once a fresh response is available.
+        """
+        ticket = {}
+        cacheable = ResponseCache.is_cacheable(payload["options"])
+        if self._response_cache is not None:
+            if cacheable:
+                ticket["key"] = ResponseCache.make_key(
+                    payload["model"], payload["prompt"], service_type, payload["options"], payload.get("context")
+                )
+                cached = self._response_cache.get(ticket["key"])
+                if cached is not None:
+                    return None, dict(cached, cached=True)
+            else:
+                self._response_cache.record_bypass()
+        
+        # El cache semantico solo aplica al primer turno (sin context previo) y a generaciones deterministas
+        if self._semantic_cache is not None and cacheable and not payload.get("context"):
+            embedding = self._embed(payload["prompt"], service_type)
+            if embedding:
+                cached = self._semantic_cache.lookup(payload["model"], service_type, payload["options"], embedding)
+                if cached is not None:
+                    return None, dict(cached, cached="semantic")
+                ticket["embedding"] = embedding
+                ticket["options"] = payload["options"]
+        
+        return ticket or None, None
+    
+    def _cache_store(self, ticket: Optional[Dict[str, Any]], service_type: str, response: Dict[str, Any]) -> None:
+        """Store a fresh response in the caches selected by ``_cache_lookup``."""
+        if not ticket:
+            return
+        response = {k: v for k, v in response.items() if k != "type"}
+        if "key" in ticket:
+            self._response_cache.put(ticket["key"], response)
+        if "embedding" in ticket:
+            # Sin context: la respuesta no depende de la sesion original
+            self._semantic_cache.store(
+                response["model"], service_type, ticket["options"], ticket["embedding"],
+                {k: v for k, v in response.items() if k != "context"}
+            )
+    
+    def _with_profile(self, payload: Dict[str, Any], backend_url: str,
+                      options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply the model's tuned options for this backend (caller options still win).
+
+        With the token budget on, ``num_ctx`` is sized to this request
+        instead of taken from the defaults or the tuned profile.
+        """
+        profile = self._tuner.profile_for(payload["model"], backend_url)
+        merged = {**payload["options"], **(profile or {}), **(options or {})}
+        if self._token_budget is not None and not (options or {}).get("num_ctx"):
+            merged["num_ctx"] = self._token_budget.num_ctx_for(
+                payload["model"], self._token_budget.required(payload)
+            )
+        return dict(payload, options=merged)
+    
+    def start_autotune(self, model: str, service_type: str = "general") -> Dict[str, Any]:
+        """Start tuning generation options for a model on a service's backends."""
+        return self._tuner.start(model, service_type)
+    
+    def get_autotune_status(self) -> Dict[str, Any]:
+        """Get tuned option profiles, autotune jobs and context sizing."""
+        status = self._tuner.get_status()
+        if self._token_budget is not None:
+            status["context"] = self._token_budget.get_stats()
+        return status
+    
+    def _learn_tokens(self, payload: Dict[str, Any], prompt_eval_count: int) -> None:
+        if self._token_budget is not None:
+            self._token_budget.learn(payload["model"], payload["prompt"], prompt_eval_count,
+                                     bool(payload.get("context")))
+    
+    def _build_generate_payload(self, message: str, model: str, stream: bool,
+                                context: Optional[List[int]] = None,
+                                options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the /api/generate payload with optimized options.
+
+        ``options`` from the caller override the defaults.
+        """
+        payload = {
+            "model": model,
+            "prompt": message,
+            "stream": stream,
+            "keep_alive": self._residency.keep_alive_for(model),
+            "options": {
+                "num_predict": 512,  # Limitar tokens de respuesta
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "num_ctx": 2048,  # Contexto más pequeño para respuestas más rápidas
+                "num_batch": 128,
+                "num_gqa": 1,
+                "num_gpu": -1,  # Usar toda la GPU disponible
+                "main_gpu": 0,
+                "low_vram": False,
+                "f16_kv": True,
+                "use_mlock": True,
+                "use_mmap": True
             }
+        }
+        if options:
+            payload["options"].update(options)
+        if context:
+            # Continuar la conversacion sin reenviar el historial completo
+            payload["context"] = context
+        return payload
+    
+    def chat(self, message: str, model: str, service_type: str = "general",
+             context: Optional[List[int]] = None,
+             options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send chat message to model with optimized configuration."""
+        start = time.perf_counter()
+        hedge, options = self._hedge_hint(options)
+        fast_model, options = self._cascade.plan(model, options)
+        result = None
+        if fast_model:
+            # Cascada: primero el modelo rapido, el pedido solo si la respuesta no pasa el chequeo
+            result = self._chat(message, fast_model, service_type, context, options, hedge)
+            reason = self._cascade.escalation_reason(result, self._num_predict(fast_model, options))
+            self._metrics.observe_cascade(model, fast_model, result, reason)
+            if reason is not None:
+                result = None
+        if result is None:
+            result = self._chat(message, model, service_type, context, options, hedge)
+        self._metrics.observe_generation("generate", result.get("model", model), result, time.perf_counter() - start)
+        return result
+    
+    def _num_predict(self, model: str, options: Optional[Dict[str, Any]]) -> int:
+        return self._build_generate_payload("", model, stream=False, options=options)["options"]["num_predict"]
+    
+    def _hedge_hint(self, options: Optional[Dict[str, Any]]):
+        """Return (hedge this request, options without the hedge hint).
+
+        ``options["hedge"]`` turns hedging on or off for one request,
+        overriding ``hedging_enabled``.
+        """
+        wanted = self._settings.hedging_enabled
+        if options and "hedge" in options:
+            options = dict(options)
+            wanted = bool(options.pop("hedge"))
+        return wanted and self._hedgeable, options
+    
+    def _chat(self, message: str, model: str, service_type: str,
+              context: Optional[List[int]], options: Optional[Dict[str, Any]],
+              hedge: bool = False) -> Dict[str, Any]:
+        try:
+            payload = self._build_generate_payload(message, model, stream=False, context=context, options=options)
+            if self._token_budget is not None:
+                # Rechazar antes de ocupar un slot lo que no cabe en el contexto
+                self._token_budget.fit(payload, options)
+            cache_ticket, cached = self._cache_lookup(payload, service_type)
+            if cached is not None:
+                return cached
             
-            response = self._session.post(
-                f"{service_url}/api/generate", 
-                json=payload, 
-                timeout=self._settings.request_timeout
-            )
+            def _upstream():
+                if hedge:
+                    # El primer token solo se ve en streaming: se genera en stream y se junta
+                    return self._collect(self._hedged_stream(dict(payload, stream=True), service_type,
+                                                             cache_ticket, options))
+                return self._generate(payload, service_type, cache_ticket, options)
             
-            if response.status_code == 200:
-                result = response.json()
-                return {
-                    "success": True,
-                    "response": result.get("response", ""),
-                    "model": model,
-                    "service": service_type,
-                    "metrics": {
-                        "eval_duration": result.get("eval_duration", 0),
-                        "load_duration": result.get("load_duration", 0),
-                        "prompt_eval_duration": result.get("prompt_eval_duration", 0),
-                        "total_duration": result.get("total_duration", 0)
-                    }
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Error {response.status_code}: {response.text}"
-                }
-                
+            if self._single_flight is None:
+                return _upstream()
+            # Peticiones identicas en curso comparten una sola generacion
+            return self._single_flight.do(self._flight_key(payload, service_type), _upstream)
+        
+        except AdmissionError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "status_code": e.status_code,
+                "retry_after": e.retry_after
+            }
+        except ContextBudgetError as e:
+            return {"success": False, "error": str(e), "status_code": e.status_code}
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
     
-    def pull_model(self, model_name: str, service_type: str = "general") -> Dict[str, Any]:
-        """Download a model."""
-        try:
-            service_url = self._settings.services.get(service_type, self._settings.services["general"])
-            
-            payload = {"name": model_name}
-            response = requests.post(
-                f"{service_url}/api/pull", 
-                json=payload, 
-                timeout=self._settings.pull_timeout
+    @staticmethod
+    def _result_response(result: Dict[str, Any], model: str, pool: BackendPool, lease,
+                         text: Optional[str] = None, **metrics) -> Dict[str, Any]:
+        """Chat response from Ollama's final object (the non-streaming result or the ``done`` chunk).
+
+        ``text`` replaces ``result["response"]`` for streams, whose tokens
+        arrived in earlier chunks; ``metrics`` adds transport-specific timings.
+        """
+        return {
+            "success": True,
+            "response": result.get("response", "") if text is None else text,
+            "model": model,
+            "service": pool.service_type,
+            "backend": lease.backend.url,
+            "context": result.get("context", []),
+            "metrics": {
+                "eval_duration": result.get("eval_duration", 0),
+                "load_duration": result.get("load_duration", 0),
+                "prompt_eval_duration": result.get("prompt_eval_duration", 0),
+                "total_duration": result.get("total_duration", 0),
+                "prompt_eval_count": result.get("prompt_eval_count", 0),
+                "eval_count": result.get("eval_count", 0),
+                **metrics,
+                "queue_wait": int(lease.queue_wait * 1e9)
+            }
+        }
+    
+    @staticmethod
+    def _status_error(lease, status_code: int, body: str) -> Dict[str, Any]:
+        """Error result for a non-200 reply from Ollama."""
+        if status_code >= 500:
+            # 4xx (p.ej. modelo inexistente) no es culpa del backend
+            lease.fail()
+        return {"success": False, "error": f"Error {status_code}: {body}"}
+    
+    def _after_generation(self, payload: Dict[str, Any], service_type: str,
+                          cache_ticket: Optional[Dict[str, Any]], response: Dict[str, Any]) -> None:
+        """Feed a successful generation to residency, token budget, placement and caches."""
+        metrics = response["metrics"]
+        self._residency.record(response["model"], response["backend"], metrics["load_duration"])
+        self._learn_tokens(payload, metrics["prompt_eval_count"])
+        self._placement.record(response["backend"], response["model"], metrics)
+        self._cache_store(cache_ticket, service_type, response)
+    
+    def _generate(self, payload: Dict[str, Any], service_type: str,
+                  cache_ticket: Optional[Dict[str, Any]],
+                  options: Optional[Dict[str, Any]] = None,
+                  placement=None, background: bool = False) -> Dict[str, Any]:
+        """Run one non-streaming generation on a leased backend (``placement`` pins pool and backend)."""
+        model = payload["model"]
+        pool, placed = placement or self._place(model, service_type)
+        with pool.lease(placed, background=background) as lease:
+            backend = lease.backend
+            response = self._session.post(
+                f"{backend.url}/api/generate", 
+                json=self._with_profile(payload, backend.url, options), 
+                timeout=self._settings.request_timeout
             )
             
-            if response.status_code == 200:
-                return {"success": True, "message": f"Modelo {model_name} descargado correctamente"}
-            else:
-                return {"success": False, "error": f"Error descargando modelo: {response.status_code}"}
+            if response.status_code != 200:
+                return self._status_error(lease, response.status_code, response.text)
+            chat_response = self._result_response(response.json(), model, pool, lease)
+            self._after_generation(payload, service_type, cache_ticket, chat_response)
+            return chat_response
+    
+    def chat_stream(self, message: str, model: str, service_type: str = "general",
+                    context: Optional[List[int]] = None,
+                    options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chat tokens from the model as they are generated.
+
+        Yields ``{"type": "token", "content": ...}`` events followed by a single
+        ``{"type": "done", ...}`` event (same shape as ``chat``) or an
+        ``{"type": "error", ...}`` event. An ``{"type": "admitted", ...}`` event
+        is emitted first, once a backend slot has been granted.
+        """
+        start = time.perf_counter()
+        ttft = None
+        hedge, options = self._hedge_hint(options)
+        # Sin cascada en streaming: esperar la respuesta completa del modelo rapido retrasaria el primer token
+        _, options = self._cascade.plan(model, options)
+        
+        for event in self._chat_stream(message, model, service_type, context, options, hedge):
+            event_type = event.get("type")
+            if event_type == "token" and ttft is None:
+                ttft = time.perf_counter() - start
+            elif event_type in ("done", "error"):
+                self._metrics.observe_generation("generate_stream", model, event, time.perf_counter() - start, ttft)
+            yield event
+    
+    def _chat_stream(self, message: str, model: str, service_type: str,
+                     context: Optional[List[int]],
+                     options: Optional[Dict[str, Any]],
+                     hedge: bool = False) -> Iterator[Dict[str, Any]]:
+        try:
+            payload = self._build_generate_payload(message, model, stream=True, context=context, options=options)
+            if self._token_budget is not None:
+                self._token_budget.fit(payload, options)
+            cache_ticket, cached = self._cache_lookup(payload, service_type)
+        except ContextBudgetError as e:
+            yield {"type": "error", "success": False, "error": str(e), "status_code": e.status_code}
+            return
+        except Exception as e:
+            yield {"type": "error", "success": False, "error": str(e)}
+            return
+        
+        if cached is not None:
+            yield {"type": "token", "content": cached["response"]}
+            yield dict(cached, type="done")
+            return
+        
+        def _upstream():
+            if hedge:
+                return self._hedged_stream(payload, service_type, cache_ticket, options)
+            return self._generate_stream(payload, service_type, cache_ticket, options)
+        
+        if self._single_flight is None:
+            yield from _upstream()
+        else:
+            yield from self._single_flight.stream(self._flight_key(payload, service_type), _upstream)
+    
+    def _generate_stream(self, payload: Dict[str, Any], service_type: str,
+                         cache_ticket: Optional[Dict[str, Any]],
+                         options: Optional[Dict[str, Any]] = None,
+                         placement=None) -> Iterator[Dict[str, Any]]:
+        """Run one streaming generation on a leased backend (``placement`` pins pool and backend)."""
+        model = payload["model"]
+        try:
+            start = time.perf_counter_ns()
+            first_token_at = None
+            parts: List[str] = []
+            
+            pool, placed = placement or self._place(model, service_type)
+            with pool.lease(placed) as lease:
+                backend = lease.backend
+                yield {"type": "admitted", "backend": backend.url, "queue_wait": int(lease.queue_wait * 1e9)}
                 
+                with self._session.post(
+                    f"{backend.url}/api/generate",
+                    json=self._with_profile(payload, backend.url, options),
+                    stream=True,
+                    timeout=(self._settings.connection_timeout, self._settings.read_timeout)
+                ) as response:
+                    if response.status_code != 200:
+                        yield {"type": "error", **self._status_error(lease, response.status_code, response.text)}
+                        return
+                    
+                    # Ollama envia NDJSON: un objeto por linea
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            lease.fail()
+                            yield {"type": "error", "success": False, "error": chunk["error"]}
+                            return
+                        
+                        token = chunk.get("response", "")
+                        if token:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter_ns()
+                            parts.append(token)
+                            yield {"type": "token", "content": token}
+                        
+                        if chunk.get("done"):
+                            done_event = {"type": "done", **self._result_response(
+                                chunk, model, pool, lease, "".join(parts),
+                                time_to_first_token=(first_token_at - start) if first_token_at else 0
+                            )}
+                            self._after_generation(payload, service_type, cache_ticket, done_event)
+                            yield done_event
+                            return
+            
+            yield {"type": "error", "success": False, "error": "Stream finalizado sin respuesta completa"}
+        
+        except AdmissionError as e:
+            yield {
+                "type": "error",
+                "success": False,
+                "error": str(e),
+                "status_code": e.status_code,
+                "retry_after": e.retry_after
+            }
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            yield {"type": "error", "success": False, "error": str(e)}
+    
+    def _hedged_stream(self, payload: Dict[str, Any], service_type: str,
+                       cache_ticket: Optional[Dict[str, Any]],
+                       options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """``_generate_stream`` with a second copy on another backend if the first token is late.
+
+        Each copy runs in its own thread. The copy that streams a token
+        first is forwarded and the other is cancelled; a blocked read cannot
+        be interrupted, so the loser stops at its next chunk.
+        """
+        model = payload["model"]
+        self._hedging.begin()
+        start = time.perf_counter()
+        deadline = start + self._hedging.delay(model)
+        sink: queue.Queue = queue.Queue()
+        cancelled = {PRIMARY: threading.Event(), HEDGE: threading.Event()}
+        race = HedgeRace()
+        tried = False
+        self._pump(PRIMARY, self._generate_stream(payload, service_type, cache_ticket, options), sink, cancelled)
+        try:
+            while not race.finished:
+                timeout = None if tried or race.winner is not None else max(0.0, deadline - time.perf_counter())
+                try:
+                    source, event = sink.get(timeout=timeout)
+                except queue.Empty:
+                    tried = True
+                    target = self._hedge_target(model, race)
+                    if target is not None:
+                        race.start_hedge()
+                        self._pump(HEDGE, self._generate_stream(payload, service_type, cache_ticket, options, target),
+                                   sink, cancelled)
+                    continue
+                
+                undecided = race.winner is None
+                forward, cancel = race.feed(source, event)
+                if cancel is not None:
+                    cancelled[cancel].set()
+                if undecided and race.winner is not None:
+                    self._hedge_settled(model, race, event, time.perf_counter() - start)
+                if forward:
+                    yield event
+                    if source == race.winner and event.get("type") in ("done", "error"):
+                        return
+        finally:
+            for flag in cancelled.values():
+                flag.set()
+    
+    @staticmethod
+    def _pump(source: int, events: Iterator[Dict[str, Any]], sink: queue.Queue,
+              cancelled: Dict[int, threading.Event]) -> None:
+        """Copy a generation's events into ``sink`` from a thread until cancelled."""
+        def _run():
+            try:
+                for event in events:
+                    if cancelled[source].is_set():
+                        break
+                    sink.put((source, event))
+            finally:
+                # Cierra la respuesta de Ollama y libera el slot
+                events.close()
+                sink.put((source, None))
+        
+        threading.Thread(target=_run, name="hedge-primary" if source == PRIMARY else "hedge-copy",
+                         daemon=True).start()
+    
+    def _hedge_target(self, model: str, race: HedgeRace):
+        """(pool, backend) for the hedged copy, or None when there is none or no budget."""
+        target = self._placement.choose_hedge(model, race.primary_backend)
+        outcome = "no_backend" if target is None else None
+        if target is not None and not self._hedging.allow():
+            target, outcome = None, "over_budget"
+        if outcome:
+            self._hedging.record(outcome)
+            self._metrics.hedges.inc(self._metrics.model_label(model), outcome)
+        return target
+    
+    def _hedge_settled(self, model: str, race: HedgeRace, event: Dict[str, Any], elapsed: float) -> None:
+        if event.get("type") == "token":
+            self._hedging.observe_ttft(model, elapsed)
+        if race.hedged:
+            outcome = "hedge_won" if race.winner == HEDGE else "primary_won"
+            self._hedging.record(outcome)
+            self._metrics.hedges.inc(self._metrics.model_label(model), outcome)
+    
+    @staticmethod
+    def _collect(events: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Final result of a stream, shaped like a non-streaming ``chat`` result."""
+        result = {"success": False, "error": "Stream finalizado sin respuesta completa"}
+        for event in events:
+            if event.get("type") in ("done", "error"):
+                result = {k: v for k, v in event.items() if k != "type"}
+        return result
+    
+    def _batch_width(self, backend) -> int:
+        """Batch prompts allowed at once on a backend; one slot always stays free for chat.
+
+        A backend with a single slot (``max_parallel`` 1) takes no batch work.
+        """
+        max_concurrency = backend.limiter.snapshot()["max_concurrency"]
+        return max(0, min(self._settings.batch_concurrency_per_backend, max_concurrency - 1))
+    
+    def _batch_route(self, record: Dict[str, Any]) -> str:
+        """Batch route of a record: its pool's service type, or ``auto``."""
+        if record["service_type"] == "auto":
+            return "auto"
+        return self._get_pool(record["service_type"]).service_type
+    
+    def run_batch(self, records: Iterable[Any], model: Optional[str] = None, service_type: str = "general",
+                  options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Run a stream of prompts at low priority; results in completion order.
+
+        Each record is a dict or JSON line (see ``BatchRunner.run``); ``model``,
+        ``service_type`` and ``options`` are the defaults for records that
+        omit them. A record runs on the backends of its own service (any
+        backend for ``auto``); backends with ``max_parallel`` 1 are skipped.
+        """
+        slots = {"auto": []}
+        for pool in self._pools.values():
+            slots[pool.service_type] = [(pool, backend) for backend in pool.backends
+                                        for _ in range(self._batch_width(backend))]
+            seen = {backend.url for _, backend in slots["auto"]}
+            slots["auto"].extend(slot for slot in slots[pool.service_type] if slot[1].url not in seen)
+        runner = BatchRunner(self._batch_one, slots, self._batch_route)
+        return runner.run(records, {"model": model, "service_type": service_type, "options": options})
+    
+    def _batch_one(self, record: Dict[str, Any], placement) -> Dict[str, Any]:
+        """Generate one batch record on the worker's backend, behind interactive requests."""
+        start = time.perf_counter()
+        model, service_type, options = record["model"], record["service_type"], record["options"]
+        pool, backend = placement
+        with self._batch_limits[backend.url]:
+            try:
+                payload = self._build_generate_payload(record["message"], model, stream=False, options=options)
+                if self._token_budget is not None:
+                    self._token_budget.fit(payload, options)
+                cache_ticket, cached = self._cache_lookup(payload, service_type)
+                result = cached if cached is not None else self._generate(
+                    payload, service_type, cache_ticket, options, placement, background=True
+                )
+            except (AdmissionError, ContextBudgetError) as e:
+                result = {"success": False, "error": str(e), "status_code": e.status_code}
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+        self._metrics.observe_generation("batch", result.get("model", model), result, time.perf_counter() - start)
+        return result
+    
+    def pull_model(self, model_name: str, service_type: str = "general") -> Dict[str, Any]:
+        """Download a model and wait for it to finish."""
+        job = self._downloads.start(model_name, service_type)
+        final = self._downloads.wait(job["job_id"])
+        if final["status"] == "completed":
+            return {"success": True, "message": final["message"]}
+        return {"success": False, "error": final["error"]}
+    
+    def start_download(self, model_name: str, service_type: str = "general") -> Dict[str, Any]:
+        """Start (or join) a tracked model download."""
+        return self._downloads.start(model_name, service_type)
+    
+    def get_download(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of one download job."""
+        return self._downloads.get_job(job_id)
+    
+    def list_downloads(self) -> List[Dict[str, Any]]:
+        """Get progress of recent download jobs."""
+        return self._downloads.list_jobs()
+    
+    def watch_download(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream progress updates of one download job."""
+        return self._downloads.watch(job_id)
+    
+    def _on_model_pulled(self, model_name: str) -> None:
+        # Volumen compartido: el modelo nuevo aparece en todos los servicios
+        self._model_cache.clear()
     
     def get_service_status(self) -> Dict[str, Any]:
-        """Get status of all services."""
+        """Get status of all services from the background health checks."""
         status = {}
+        snapshot = self._health.get_snapshot()
         for service_name, url in self._settings.services.items():
-            try:
-                response = requests.get(f"{url}/api/tags", timeout=5)
-                status[service_name] = {
-                    "status": "online" if response.status_code == 200 else "error",
-                    "models": len(response.json().get("models", [])) if response.status_code == 200 else 0
-                }
-            except:
-                status[service_name] = {"status": "offline", "models": 0}
+            probe = snapshot[url]
+            if not probe["reachable"]:
+                state = "offline"
+            else:
+                state = "online" if probe["status_code"] == 200 else "error"
+            status[service_name] = {
+                "status": state,
+                "models": probe["models"],
+                "latency_ms": probe.get("latency_ms"),
+                "checked_at": probe.get("checked_at"),
+                "circuit": probe["circuit"]["state"]
+            }
         
         return status 
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""Per-model, per-backend autotuning of Ollama generation options."""
+
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from ..config.settings import Settings
+from .backend_pool import BackendPool
+
+# Prompts fijos: uno corto, uno medio y uno largo para medir prompt eval y generacion
+TUNING_PROMPTS = (
+    "Explica en una frase qué es una GPU.",
+    "Resume las ventajas y desventajas de ejecutar modelos de lenguaje en local "
+    "frente a usar una API en la nube, pensando en coste, latencia y privacidad.",
+    " ".join(["Este párrafo sirve para medir la velocidad de evaluación del prompt."] * 40)
+    + " Resume el texto anterior en una frase."
+)
+
+
+class OptionTuner:
+    """Sweep ``num_batch``, ``num_ctx`` and ``num_thread`` per model and backend.
+
+    Each candidate runs the fixed prompt set (after one warm-up call that
+    absorbs the model reload the new options cause) and is scored by the
+    expected time of a reference request from the measured prompt-eval and
+    eval tokens/s. The best options are persisted as that model's profile
+    on that backend and merged into every request sent there.
+    """
+
+    def __init__(self, session: requests.Session, pools: Dict[str, BackendPool]):
+        self._settings = Settings()
+        self._session = session
+        self._pools = pools
+        self._gpu = {
+            backend["url"]: backend.get("gpu", False)
+            for backends in self._settings.backend_pools.values()
+            for backend in backends
+        }
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Dict[str, Any]] = self._load()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _key(model: str, backend_url: str) -> str:
+        return f"{backend_url}|{model}"
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        path = self._settings.autotune_profiles_path
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Error loading tuned profiles: {e}")
+            return {}
+
+    def _save(self) -> None:
+        path = self._settings.autotune_profiles_path
+        with self._lock:
+            data = json.dumps(self._profiles, indent=2)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error saving tuned profiles: {e}")
+
+    def profile_for(self, model: str, backend_url: str) -> Optional[Dict[str, Any]]:
+        """Tuned options for a model on a backend, if it has been tuned."""
+        profile = self._profiles.get(self._key(model, backend_url))
+        return profile["options"] if profile else None
+
+    def candidates(self, backend_url: str) -> List[Dict[str, Any]]:
+        """Option combinations to try on a backend."""
+        grid = self._settings.autotune_grid
+        gpu = self._gpu.get(backend_url, False)
+        threads = grid.get("num_thread") or ([None] if gpu else self._thread_candidates())
+        combos = []
+        for num_batch, num_ctx, num_thread in itertools.product(grid["num_batch"], grid["num_ctx"], threads):
+            options = {"num_batch": num_batch, "num_ctx": num_ctx}
+            if num_thread:
+                options["num_thread"] = num_thread
+            if not gpu:
+                # Contenedores solo CPU: no pedir capas en GPU ni bloquear toda la RAM
+                options.update({"num_gpu": 0, "use_mlock": False})
+            combos.append(options)
+        return combos
+
+    @staticmethod
+    def _thread_candidates() -> List[int]:
+        cores = os.cpu_count() or 2
+        return sorted({max(1, cores // 2), cores})
+
+    def start(self, model: str, service_type: str = "general") -> Dict[str, Any]:
+        """Tune a model on every backend of a service in the background."""
+        pool = self._pools.get(service_type) or self._pools["general"]
+        job_key = f"{pool.service_type}|{model}"
+        with self._lock:
+            job = self._jobs.get(job_key)
+            if job is not None and job["status"] == "running":
+                return {"success": True, "message": f"{model} ya se esta ajustando", **job}
+            job = {"model": model, "service": pool.service_type, "status": "running",
+                   "progress": 0, "total": 0, "started": time.time(), "error": None}
+            self._jobs[job_key] = job
+        threading.Thread(target=self._run, args=(job, pool), name=f"autotune-{model}", daemon=True).start()
+        return {"success": True, "message": f"Autotuning de {model} iniciado", **job}
+
+    def _run(self, job: Dict[str, Any], pool: BackendPool) -> None:
+        try:
+            plans = [(backend, self.candidates(backend.url)) for backend in pool.backends]
+            job["total"] = sum(len(c) for _, c in plans)
+            for backend, candidates in plans:
+                trials = []
+                for options in candidates:
+                    trials.append(self._trial(pool, backend, job["model"], options))
+                    job["progress"] += 1
+                scored = [t for t in trials if t["score"] is not None]
+                if not scored:
+                    raise RuntimeError(f"Ninguna configuracion funciono en {backend.url}")
+                best = min(scored, key=lambda t: t["score"])
+                with self._lock:
+                    self._profiles[self._key(job["model"], backend.url)] = {
+                        "options": best["options"],
+                        "prompt_tps": best["prompt_tps"],
+                        "eval_tps": best["eval_tps"],
+                        "tuned_at": time.time(),
+                        "trials": trials
+                    }
+                self._save()
+            job["status"] = "completed"
+        except Exception as e:
+            print(f"Error autotuning {job['model']}: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished"] = time.time()
+
+    def _generate(self, pool: BackendPool, backend, model: str, prompt: str,
+                  options: Dict[str, Any], num_predict: int) -> Dict[str, Any]:
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {**options, "num_predict": num_predict, "temperature": 0, "seed": 0}
+        }
+        # Respetar la admision del backend: el tuning comparte slots con el chat
+        with pool.lease(backend):
+            response = self._session.post(f"{backend.url}/api/generate", json=payload,
+                                          timeout=self._settings.request_timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Error {response.status_code}: {response.text}")
+        return response.json()
+
+    def _trial(self, pool: BackendPool, backend, model: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Measure one option combination on the fixed prompt set."""
+        trial = {"options": options, "prompt_tps": 0.0, "eval_tps": 0.0, "score": None}
+        try:
+            # Calentamiento: cambiar num_ctx/num_batch recarga el modelo
+            self._generate(pool, backend, model, TUNING_PROMPTS[0], options, 1)
+            prompt_tokens = prompt_ns = eval_tokens = eval_ns = 0
+            for prompt in TUNING_PROMPTS:
+                result = self._generate(pool, backend, model, prompt, options,
+                                        self._settings.autotune_num_predict)
+                prompt_tokens += result.get("prompt_eval_count", 0)
+                prompt_ns += result.get("prompt_eval_duration", 0)
+                eval_tokens += result.get("eval_count", 0)
+                eval_ns += result.get("eval_duration", 0)
+        except Exception as e:
+            trial["error"] = str(e)
+            return trial
+
+        trial["prompt_tps"] = round(prompt_tokens / (prompt_ns / 1e9), 2) if prompt_ns else 0.0
+        trial["eval_tps"] = round(eval_tokens / (eval_ns / 1e9), 2) if eval_ns else 0.0
+        if trial["eval_tps"]:
+            # Tiempo esperado de una peticion de referencia (prompt + respuesta)
+            tokens = self._settings.placement_expected_tokens
+            prompt_time = tokens / trial["prompt_tps"] if trial["prompt_tps"] else 0.0
+            trial["score"] = round(prompt_time + tokens / trial["eval_tps"], 4)
+        return trial
+
+    def get_status(self) -> Dict[str, Any]:
+        """Tuned profiles and autotune jobs."""
+        with self._lock:
+            return {
+                "profiles": {
+                    key: {k: v for k, v in profile.items() if k != "trials"}
+                    for key, profile in self._profiles.items()
+                },
+                "jobs": [dict(job) for job in self._jobs.values()]
+            }
@@ -0,0 +1,179 @@
+"""Model-affinity and hardware-aware placement across backends."""
+
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import requests
+
+from ..config.settings import Settings
+from .backend_pool import Backend, BackendPool
+
+
+class _Throughput:
+    """EWMA of measured speeds for one model on one backend."""
+
+    __slots__ = ("eval_tps", "prompt_tps", "load_seconds", "samples")
+
+    def __init__(self):
+        self.eval_tps = 0.0
+        self.prompt_tps = 0.0
+        self.load_seconds = 0.0
+        self.samples = 0
+
+
+class PlacementEngine:
+    """Pick the backend with the lowest expected completion time for a model.
+
+    Expected time = model load cost (zero if already loaded) + time queued
+    behind in-flight requests + generation time at the measured tokens/s.
+    Backends without measurements use a prior based on GPU vs CPU.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(self, session: requests.Session, pools: Dict[str, BackendPool]):
+        self._settings = Settings()
+        self._session = session
+        self._pools = pools
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Set[str]] = {}
+        self._throughput: Dict[Tuple[str, str], _Throughput] = {}
+        self._gpu = {
+            backend["url"]: backend.get("gpu", False)
+            for backends in self._settings.backend_pools.values()
+            for backend in backends
+        }
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start refreshing which models each backend has loaded."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="placement-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while True:
+            self.refresh_loaded()
+            if self._stop.wait(self._settings.placement_refresh_interval):
+                break
+
+    def refresh_loaded(self) -> None:
+        """Ask each backend which models are loaded (/api/ps)."""
+        urls = {backend.url for pool in self._pools.values() for backend in pool.backends}
+        for url in urls:
+            try:
+                response = self._session.get(f"{url}/api/ps", timeout=self._settings.probe_deadline)
+                if response.status_code != 200:
+                    continue
+                loaded = {m.get("name") for m in response.json().get("models", [])}
+            except Exception:
+                loaded = set()
+            with self._lock:
+                self._loaded[url] = loaded
+
+    def record(self, backend_url: str, model: str, metrics: Dict[str, Any]) -> None:
+        """Update measured speeds from the metrics of a finished generation."""
+        eval_count = metrics.get("eval_count", 0)
+        eval_duration = metrics.get("eval_duration", 0)
+        prompt_count = metrics.get("prompt_eval_count", 0)
+        prompt_duration = metrics.get("prompt_eval_duration", 0)
+        load_seconds = metrics.get("load_duration", 0) / 1e9
+
+        with self._lock:
+            stats = self._throughput.setdefault((backend_url, model), _Throughput())
+            if eval_count and eval_duration:
+                stats.eval_tps = self._ewma(stats.eval_tps, eval_count / (eval_duration / 1e9))
+            if prompt_count and prompt_duration:
+                stats.prompt_tps = self._ewma(stats.prompt_tps, prompt_count / (prompt_duration / 1e9))
+            # Solo las cargas en frio dicen cuanto cuesta cargar el modelo
+            if load_seconds > 0.5:
+                stats.load_seconds = self._ewma(stats.load_seconds, load_seconds)
+            stats.samples += 1
+            self._loaded.setdefault(backend_url, set()).add(model)
+
+    def _ewma(self, current: float, sample: float) -> float:
+        return sample if not current else current + self.ALPHA * (sample - current)
+
+    def expected_seconds(self, backend: Backend, model: str) -> float:
+        """Expected completion time of one request for ``model`` on ``backend``."""
+        gpu = self._gpu.get(backend.url, False)
+        with self._lock:
+            stats = self._throughput.get((backend.url, model))
+            loaded = model in self._loaded.get(backend.url, set())
+
+        eval_tps = (stats.eval_tps if stats and stats.eval_tps else
+                    self._settings.placement_prior_tps["gpu" if gpu else "cpu"])
+        generation = self._settings.placement_expected_tokens / eval_tps
+
+        load = 0.0
+        if not loaded:
+            load = (stats.load_seconds if stats and stats.load_seconds else
+                    self._settings.placement_prior_load_seconds["gpu" if gpu else "cpu"])
+
+        # Peticiones por delante en este backend, repartidas en sus slots paralelos
+        admission = backend.limiter.snapshot()
+        ahead = backend.outstanding / admission["max_concurrency"]
+        return load + generation * (1 + ahead)
+
+    def choose(self, model: str) -> Tuple[BackendPool, Optional[Backend]]:
+        """Return the pool and backend with the lowest expected completion time."""
+        best: Optional[Tuple[float, BackendPool, Backend]] = None
+        for pool in self._pools.values():
+            for backend in pool.backends:
+                if not pool.is_available(backend):
+                    # Circuito abierto: no cuenta como destino
+                    continue
+                eta = self.expected_seconds(backend, model)
+                if best is None or eta < best[0]:
+                    best = (eta, pool, backend)
+        if best is None:
+            # Todos caidos: el pool general decide (y rechaza con 503)
+            pool = self._pools["general"]
+            return pool, None
+        return best[1], best[2]
+
+    def choose_hedge(self, model: str, exclude: Optional[str]) -> Optional[Tuple[BackendPool, Backend]]:
+        """Best backend for a hedged copy: another URL with a free slot, or None."""
+        best: Optional[Tuple[float, BackendPool, Backend]] = None
+        for pool in self._pools.values():
+            for backend in pool.backends:
+                # Una copia que espera en cola no adelanta nada
+                if backend.url == exclude or not backend.limiter.has_free_slot or not pool.is_available(backend):
+                    continue
+                eta = self.expected_seconds(backend, model)
+                if best is None or eta < best[0]:
+                    best = (eta, pool, backend)
+        return (best[1], best[2]) if best else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Loaded models and measured speeds per backend."""
+        with self._lock:
+            return {
+                "loaded": {url: sorted(models) for url, models in self._loaded.items()},
+                "throughput": [
+                    {
+                        "backend": url,
+                        "model": model,
+                        "gpu": self._gpu.get(url, False),
+                        "eval_tps": round(stats.eval_tps, 2),
+                        "prompt_tps": round(stats.prompt_tps, 2),
+                        "load_seconds": round(stats.load_seconds, 2),
+                        "samples": stats.samples
+                    }
+                    for (url, model), stats in self._throughput.items()
+                ]
+            }
+
+    def list_candidates(self, model: str) -> List[Dict[str, Any]]:
+        """Expected completion time on every backend, best first."""
+        candidates = [
+            {"service": pool.service_type, "backend": backend.url,
+             "expected_seconds": round(self.expected_seconds(backend, model), 3)}
+            for pool in self._pools.values() for backend in pool.backends
+        ]
+        return sorted(candidates, key=lambda c: c["expected_seconds"])
@@ -0,0 +1,169 @@
+"""Exact-match cache for deterministic generations."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+
+class ResponseCache:
+    """LRU + TTL response cache bounded by total size, with optional disk spill.
+
+    Entries evicted from memory are written to ``spill_dir`` (if configured)
+    and promoted back on the next hit.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600,
+                 spill_dir: Optional[str] = None, spill_max_entries: int = 10000):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._spill_dir = spill_dir
+        self._spill_max_entries = spill_max_entries
+        self._lock = threading.Lock()
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # key -> expires_at (orden LRU de lo que esta en disco)
+        self._spilled: "OrderedDict[str, float]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0,
+                       "evictions": 0, "saved_duration": 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @staticmethod
+    def is_cacheable(options: Dict[str, Any]) -> bool:
+        """Only deterministic generations can be served from cache."""
+        return options.get("temperature", 1) == 0 or "seed" in options
+
+    @staticmethod
+    def make_key(model: str, prompt: str, service_type: str, options: Dict[str, Any],
+                 context: Optional[List[int]] = None) -> str:
+        raw = json.dumps(
+            {"model": model, "prompt": prompt, "service": service_type,
+             "options": options, "context": context or []},
+            sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._record_hit(value)
+                    return value
+                del self._entries[key]
+                self._bytes -= size
+            spilled_expires = self._spilled.pop(key, None)
+
+        if spilled_expires is not None and spilled_expires > now:
+            value = self._read_spill(key)
+            if value is not None:
+                # Promover a memoria
+                self._store(key, value, spilled_expires)
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                    self._record_hit(value)
+                return value
+        elif spilled_expires is not None:
+            self._remove_spill(key)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Cache a successful response."""
+        self._store(key, value, time.time() + self._ttl)
+
+    def _store(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        size = len(json.dumps(value))
+        if size > self._max_bytes:
+            return
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                old_key, (old_expires, old_size, old_value) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self._stats["evictions"] += 1
+                if old_expires > time.time():
+                    evicted.append((old_key, old_expires, old_value))
+        for old_key, old_expires, old_value in evicted:
+            self._spill(old_key, old_expires, old_value)
+
+    def _record_hit(self, value: Dict[str, Any]) -> None:
+        self._stats["hits"] += 1
+        self._stats["saved_duration"] += value.get("metrics", {}).get("total_duration", 0)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self._spill_dir, f"{key}.json")
+
+    def _spill(self, key: str, expires_at: float, value: Dict[str, Any]) -> None:
+        if not self._spill_dir:
+            return
+        try:
+            with open(self._spill_path(key), "w", encoding="utf-8") as f:
+                json.dump(value, f)
+        except OSError as e:
+            print(f"Error spilling cache entry: {e}")
+            return
+        with self._lock:
+            self._spilled[key] = expires_at
+            dropped = []
+            while len(self._spilled) > self._spill_max_entries:
+                dropped.append(self._spilled.popitem(last=False)[0])
+        for old_key in dropped:
+            self._remove_spill(old_key)
+
+    def _read_spill(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._spill_path(key), encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remove_spill(key)
+        return value
+
+    def _remove_spill(self, key: str) -> None:
+        try:
+            os.remove(self._spill_path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            spilled = list(self._spilled)
+            self._spilled.clear()
+            self._bytes = 0
+        for key in spilled:
+            self._remove_spill(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size of the cache."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "spilled_entries": len(self._spilled),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes
+            }
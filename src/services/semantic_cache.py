@@ -0,0 +1,214 @@
+"""Semantic prompt cache backed by embeddings and a NumPy vector index."""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin numpy el cache semantico queda desactivado
+    np = None
+
+
+class _Block:
+    """Growable contiguous matrix of unit vectors with their entry ids."""
+
+    __slots__ = ("vectors", "ids", "size")
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.vectors = np.empty((capacity, dim), dtype=np.float32)
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+
+    def add(self, vector, entry_id: int) -> int:
+        if self.size == len(self.ids):
+            self.vectors = np.concatenate([self.vectors, np.empty_like(self.vectors)])
+            self.ids = np.concatenate([self.ids, np.empty_like(self.ids)])
+        row = self.size
+        self.vectors[row] = vector
+        self.ids[row] = entry_id
+        self.size += 1
+        return row
+
+    def remove(self, row: int) -> Optional[int]:
+        """Remove a row by swapping in the last one; returns the moved id."""
+        last = self.size - 1
+        moved = None
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.ids[row] = self.ids[last]
+            moved = int(self.ids[row])
+        self.size -= 1
+        return moved
+
+    def best(self, query) -> Tuple[float, int]:
+        if self.size == 0:
+            return -1.0, -1
+        scores = self.vectors[:self.size] @ query
+        row = int(np.argmax(scores))
+        return float(scores[row]), int(self.ids[row])
+
+
+class _SemanticIndex:
+    """Cosine-similarity index for one (model, service) partition.
+
+    Starts as a flat matrix; once ``train_size`` vectors exist it is split
+    into ``nlist`` k-means cells (IVF) and a lookup only scans the
+    ``nprobe`` closest cells, keeping search cost far below a full scan.
+    """
+
+    def __init__(self, dim: int, nlist: int, nprobe: int, train_size: int):
+        self.dim = dim
+        self._nlist = nlist
+        self._nprobe = nprobe
+        self._train_size = train_size
+        self._centroids = None
+        self._blocks: List[_Block] = [_Block(dim)]
+        self._positions: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _assign(self, vector) -> int:
+        if self._centroids is None:
+            return 0
+        return int(np.argmax(self._centroids @ vector))
+
+    def add(self, vector, entry_id: int) -> None:
+        block = self._assign(vector)
+        row = self._blocks[block].add(vector, entry_id)
+        self._positions[entry_id] = (block, row)
+        if self._centroids is None and len(self._positions) >= self._train_size:
+            self._train()
+
+    def remove(self, entry_id: int) -> None:
+        position = self._positions.pop(entry_id, None)
+        if position is None:
+            return
+        block, row = position
+        moved = self._blocks[block].remove(row)
+        if moved is not None:
+            self._positions[moved] = (block, row)
+
+    def search(self, query) -> Tuple[float, int]:
+        if self._centroids is None:
+            return self._blocks[0].best(query)
+        centroid_scores = self._centroids @ query
+        nprobe = min(self._nprobe, len(self._blocks))
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        best_score, best_id = -1.0, -1
+        for block in probe:
+            score, entry_id = self._blocks[block].best(query)
+            if score > best_score:
+                best_score, best_id = score, entry_id
+        return best_score, best_id
+
+    def _train(self, iterations: int = 8) -> None:
+        """Spherical k-means over the current vectors, then redistribute them."""
+        flat = self._blocks[0]
+        vectors = flat.vectors[:flat.size].copy()
+        ids = flat.ids[:flat.size].copy()
+        nlist = max(1, min(self._nlist, len(vectors) // 8))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for cell in range(nlist):
+                members = vectors[assignment == cell]
+                if len(members):
+                    center = members.sum(axis=0)
+                    centroids[cell] = center / (np.linalg.norm(center) or 1.0)
+
+        self._centroids = centroids
+        self._blocks = [_Block(self.dim) for _ in range(nlist)]
+        self._positions.clear()
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for vector, entry_id, cell in zip(vectors, ids, assignment):
+            row = self._blocks[cell].add(vector, int(entry_id))
+            self._positions[int(entry_id)] = (int(cell), row)
+
+
+class SemanticCache:
+    """Return stored answers for prompts whose embedding is close enough.
+
+    Entries are partitioned by model, service type and generation options
+    (an answer is never reused for other sampling settings), capped at
+    ``max_entries`` in total and evicted least-recently-used.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 100000,
+                 nlist: int = 512, nprobe: int = 8, train_size: int = 4096):
+        if np is None:
+            raise ImportError("numpy es necesario para el cache semantico")
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._nlist = nlist
+        self._nprobe = nprobe
+        self._train_size = train_size
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, _SemanticIndex] = {}
+        # entry_id -> (partition, response); el orden es el LRU
+        self._entries: "OrderedDict[int, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self._next_id = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _normalize(embedding: List[float]):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    @staticmethod
+    def _partition(model: str, service_type: str, options: Dict[str, Any]) -> str:
+        return f"{model}|{service_type}|{json.dumps(options, sort_keys=True, separators=(',', ':'))}"
+
+    def lookup(self, model: str, service_type: str, options: Dict[str, Any],
+               embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the stored response of the most similar prompt above threshold."""
+        query = self._normalize(embedding)
+        partition = self._partition(model, service_type, options)
+        with self._lock:
+            index = self._indexes.get(partition)
+            if query is None or index is None or index.dim != len(query) or not len(index):
+                self._stats["misses"] += 1
+                return None
+            score, entry_id = index.search(query)
+            if score < self._threshold:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(entry_id)
+            self._stats["hits"] += 1
+            response = self._entries[entry_id][1]
+        return dict(response, similarity=round(score, 4))
+
+    def store(self, model: str, service_type: str, options: Dict[str, Any], embedding: List[float],
+              response: Dict[str, Any]) -> None:
+        """Index a prompt embedding with its response."""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        partition = self._partition(model, service_type, options)
+        with self._lock:
+            index = self._indexes.get(partition)
+            if index is None or index.dim != len(vector):
+                index = _SemanticIndex(len(vector), self._nlist, self._nprobe, self._train_size)
+                self._indexes[partition] = index
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add(vector, entry_id)
+            self._entries[entry_id] = (partition, response)
+            while len(self._entries) > self._max_entries:
+                old_id, (old_partition, _) = self._entries.popitem(last=False)
+                self._indexes[old_partition].remove(old_id)
+                self._stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "threshold": self._threshold
+            }
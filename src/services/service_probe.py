@@ -0,0 +1,88 @@
+"""Concurrent probe engine for Ollama backends."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config.settings import Settings
+
+
+class ServiceProbe:
+    """Probe all backends in parallel using Singleton pattern.
+
+    A single keep-alive session and thread pool are shared by every caller,
+    and each fan-out is bounded by one overall deadline.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self._settings = Settings()
+            self._session = self._create_probe_session()
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(4, len(self._settings.services) * 2),
+                thread_name_prefix="service-probe"
+            )
+            ServiceProbe._initialized = True
+
+    def _create_probe_session(self) -> requests.Session:
+        """Create a pooled session without retries (a probe must fail fast)."""
+        session = requests.Session()
+        adapter = HTTPAdapter(max_retries=0, pool_connections=10, pool_maxsize=20)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def _probe(self, url: str, timeout: float) -> Dict[str, Any]:
+        """Probe a single backend's /api/tags endpoint."""
+        start = time.perf_counter()
+        try:
+            response = self._session.get(f"{url}/api/tags", timeout=timeout)
+            result = {
+                "reachable": True,
+                "status_code": response.status_code,
+                "models": len(response.json().get("models", [])) if response.status_code == 200 else 0
+            }
+        except Exception as e:
+            result = {"reachable": False, "status_code": None, "models": 0, "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    def probe_all(self, services: Optional[Dict[str, str]] = None,
+                  deadline: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Probe every backend concurrently within a single overall deadline."""
+        services = services if services is not None else self._settings.services
+        deadline = deadline if deadline is not None else self._settings.probe_deadline
+
+        futures = {
+            name: self._executor.submit(self._probe, url, deadline)
+            for name, url in services.items()
+        }
+        wait(futures.values(), timeout=deadline)
+
+        results = {}
+        for name, future in futures.items():
+            if future.done():
+                results[name] = future.result()
+            else:
+                # El backend no respondio dentro del deadline global
+                future.cancel()
+                results[name] = {
+                    "reachable": False,
+                    "status_code": None,
+                    "models": 0,
+                    "error": f"Timeout tras {deadline}s",
+                    "latency_ms": round(deadline * 1000, 1)
+                }
+        return results
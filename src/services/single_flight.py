@@ -0,0 +1,237 @@
+"""Single-flight coalescing of identical in-flight generations."""
+
+import asyncio
+import threading
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional
+
+
+class _Flight:
+    """One upstream generation shared by every identical request."""
+
+    __slots__ = ("events", "result", "error", "done", "subscribers", "cond")
+
+    def __init__(self, lock: threading.Lock):
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.subscribers = 1
+        self.cond = threading.Condition(lock)
+
+
+class SingleFlight:
+    """Attach concurrent identical requests to a single upstream call.
+
+    ``do`` coalesces blocking calls: the first caller runs ``fn`` and the
+    rest wait for its result. ``stream`` coalesces generators: a producer
+    thread drives the upstream stream and every subscriber replays the events
+    published so far, then follows new ones as they arrive.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _Flight] = {}
+        self._stats = {"leaders": 0, "followers": 0}
+
+    def do(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Run ``fn`` once for all concurrent callers with the same key."""
+        with self._lock:
+            flight = self._calls.get(key)
+            if flight is not None:
+                self._stats["followers"] += 1
+                while not flight.done:
+                    flight.cond.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return dict(flight.result, coalesced=True)
+            flight = _Flight(self._lock)
+            self._calls[key] = flight
+            self._stats["leaders"] += 1
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                flight.done = True
+                del self._calls[key]
+                flight.cond.notify_all()
+        return dict(flight.result)
+
+    def stream(self, key: str, factory: Callable[[], Iterator[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """Yield the events of one shared upstream stream."""
+        with self._lock:
+            flight = self._streams.get(key)
+            coalesced = flight is not None
+            if coalesced:
+                flight.subscribers += 1
+                self._stats["followers"] += 1
+            else:
+                flight = _Flight(self._lock)
+                self._streams[key] = flight
+                self._stats["leaders"] += 1
+        if not coalesced:
+            threading.Thread(
+                target=self._produce, args=(key, flight, factory), name="single-flight", daemon=True
+            ).start()
+
+        index = 0
+        try:
+            while True:
+                with self._lock:
+                    while index >= len(flight.events) and not flight.done:
+                        flight.cond.wait()
+                    pending = flight.events[index:]
+                    finished = flight.done
+                index += len(pending)
+                for event in pending:
+                    # Copia por suscriptor: el consumidor puede modificar el evento
+                    yield dict(event, coalesced=True) if coalesced else dict(event)
+                if finished and index >= len(flight.events):
+                    return
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+
+    def _produce(self, key: str, flight: _Flight, factory: Callable[[], Iterator[Dict[str, Any]]]) -> None:
+        upstream = factory()
+        try:
+            for event in upstream:
+                with self._lock:
+                    flight.events.append(event)
+                    flight.cond.notify_all()
+                    if flight.subscribers == 0:
+                        # Todos los clientes se desconectaron: cortar la generacion
+                        break
+        except Exception as e:
+            with self._lock:
+                flight.events.append({"type": "error", "success": False, "error": str(e)})
+        finally:
+            upstream.close()
+            with self._lock:
+                flight.done = True
+                # Nuevas peticiones ya no se unen a esta generacion
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Leader/follower counts and coalescing rate."""
+        with self._lock:
+            total = self._stats["leaders"] + self._stats["followers"]
+            return {
+                **self._stats,
+                "in_flight": len(self._calls) + len(self._streams),
+                "coalescing_rate": round(self._stats["followers"] / total, 3) if total else 0.0
+            }
+
+
+class _AsyncFlight:
+    """One upstream stream shared by coroutines on the same event loop."""
+
+    __slots__ = ("events", "done", "subscribers", "changed", "task")
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.subscribers = 1
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class AsyncSingleFlight:
+    """``SingleFlight`` for coroutines: same coalescing, no threads.
+
+    Everything runs on one event loop, so no lock is needed. The shared
+    generation runs in its own task: a leader that disconnects does not
+    cancel it while other subscribers are still attached.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _AsyncFlight] = {}
+        self._stats = {"leaders": 0, "followers": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Await ``fn`` once for all concurrent callers with the same key."""
+        task = self._calls.get(key)
+        if task is not None:
+            self._stats["followers"] += 1
+            return dict(await asyncio.shield(task), coalesced=True)
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        self._stats["leaders"] += 1
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return dict(await asyncio.shield(task))
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Marcar la excepcion como consumida aunque todos los clientes se hayan ido
+            task.exception()
+
+    async def stream(self, key: str,
+                     factory: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the events of one shared upstream stream."""
+        flight = self._streams.get(key)
+        coalesced = flight is not None
+        if coalesced:
+            flight.subscribers += 1
+            self._stats["followers"] += 1
+        else:
+            flight = _AsyncFlight()
+            self._streams[key] = flight
+            self._stats["leaders"] += 1
+            flight.task = asyncio.ensure_future(self._produce(key, flight, factory))
+
+        index = 0
+        try:
+            while True:
+                while index < len(flight.events):
+                    event = flight.events[index]
+                    index += 1
+                    # Copia por suscriptor: el consumidor puede modificar el evento
+                    yield dict(event, coalesced=True) if coalesced else dict(event)
+                if flight.done:
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Todos los clientes se desconectaron: cortar la generacion
+                flight.task.cancel()
+
+    async def _produce(self, key: str, flight: _AsyncFlight,
+                       factory: Callable[[], AsyncIterator[Dict[str, Any]]]) -> None:
+        upstream = factory()
+        try:
+            async for event in upstream:
+                flight.events.append(event)
+                self._notify(flight)
+        except Exception as e:
+            flight.events.append({"type": "error", "success": False, "error": str(e)})
+        finally:
+            await upstream.aclose()
+            flight.done = True
+            # Nuevas peticiones ya no se unen a esta generacion
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            self._notify(flight)
+
+    @staticmethod
+    def _notify(flight: _AsyncFlight) -> None:
+        flight.changed.set()
+        flight.changed = asyncio.Event()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Leader/follower counts and coalescing rate."""
+        total = self._stats["leaders"] + self._stats["followers"]
+        return {
+            **self._stats,
+            "in_flight": len(self._calls) + len(self._streams),
+            "coalescing_rate": round(self._stats["followers"] / total, 3) if total else 0.0
+        }
@@ -0,0 +1,212 @@
+"""Durable chat history backed by SQLite."""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from ..core.interfaces import ChatHistoryInterface
+from ..config.settings import Settings
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    model TEXT,
+    service TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_model ON messages (model, timestamp);
+"""
+
+_COLUMNS = "id, session_id, type, content, model, service, timestamp"
+
+# (id, session_id, type, content, model, service, timestamp)
+Row = Tuple[int, str, str, str, str, str, float]
+
+
+def _row_to_dict(row: Row) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "type": row[2],
+        "content": row[3],
+        "model": row[4],
+        "service": row[5],
+        "session": row[1],
+        "timestamp": datetime.fromtimestamp(row[6]).isoformat()
+    }
+
+
+class SQLiteChatHistory(ChatHistoryInterface):
+    """Persistent chat history in SQLite (WAL mode).
+
+    ``add_message`` only appends to an in-memory pending list; a background
+    writer flushes it in batched transactions, so the chat path never waits on
+    disk. Reads merge pending rows so new messages are visible immediately.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._settings = Settings()
+        self._db_path = db_path or self._settings.history_db_path
+        directory = os.path.dirname(self._db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()        # protege _pending y _next_id
+        self._write_lock = threading.Lock()  # serializa escrituras en disco
+        self._pending: List[Row] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        self._next_id = (conn.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0) + 1
+
+        self._writer = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (WAL allows concurrent readers)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_message(self, message: Dict[str, Any]) -> None:
+        """Queue message for persistence (non-blocking)."""
+        with self._lock:
+            row = (
+                self._next_id,
+                message.get("session", "default"),
+                message.get("type", ""),
+                message.get("content", ""),
+                message.get("model", ""),
+                message.get("service", ""),
+                time.time()
+            )
+            self._next_id += 1
+            self._pending.append(row)
+            if len(self._pending) >= self._settings.history_batch_size:
+                self._wake.set()
+
+    def get_history(self, session_id: str = "default", limit: int = 50,
+                    before: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of a session's history, oldest first.
+
+        ``next_cursor`` is passed back as ``before`` to fetch older messages.
+        """
+        upper = before if before is not None else self._next_id
+        with self._lock:
+            pending = [row for row in self._pending if row[1] == session_id and row[0] < upper]
+
+        rows = self._connection().execute(
+            f"SELECT {_COLUMNS} FROM messages WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (session_id, upper, limit + 1)
+        ).fetchall()
+
+        # Un lote puede estar en disco y aun en pendientes: deduplicar por id
+        merged = {row[0]: row for row in rows}
+        merged.update((row[0], row) for row in pending)
+        page = sorted(merged.values(), key=lambda row: row[0], reverse=True)
+
+        has_more = len(page) > limit
+        page = page[:limit]
+        page.reverse()
+        return {
+            "session_id": session_id,
+            "messages": [_row_to_dict(row) for row in page],
+            "next_cursor": page[0][0] if has_more and page else None
+        }
+
+    def clear_history(self, session_id: Optional[str] = None) -> None:
+        """Clear one session's history, or all of it."""
+        with self._write_lock:
+            with self._lock:
+                if session_id is None:
+                    self._pending.clear()
+                else:
+                    self._pending = [row for row in self._pending if row[1] != session_id]
+            conn = self._connection()
+            with conn:
+                if session_id is None:
+                    conn.execute("DELETE FROM messages")
+                else:
+                    conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def export_history(self, session_id: Optional[str] = None, model: Optional[str] = None,
+                       since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Stream messages in insertion order without loading them all in memory."""
+        self.flush()
+        clauses, params = [], []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        cursor = self._connection().execute(f"SELECT {_COLUMNS} FROM messages {where} ORDER BY id", params)
+        while True:
+            rows = cursor.fetchmany(500)
+            if not rows:
+                break
+            for row in rows:
+                yield _row_to_dict(row)
+
+    def flush(self) -> None:
+        """Write every pending message to disk now."""
+        while self._write_batch():
+            pass
+
+    def _write_batch(self) -> int:
+        """Persist up to one batch of pending rows; returns rows written."""
+        with self._write_lock:
+            with self._lock:
+                batch = self._pending[:self._settings.history_batch_size]
+            if not batch:
+                return 0
+            conn = self._connection()
+            with conn:
+                conn.executemany(f"INSERT OR REPLACE INTO messages ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            with self._lock:
+                # Solo este hilo quita filas del frente de _pending
+                del self._pending[:len(batch)]
+            return len(batch)
+
+    def _writer_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self._settings.history_flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing chat history: {e}")
+
+    def close(self) -> None:
+        """Stop the writer and flush what is left."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._writer.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing chat history: {e}")
@@ -0,0 +1,184 @@
+"""Background sampler of system and process metrics."""
+
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Any, List, Optional
+
+import psutil
+
+
+class _Series:
+    """Fixed-size ring buffer of float samples."""
+
+    __slots__ = ("values", "index", "count")
+
+    def __init__(self, size: int):
+        self.values = array("d", bytes(8 * size))
+        self.index = 0
+        self.count = 0
+
+    def push(self, value: float) -> None:
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.count = min(self.count + 1, len(self.values))
+
+    def last(self, n: int) -> List[float]:
+        """The ``n`` most recent samples (fewer if not yet collected)."""
+        n = min(n, self.count)
+        start = (self.index - n) % len(self.values)
+        if start + n <= len(self.values):
+            return self.values[start:start + n].tolist()
+        return self.values[start:].tolist() + self.values[:self.index].tolist()
+
+    def summary(self, n: int) -> Dict[str, float]:
+        samples = sorted(self.last(n))
+        if not samples:
+            return {"min": 0.0, "avg": 0.0, "p95": 0.0, "samples": 0}
+        return {
+            "min": round(samples[0], 2),
+            "avg": round(sum(samples) / len(samples), 2),
+            "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+            "samples": len(samples)
+        }
+
+
+class SystemMetricsSampler:
+    """Sample CPU, memory, disk and process metrics on a fixed interval.
+
+    Samples go into per-metric ring buffers sized for the largest window.
+    After every sample the thread rebuilds the snapshot (latest values plus
+    min/avg/p95 per window), so readers only copy a reference.
+    """
+
+    SERIES = ("cpu_percent", "memory_percent", "memory_used", "disk_percent",
+              "app_cpu_percent", "app_rss", "ollama_cpu_percent", "ollama_rss")
+
+    # Cada cuantas muestras se vuelven a buscar los procesos de Ollama
+    PROCESS_RESCAN = 30
+
+    def __init__(self, interval: float = 2.0, windows: Optional[Dict[str, float]] = None,
+                 disk_path: str = "/"):
+        self._interval = interval
+        self._windows = windows or {"1m": 60, "5m": 300, "15m": 900}
+        self._disk_path = disk_path
+        size = max(1, int(max(self._windows.values()) / interval))
+        self._series = {name: _Series(size) for name in self.SERIES}
+        self._process = psutil.Process(os.getpid())
+        self._ollama_processes: List[psutil.Process] = []
+        self._samples = 0
+        self._static = {
+            "physical_cores": psutil.cpu_count(logical=False),
+            "logical_cores": psutil.cpu_count(logical=True)
+        }
+        self._snapshot: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Take a first sample and keep sampling in the background."""
+        if self._thread is not None:
+            return
+        # La primera llamada a cpu_percent(None) solo fija la referencia
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+        try:
+            self._sample()
+        except Exception as e:
+            # Sin primera muestra el hilo lo vuelve a intentar; no debe tumbar el arranque
+            print(f"Error sampling system metrics: {e}")
+        self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self._sample()
+            except Exception as e:
+                print(f"Error sampling system metrics: {e}")
+
+    def _find_ollama_processes(self) -> List[psutil.Process]:
+        found = []
+        for process in psutil.process_iter(["name"]):
+            if (process.info.get("name") or "").startswith("ollama"):
+                try:
+                    process.cpu_percent(interval=None)
+                except psutil.Error:
+                    # Termino o no hay permisos entre process_iter y la lectura
+                    continue
+                found.append(process)
+        return found
+
+    def _process_totals(self):
+        cpu, rss, alive = 0.0, 0, []
+        for process in self._ollama_processes:
+            try:
+                cpu += process.cpu_percent(interval=None)
+                rss += process.memory_info().rss
+                alive.append(process)
+            except psutil.Error:
+                continue
+        self._ollama_processes = alive
+        return cpu, rss
+
+    def _sample(self) -> None:
+        if self._samples % self.PROCESS_RESCAN == 0:
+            self._ollama_processes = self._find_ollama_processes()
+        self._samples += 1
+
+        cpu = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self._disk_path)
+        freq = psutil.cpu_freq()
+        app_cpu = self._process.cpu_percent(interval=None)
+        app_rss = self._process.memory_info().rss
+        ollama_cpu, ollama_rss = self._process_totals()
+        disk_percent = (disk.used / disk.total) * 100 if disk.total else 0.0
+
+        for name, value in (("cpu_percent", cpu), ("memory_percent", memory.percent),
+                            ("memory_used", memory.used), ("disk_percent", disk_percent),
+                            ("app_cpu_percent", app_cpu), ("app_rss", app_rss),
+                            ("ollama_cpu_percent", ollama_cpu), ("ollama_rss", ollama_rss)):
+            self._series[name].push(float(value))
+
+        windows = {}
+        for label, seconds in self._windows.items():
+            n = max(1, int(seconds / self._interval))
+            windows[label] = {name: series.summary(n) for name, series in self._series.items()}
+
+        # Mismo formato que antes para la interfaz web + ventanas y procesos
+        self._snapshot = {
+            "cpu": {
+                **self._static,
+                "cpu_usage": f"{cpu:.1f}%",
+                "cpu_freq": f"{freq.current:.0f} MHz" if freq else "N/A"
+            },
+            "memory": {
+                "total": f"{memory.total / (1024**3):.1f} GB",
+                "available": f"{memory.available / (1024**3):.1f} GB",
+                "used": f"{memory.used / (1024**3):.1f} GB",
+                "percentage": f"{memory.percent:.1f}%"
+            },
+            "disk": {
+                "total": f"{disk.total / (1024**3):.1f} GB",
+                "free": f"{disk.free / (1024**3):.1f} GB",
+                "used": f"{disk.used / (1024**3):.1f} GB",
+                "percentage": f"{disk_percent:.1f}%"
+            },
+            "processes": {
+                "app": {"cpu_percent": round(app_cpu, 1), "rss_mb": round(app_rss / (1024**2), 1)},
+                "ollama": {"cpu_percent": round(ollama_cpu, 1), "rss_mb": round(ollama_rss / (1024**2), 1),
+                           "count": len(self._ollama_processes)}
+            },
+            "windows": windows,
+            "sampled_at": time.time(),
+            "interval": self._interval
+        }
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Latest sample and window summaries (no blocking calls)."""
+        return self._snapshot
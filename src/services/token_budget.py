@@ -0,0 +1,158 @@
+"""Prompt token estimation and per-request ``num_ctx`` sizing."""
+
+import math
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+# (prefijo de familia, caracteres por token, tokens de plantilla) - el primero que coincide gana
+_FAMILIES = (
+    ("codellama", 3.0, 24),
+    ("llama3", 3.6, 32),
+    ("llama", 3.2, 24),
+    ("qwen", 3.4, 24),
+    ("mistral", 3.3, 16),
+    ("mixtral", 3.3, 16),
+    ("gemma", 3.8, 16),
+    ("phi", 3.2, 16),
+    ("deepseek", 3.4, 24),
+)
+_DEFAULT_FAMILY = ("default", 3.0, 32)
+
+_SAFETY_MARGIN = 1.1            # Mientras la estimacion es aproximada, mejor pasarse que quedarse corto
+_UNBOUNDED_PREDICT_RESERVE = 512  # num_predict -1/-2 no dice cuanto se generara
+_LEARN_MIN_CHARS = 200          # Prompts cortos: la plantilla domina y la muestra no sirve
+_LEARN_ALPHA = 0.2
+_CHARS_PER_TOKEN_RANGE = (1.0, 8.0)  # Fuera de esto el prompt venia de la cache de Ollama
+
+
+class ContextBudgetError(Exception):
+    """The request does not fit in the model's context window (maps to HTTP 413)."""
+
+    status_code = 413
+
+
+class TokenBudget:
+    """Estimate prompt tokens and pick the ``num_ctx`` bucket for each request.
+
+    The estimate is characters / chars-per-token of the model family, then
+    corrected per model with the ``prompt_eval_count`` Ollama reports. The
+    conversation ``context`` is already a list of token ids, so it counts
+    exactly. Requests get the smallest bucket that holds prompt, context and
+    ``num_predict``; a model keeps its larger bucket for
+    ``shrink_after`` seconds so alternating sizes do not reload it.
+    """
+
+    def __init__(self, buckets: List[int], max_ctx: int, model_max_ctx: Optional[Dict[str, int]] = None,
+                 shrink_after: float = 300):
+        self._buckets = sorted(set(buckets))
+        self._max_ctx = max_ctx
+        self._model_max_ctx = model_max_ctx or {}
+        self._shrink_after = shrink_after
+        self._lock = threading.Lock()
+        # modelo -> [caracteres por token aprendidos, muestras]
+        self._learned: Dict[str, List[float]] = {}
+        # modelo -> [bucket activo, ultima vez que hizo falta]
+        self._active: Dict[str, List[float]] = {}
+        self._rejected = 0
+
+    @staticmethod
+    def _family(model: str) -> Tuple[str, float, int]:
+        name = model.lower()
+        for family in _FAMILIES:
+            if name.startswith(family[0]):
+                return family
+        return _DEFAULT_FAMILY
+
+    def max_ctx_for(self, model: str) -> int:
+        return self._model_max_ctx.get(model, self._max_ctx)
+
+    def estimate(self, model: str, text: str) -> int:
+        """Approximate token count of a prompt, including the chat template."""
+        _, chars_per_token, template_tokens = self._family(model)
+        learned = self._learned.get(model)
+        if learned:
+            chars_per_token = learned[0]
+        return math.ceil(len(text) / chars_per_token * _SAFETY_MARGIN) + template_tokens
+
+    @staticmethod
+    def _reserve(options: Dict[str, Any]) -> int:
+        num_predict = options.get("num_predict", _UNBOUNDED_PREDICT_RESERVE)
+        return num_predict if num_predict > 0 else _UNBOUNDED_PREDICT_RESERVE
+
+    def required(self, payload: Dict[str, Any]) -> int:
+        """Tokens a generation needs: prompt + previous context + response."""
+        return (self.estimate(payload["model"], payload["prompt"])
+                + len(payload.get("context") or [])
+                + self._reserve(payload["options"]))
+
+    def fit(self, payload: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> int:
+        """Make the request fit its context window or raise ``ContextBudgetError``.
+
+        The limit is the caller's ``num_ctx`` if given, else the model maximum.
+        A conversation that outgrew it keeps only its most recent context
+        tokens, as Ollama itself would; a prompt that cannot fit on its own
+        is rejected. Returns the tokens required.
+        """
+        model = payload["model"]
+        limit = (options or {}).get("num_ctx") or self.max_ctx_for(model)
+        own = self.estimate(model, payload["prompt"]) + self._reserve(payload["options"])
+        if own > limit:
+            with self._lock:
+                self._rejected += 1
+            raise ContextBudgetError(
+                f"El mensaje necesita unos {own} tokens y {model} admite como maximo {limit}"
+            )
+        context = payload.get("context")
+        if context and own + len(context) > limit:
+            payload["context"] = context[len(context) - (limit - own):] if limit > own else []
+        return own + len(payload.get("context") or [])
+
+    def num_ctx_for(self, model: str, required: int) -> int:
+        """Smallest bucket that holds ``required`` tokens, sticky per model."""
+        max_ctx = self.max_ctx_for(model)
+        bucket = next((b for b in self._buckets if required <= b <= max_ctx), max_ctx)
+        now = time.monotonic()
+        with self._lock:
+            active = self._active.get(model)
+            if active is not None and active[0] >= bucket and now - active[1] < self._shrink_after:
+                # El modelo ya esta cargado con un contexto suficiente: no recargar
+                if active[0] == bucket:
+                    active[1] = now
+                return int(active[0])
+            self._active[model] = [bucket, now]
+        return bucket
+
+    def learn(self, model: str, prompt: str, prompt_eval_count: int, has_context: bool) -> None:
+        """Correct the model's chars-per-token from Ollama's exact prompt count."""
+        if has_context or len(prompt) < _LEARN_MIN_CHARS:
+            # Con context, prompt_eval_count incluye tokens que no estan en el prompt
+            return
+        tokens = prompt_eval_count - self._family(model)[2]
+        if tokens <= 0:
+            return
+        sample = len(prompt) / tokens
+        if not _CHARS_PER_TOKEN_RANGE[0] <= sample <= _CHARS_PER_TOKEN_RANGE[1]:
+            return
+        with self._lock:
+            learned = self._learned.get(model)
+            if learned is None:
+                self._learned[model] = [sample, 1]
+            else:
+                learned[0] += _LEARN_ALPHA * (sample - learned[0])
+                learned[1] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Learned ratios, active buckets and rejections."""
+        with self._lock:
+            models = {}
+            for model in set(self._learned) | set(self._active):
+                learned = self._learned.get(model)
+                active = self._active.get(model)
+                models[model] = {
+                    "chars_per_token": round(learned[0], 3) if learned else None,
+                    "samples": int(learned[1]) if learned else 0,
+                    "num_ctx": int(active[0]) if active else None
+                }
+            return {"buckets": list(self._buckets), "max_ctx": self._max_ctx,
+                    "rejected": self._rejected, "models": models}
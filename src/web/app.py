@@ -1,34 +1,78 @@
 """Flask web application with dependency injection."""
 
-from flask import Flask, render_template, request, jsonify
+import json
+import time
+from typing import Optional
+
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 from ..core.chat_controller import ChatController
 from ..services.ollama_service import OllamaService
 from ..services.model_repository import ModelRepository
 from ..services.chat_history import ChatHistory
+from ..services.sqlite_chat_history import SQLiteChatHistory
 from ..services.technical_stats import TechnicalStatsService
 from ..services.docker_commands import DockerCommandsService
+from ..services.conversation_memory import ConversationMemory
+from ..services.metrics import ServingMetrics
+from ..config.settings import Settings
 
 
-def create_app() -> Flask:
-    """Factory function to create Flask app with dependencies."""
-    app = Flask(__name__)
-    CORS(app)
-    
+def build_controller(ollama_service: Optional[OllamaService] = None) -> ChatController:
+    """Create the services and wire them into a chat controller."""
     # Dependency injection
-    ollama_service = OllamaService()
+    ollama_service = ollama_service or OllamaService()
+    ollama_service.start_background_tasks()
     model_repository = ModelRepository(ollama_service)
-    chat_history = ChatHistory()
+    if Settings().history_backend == "sqlite":
+        chat_history = SQLiteChatHistory()
+    else:
+        chat_history = ChatHistory()
     technical_stats = TechnicalStatsService()
+    technical_stats.start_background_tasks()
     docker_commands = DockerCommandsService()
-    controller = ChatController(
+    docker_commands.start_background_tasks()
+    conversation_memory = ConversationMemory()
+    return ChatController(
         ollama_service, 
         model_repository, 
         chat_history,
         technical_stats,
-        docker_commands
+        docker_commands,
+        conversation_memory
     )
+
+
+def create_app(controller: Optional[ChatController] = None) -> Flask:
+    """Factory function to create Flask app with dependencies."""
+    app = Flask(__name__)
+    CORS(app)
+    
+    controller = controller or build_controller()
+    
+    metrics = ServingMetrics()
+    
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+    
+    @app.after_request
+    def _record_request(response):
+        # Ruta (no URL) como etiqueta para acotar la cardinalidad
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        method, status, start = request.method, response.status_code, g.request_start
+        # Las respuestas en streaming terminan al cerrarse, no al devolverse
+        response.call_on_close(
+            lambda: metrics.observe_http(endpoint, method, status, time.perf_counter() - start)
+        )
+        return response
+    
+    def _admission_rejected(result):
+        """Reply 429/503 with Retry-After when a backend queue rejects a request."""
+        response = jsonify({"success": False, "error": result["error"], "retry_after": result["retry_after"]})
+        response.headers['Retry-After'] = str(result["retry_after"])
+        return response, result.get("status_code", 429)
     
     @app.route('/')
     def index():
@@ -50,13 +94,87 @@ def create_app() -> Flask:
         message = data.get('message', '')
         model = data.get('model', '')
         service_type = data.get('service_type', 'general')
+        session_id = data.get('session_id', 'default')
+        options = data.get('options')
         
         if not message or not model:
             return jsonify({"success": False, "error": "Mensaje y modelo requeridos"}), 400
         
-        response = controller.send_message(message, model, service_type)
+        response = controller.send_message(message, model, service_type, session_id, options)
+        if "retry_after" in response:
+            return _admission_rejected(response)
+        if "status_code" in response:
+            return jsonify(response), response["status_code"]
         return jsonify(response)
     
+    @app.route('/api/chat/stream', methods=['POST'])
+    def chat_stream():
+        data = request.get_json()
+        message = data.get('message', '')
+        model = data.get('model', '')
+        service_type = data.get('service_type', 'general')
+        session_id = data.get('session_id', 'default')
+        options = data.get('options')
+        
+        if not message or not model:
+            return jsonify({"success": False, "error": "Mensaje y modelo requeridos"}), 400
+        
+        events = controller.send_message_stream(message, model, service_type, session_id, options)
+        # El primer evento es "admitted" o el rechazo de la cola del backend
+        first_event = next(events)
+        if "retry_after" in first_event:
+            return _admission_rejected(first_event)
+        if "status_code" in first_event:
+            return jsonify(first_event), first_event["status_code"]
+        
+        def _events():
+            yield f"data: {json.dumps(first_event)}\n\n"
+            for event in events:
+                yield f"data: {json.dumps(event)}\n\n"
+        
+        return Response(
+            stream_with_context(_events()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    @app.route('/api/batch', methods=['POST'])
+    def batch():
+        # Cuerpo JSONL (uno por linea); model, service_type y options son los valores por defecto
+        options = request.args.get('options')
+        try:
+            options = json.loads(options) if options else None
+        except ValueError:
+            return jsonify({"success": False, "error": "options debe ser un objeto JSON"}), 400
+        # El cuerpo se lee aqui, en el hilo de la peticion: los hilos del lote no tocan el stream WSGI
+        limit = Settings().batch_max_body_bytes
+        body = bytearray()
+        while len(body) <= limit:
+            chunk = request.stream.read(min(64 * 1024, limit + 1 - len(body)))
+            if not chunk:
+                break
+            body += chunk
+        if len(body) > limit:
+            return jsonify({"success": False, "error": f"El lote supera {limit} bytes; dividirlo en partes"}), 413
+        lines = bytes(body).splitlines()
+        results = controller.run_batch(
+            lines, request.args.get('model'), request.args.get('service_type', 'general'), options
+        )
+        
+        def _lines():
+            try:
+                for result in results:
+                    yield json.dumps(result, ensure_ascii=False) + "\n"
+            finally:
+                # Cliente desconectado: dejar de leer prompts
+                results.close()
+        
+        return Response(
+            stream_with_context(_lines()),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
     @app.route('/api/download', methods=['POST'])
     def download_model():
         data = request.get_json()
@@ -69,26 +187,115 @@ def create_app() -> Flask:
         response = controller.download_model(model_name, service_type)
         return jsonify(response)
     
+    @app.route('/api/downloads')
+    def downloads():
+        return jsonify(controller.get_downloads())
+    
+    @app.route('/api/downloads/<job_id>')
+    def download_status(job_id):
+        job = controller.get_download(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": "Descarga no encontrada"}), 404
+        return jsonify(job)
+    
+    @app.route('/api/downloads/<job_id>/events')
+    def download_events(job_id):
+        if controller.get_download(job_id) is None:
+            return jsonify({"success": False, "error": "Descarga no encontrada"}), 404
+        
+        def _events():
+            for job in controller.watch_download(job_id):
+                yield f"data: {json.dumps(job)}\n\n"
+        
+        return Response(
+            stream_with_context(_events()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    
     @app.route('/api/status')
     def status():
         status_data = controller.get_service_status()
         return jsonify(status_data)
     
+    @app.route('/api/backends')
+    def backends():
+        return jsonify(controller.get_backend_pools())
+    
+    @app.route('/api/cache-stats')
+    def cache_stats():
+        return jsonify(controller.get_cache_stats())
+    
+    @app.route('/api/model-residency')
+    def model_residency():
+        return jsonify(controller.get_model_residency())
+    
+    @app.route('/api/placement')
+    def placement():
+        return jsonify(controller.get_placement(request.args.get('model', '')))
+    
+    @app.route('/api/autotune', methods=['GET', 'POST'])
+    def autotune():
+        if request.method == 'GET':
+            return jsonify(controller.get_autotune_status())
+        data = request.get_json() or {}
+        model = data.get('model', '')
+        if not model:
+            return jsonify({"success": False, "error": "Modelo requerido"}), 400
+        return jsonify(controller.start_autotune(model, data.get('service_type', 'general')))
+    
     @app.route('/api/history')
     def history():
-        history_data = controller.get_chat_history()
+        session_id = request.args.get('session_id', 'default')
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        before = request.args.get('before', type=int)
+        history_data = controller.get_chat_history(session_id, limit, before)
         return jsonify(history_data)
     
+    @app.route('/api/history/export')
+    def export_history():
+        rows = controller.export_chat_history(
+            request.args.get('session_id'),
+            request.args.get('model'),
+            request.args.get('since', type=float)
+        )
+        
+        def _lines():
+            for row in rows:
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        
+        return Response(
+            stream_with_context(_lines()),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': 'attachment; filename=chat_history.jsonl'}
+        )
+    
     @app.route('/api/clear-history', methods=['POST'])
     def clear_history():
-        controller.clear_chat_history()
+        data = request.get_json(silent=True) or {}
+        controller.clear_chat_history(data.get('session_id'))
         return jsonify({"success": True, "message": "Historial eliminado"})
     
+    @app.route('/api/new-conversation', methods=['POST'])
+    def new_conversation():
+        data = request.get_json(silent=True) or {}
+        controller.reset_conversation(data.get('session_id', 'default'))
+        return jsonify({"success": True, "message": "Nueva conversación iniciada"})
+    
     @app.route('/api/technical-stats')
     def technical_stats():
         stats = controller.get_technical_stats()
         return jsonify(stats)
     
+    @app.route('/api/technical-stats/events')
+    def technical_events():
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        return jsonify(controller.get_log_events(limit, request.args.get('category')))
+    
     @app.route('/api/docker/start', methods=['POST'])
     def start_docker():
         result = controller.start_docker_services()
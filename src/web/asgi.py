@@ -0,0 +1,118 @@
+"""ASGI application for the async serving mode.
+
+``/api/chat`` and ``/api/chat/stream`` run on the event loop; every other
+route is the Flask app, served through a small thread pool.
+"""
+
+import json
+import time
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from ..services.async_ollama_service import AsyncOllamaService
+from ..services.metrics import ServingMetrics
+from ..config.settings import Settings
+from .app import build_controller, create_app
+
+
+def create_asgi_app() -> Starlette:
+    """Factory function to create the ASGI app with dependencies."""
+    settings = Settings()
+    ollama_service = AsyncOllamaService()
+    controller = build_controller(ollama_service)
+    flask_app = create_app(controller)
+    metrics = ServingMetrics()
+
+    def _admission_rejected(result, endpoint: str, start: float) -> JSONResponse:
+        """Reply 429/503 with Retry-After when a backend queue rejects a request."""
+        status = result.get("status_code", 429)
+        metrics.observe_http(endpoint, "POST", status, time.perf_counter() - start)
+        return JSONResponse(
+            {"success": False, "error": result["error"], "retry_after": result["retry_after"]},
+            status_code=status,
+            headers={"Retry-After": str(result["retry_after"])}
+        )
+
+    def _reply(data, endpoint: str, start: float, status: int = 200) -> JSONResponse:
+        metrics.observe_http(endpoint, "POST", status, time.perf_counter() - start)
+        return JSONResponse(data, status_code=status)
+
+    async def _read_chat_request(request: Request):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        return (
+            data.get('message', ''),
+            data.get('model', ''),
+            data.get('service_type', 'general'),
+            data.get('session_id', 'default'),
+            data.get('options')
+        )
+
+    async def chat(request: Request):
+        start = time.perf_counter()
+        message, model, service_type, session_id, options = await _read_chat_request(request)
+        if not message or not model:
+            return _reply({"success": False, "error": "Mensaje y modelo requeridos"}, "/api/chat", start, 400)
+
+        response = await controller.asend_message(message, model, service_type, session_id, options)
+        if "retry_after" in response:
+            return _admission_rejected(response, "/api/chat", start)
+        return _reply(response, "/api/chat", start, response.get("status_code", 200))
+
+    async def chat_stream(request: Request):
+        start = time.perf_counter()
+        endpoint = "/api/chat/stream"
+        message, model, service_type, session_id, options = await _read_chat_request(request)
+        if not message or not model:
+            return _reply({"success": False, "error": "Mensaje y modelo requeridos"}, endpoint, start, 400)
+
+        events = controller.asend_message_stream(message, model, service_type, session_id, options)
+        # El primer evento es "admitted" o el rechazo de la cola del backend
+        first_event = await events.__anext__()
+        if "retry_after" in first_event:
+            await events.aclose()
+            return _admission_rejected(first_event, endpoint, start)
+        if "status_code" in first_event:
+            await events.aclose()
+            return _reply(first_event, endpoint, start, first_event["status_code"])
+
+        async def _events():
+            try:
+                yield f"data: {json.dumps(first_event)}\n\n"
+                async for event in events:
+                    yield f"data: {json.dumps(event)}\n\n"
+            finally:
+                # Si el cliente se desconecta, cerrar el stream libera el slot del backend
+                await events.aclose()
+                metrics.observe_http(endpoint, "POST", 200, time.perf_counter() - start)
+
+        return StreamingResponse(
+            _events(),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await ollama_service.aclose()
+
+    return Starlette(
+        routes=[
+            Route('/api/chat', chat, methods=['POST']),
+            Route('/api/chat/stream', chat_stream, methods=['POST']),
+            # El resto de rutas (estado, historial, descargas, stats...) sigue siendo Flask
+            Mount('/', app=WSGIMiddleware(flask_app, workers=settings.async_wsgi_workers))
+        ],
+        middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+        lifespan=lifespan
+    )
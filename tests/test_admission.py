@@ -0,0 +1,140 @@
+"""AdmissionLimiter: FIFO handoff, queue limits and the timeout/grant race."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import admission
+from src.services.admission import AdmissionLimiter, QueueFullError, QueueTimeoutError
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def _queue_waiter(limiter, name, order, acquire=None):
+    """Start a thread that queues on the limiter and records when it gets a slot."""
+    depth = limiter.snapshot()["queue_depth"] + limiter.snapshot()["background_waiting"]
+    thread = threading.Thread(target=lambda: ((acquire or limiter.acquire)(), order.append(name)), daemon=True)
+    thread.start()
+    # Esperar a que este en la cola para fijar el orden de llegada
+    _wait_until(lambda: limiter.snapshot()["queue_depth"] + limiter.snapshot()["background_waiting"] > depth)
+    return thread
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=4)
+    limiter.acquire()
+    order = []
+    threads = [_queue_waiter(limiter, name, order) for name in ("a", "b", "c")]
+
+    for expected in (["a"], ["a", "b"], ["a", "b", "c"]):
+        limiter.release()
+        _wait_until(lambda: len(order) == len(expected))
+        assert order == expected
+        # El slot pasa directo al siguiente: nunca queda libre para un recien llegado
+        assert limiter.snapshot()["active"] == 1
+        assert not limiter.has_free_slot
+
+    limiter.release()
+    for thread in threads:
+        thread.join(1)
+    assert limiter.snapshot()["active"] == 0
+
+
+def test_full_queue_is_rejected_with_429_and_retry_after():
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=1)
+    limiter.acquire()
+    order = []
+    waiter = _queue_waiter(limiter, "queued", order)
+
+    with pytest.raises(QueueFullError) as rejected:
+        limiter.acquire()
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    assert limiter.snapshot()["rejected"] == 1
+
+    limiter.release()
+    waiter.join(1)
+    assert order == ["queued"]
+
+
+def test_queue_full_reaches_the_client_as_429_with_retry_after_header():
+    from src.web.app import create_app
+
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=0)
+    limiter.acquire()
+
+    class _Controller:
+        def send_message(self, message, model, service_type, session_id, options):
+            try:
+                limiter.acquire()
+            except QueueFullError as e:
+                return {"success": False, "error": str(e), "status_code": e.status_code,
+                        "retry_after": e.retry_after}
+            return {"success": True}
+
+    client = create_app(_Controller()).test_client()
+    response = client.post("/api/chat", json={"message": "hola", "model": "m"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["retry_after"] == int(response.headers["Retry-After"])
+
+
+def test_waiter_times_out_and_leaves_the_queue():
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=2, queue_timeout=0.05)
+    limiter.acquire()
+
+    with pytest.raises(QueueTimeoutError) as timed_out:
+        limiter.acquire()
+    assert timed_out.value.status_code == 503
+    snapshot = limiter.snapshot()
+    assert snapshot["queue_depth"] == 0 and snapshot["timed_out"] == 1
+
+    # Nadie espera: el slot vuelve a quedar libre
+    limiter.release()
+    assert limiter.snapshot()["active"] == 0
+
+
+def test_waiter_granted_as_its_timeout_expires_keeps_the_slot(monkeypatch):
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=2, queue_timeout=0.05)
+    limiter.acquire()
+
+    class _GrantedAtTimeout(threading.Event):
+        def wait(self, timeout=None):
+            # release() entrega el slot justo cuando vence la espera
+            limiter.release()
+            return False
+
+    monkeypatch.setattr(admission, "threading", SimpleNamespace(Event=_GrantedAtTimeout))
+    waited = limiter.acquire()
+
+    assert waited >= 0
+    snapshot = limiter.snapshot()
+    assert snapshot["active"] == 1 and snapshot["timed_out"] == 0 and snapshot["queue_depth"] == 0
+    limiter.release()
+    assert limiter.snapshot()["active"] == 0
+
+
+def test_background_waits_behind_interactive_requests():
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=2)
+    limiter.acquire()
+    order = []
+    threads = [
+        _queue_waiter(limiter, "batch", order, acquire=limiter.acquire_background),
+        _queue_waiter(limiter, "chat", order)
+    ]
+
+    limiter.release()
+    _wait_until(lambda: order == ["chat"])
+    limiter.release()
+    _wait_until(lambda: order == ["chat", "batch"])
+    limiter.release()
+    for thread in threads:
+        thread.join(1)
+    assert limiter.snapshot()["active"] == 0
@@ -0,0 +1,170 @@
+"""CircuitBreaker state machine, driven with explicit timestamps."""
+
+import pytest
+
+from src.services.backend_health import CircuitBreaker, CircuitOpenError
+from src.services.backend_pool import BackendPool
+
+
+def _breaker(**overrides):
+    config = dict(window_seconds=60, min_samples=10, error_threshold=0.5,
+                  consecutive_failures=3, open_seconds=5, max_open_seconds=20)
+    config.update(overrides)
+    return CircuitBreaker(**config)
+
+
+def test_closed_open_half_open_closed_with_a_single_trial():
+    breaker = _breaker()
+    for now in (0, 1):
+        assert breaker.acquire(now) == 0
+        breaker.record(False, now)
+    assert breaker.state(1) == CircuitBreaker.CLOSED
+
+    breaker.record(False, 2)
+    assert breaker.state(2) == CircuitBreaker.OPEN
+    assert breaker.acquire(3) is None
+    assert breaker.retry_after(3) == 4
+
+    # Pasado el enfriamiento: una sola peticion de prueba
+    assert breaker.state(7) == CircuitBreaker.HALF_OPEN
+    assert breaker.acquire(7) == 1
+    assert breaker.acquire(7) is None
+    assert not breaker.available(8)
+
+    breaker.record(True, 8)
+    assert breaker.state(8) == CircuitBreaker.CLOSED
+    assert [breaker.acquire(8) for _ in range(3)] == [0, 0, 0]
+    assert breaker.snapshot(8)["samples"] == 0
+
+
+def test_failed_trial_reopens_with_a_longer_cooldown():
+    breaker = _breaker(consecutive_failures=1)
+    breaker.record(False, 0)
+    assert breaker.state(4) == CircuitBreaker.OPEN
+
+    assert breaker.acquire(5)
+    breaker.record(False, 5)
+    assert breaker.state(5) == CircuitBreaker.OPEN
+    assert breaker.retry_after(5) == 10
+    assert breaker.state(14) == CircuitBreaker.OPEN
+    assert breaker.state(15) == CircuitBreaker.HALF_OPEN
+
+    # El enfriamiento se duplica hasta el maximo
+    assert breaker.acquire(15)
+    breaker.record(False, 15)
+    assert breaker.acquire(35)
+    breaker.record(False, 35)
+    assert breaker.retry_after(35) == 20
+
+
+def test_abandoned_trial_lets_the_next_request_try():
+    breaker = _breaker(consecutive_failures=1)
+    breaker.record(False, 0)
+    trial = breaker.acquire(5)
+    assert breaker.acquire(5) is None
+
+    breaker.release(trial)
+    assert breaker.acquire(5) == trial + 1
+    assert breaker.acquire(5) is None
+
+
+def test_only_the_trial_holder_can_release_it():
+    breaker = _breaker(consecutive_failures=1)
+    ordinary = breaker.acquire(0)
+    breaker.record(False, 0)
+    stale = breaker.acquire(5)
+    breaker.record(False, 6)
+    assert breaker.acquire(16) == stale + 1
+
+    # Una peticion de antes del corte o una prueba vieja no liberan la prueba en curso
+    breaker.release(ordinary)
+    breaker.release(stale)
+    assert breaker.acquire(16) is None
+
+
+def test_error_rate_trips_only_with_enough_samples():
+    breaker = _breaker(consecutive_failures=100, min_samples=4)
+    breaker.record(True, 0)
+    breaker.record(False, 1)
+    assert breaker.state(1) == CircuitBreaker.CLOSED
+    breaker.record(True, 2)
+    breaker.record(False, 3)
+    assert breaker.state(3) == CircuitBreaker.OPEN
+
+    # Los resultados fuera de la ventana no cuentan
+    breaker = _breaker(consecutive_failures=100, min_samples=4, window_seconds=10)
+    for now in (0, 1, 2):
+        breaker.record(False, now)
+    assert breaker.state(2) == CircuitBreaker.CLOSED
+    breaker.record(True, 20)
+    breaker.record(False, 21)
+    assert breaker.state(21) == CircuitBreaker.CLOSED
+
+
+class _ClockedHealth:
+    """``BackendHealth`` stand-in: one breaker per URL on a manual clock."""
+
+    def __init__(self, **config):
+        self.now = 0.0
+        self._config = config
+        self._breakers = {}
+
+    def _breaker(self, url):
+        return self._breakers.setdefault(url, _breaker(**self._config))
+
+    def available(self, url):
+        return self._breaker(url).available(self.now)
+
+    def acquire(self, url):
+        return self._breaker(url).acquire(self.now)
+
+    def release(self, url, trial):
+        self._breaker(url).release(trial)
+
+    def record(self, url, ok):
+        self._breaker(url).record(ok, self.now)
+
+    def retry_after(self, url):
+        return self._breaker(url).retry_after(self.now)
+
+
+class _Cancelled(BaseException):
+    """Leaves a lease without a verdict, like a client disconnect."""
+
+
+def test_cancelled_closed_lease_does_not_free_the_half_open_trial():
+    health = _ClockedHealth(consecutive_failures=1)
+    pool = BackendPool("general", [{"url": "http://a"}], max_parallel=4, health=health)
+
+    with pytest.raises(_Cancelled):
+        with pool.lease():
+            # Mientras esta peticion larga corre, el backend falla y pasa a half-open
+            health.record("http://a", False)
+            health.now = 5
+            trial = pool.lease()
+            assert trial.__enter__().trial == 1
+            raise _Cancelled()
+
+    with pytest.raises(CircuitOpenError):
+        with pool.lease():
+            pass
+
+    trial.__exit__(None, None, None)
+    assert health.available("http://a")
+    assert health._breaker("http://a").state(health.now) == CircuitBreaker.CLOSED
+
+
+def test_cancelled_trial_lease_lets_the_next_request_try():
+    health = _ClockedHealth(consecutive_failures=1)
+    pool = BackendPool("general", [{"url": "http://a"}], health=health)
+    health.record("http://a", False)
+    health.now = 5
+
+    with pytest.raises(_Cancelled):
+        with pool.lease() as lease:
+            assert lease.trial == 1
+            raise _Cancelled()
+
+    with pool.lease() as lease:
+        assert lease.trial == 2
+    assert health._breaker("http://a").state(health.now) == CircuitBreaker.CLOSED
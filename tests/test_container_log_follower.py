@@ -0,0 +1,86 @@
+"""parse_line on real Ollama log lines, and the follower's latest facts and events."""
+
+from src.services.container_log_follower import ContainerLogFollower, parse_line
+
+_INFERENCE_COMPUTE = ('time=2024-11-02T10:00:00.000Z level=INFO source=types.go:123 msg="inference compute" '
+                      'id=GPU-1 library=cuda variant=v12 compute=8.9 driver=12.4 name="NVIDIA GeForce RTX 4070" '
+                      'total="11.7 GiB" available="10.9 GiB"')
+_OFFLOAD = ('time=2024-11-02T10:00:01.000Z level=INFO source=memory.go:326 msg="offload to cuda" '
+            'layers.requested=-1 layers.model=29 layers.offload=29 memory.available="[10.9 GiB]" '
+            'memory.required.full="2.8 GiB" '
+            'memory.required.kv="224.0 MiB" memory.required.allocations="[2.8 GiB]" '
+            'memory.weights.total="1.9 GiB" memory.graph.full="256.0 MiB"')
+
+
+def test_prompt_eval_time_is_not_also_eval_time():
+    facts = parse_line("llama_print_timings: prompt eval time =     120.50 ms /    12 tokens "
+                       "(   10.04 ms per token,    99.59 tokens per second)")
+    assert facts == {"performance": {"prompt_eval_time": "120.50 ms", "tokens_per_second": "99.59"}}
+
+    facts = parse_line("llama_print_timings:        eval time =    800.00 ms /    40 runs   "
+                       "(   20.00 ms per token,    50.00 tokens per second)")
+    assert facts == {"performance": {"eval_time": "800.00 ms", "tokens_per_second": "50.00"}}
+
+
+def test_prompt_eval_count_is_not_also_eval_count():
+    assert parse_line("prompt eval count: 12") == {"performance": {"prompt_tokens": "12"}}
+    assert parse_line("eval count: 40") == {"performance": {"generated_tokens": "40"}}
+
+
+def test_general_name_takes_the_rest_of_the_line():
+    line = "llama_model_loader: - kv   2:                               general.name str              = Llama 3.2 3B Instruct\n"
+    assert parse_line(line) == {"model": {"name": "Llama 3.2 3B Instruct"}}
+    line = "llama_model_loader: - kv   0:                       general.architecture str              = llama"
+    assert parse_line(line) == {"model": {"architecture": "llama"}}
+
+
+def test_head_count_kv_is_not_the_head_count():
+    line = "llama_model_loader: - kv   9:                 llama.attention.head_count u32              = 24"
+    assert parse_line(line) == {"model": {"attention_heads": "24"}}
+    line = "llama_model_loader: - kv  10:              llama.attention.head_count_kv u32              = 8"
+    assert parse_line(line) == {}
+
+
+def test_several_facts_on_one_line():
+    facts = parse_line(_INFERENCE_COMPUTE)
+    assert facts == {"gpu": {"driver_version": "12.4", "total_memory": "11.7 GiB", "available_memory": "10.9 GiB"}}
+
+    facts = parse_line(_OFFLOAD)
+    assert facts == {"memory": {
+        "gpu_memory_required": "2.8 GiB",
+        "kv_memory": "224.0 MiB",
+        "gpu_memory_allocated": "2.8 GiB",
+        "weights_total": "1.9 GiB",
+        "graph_memory": "256.0 MiB"
+    }}
+
+    facts = parse_line("ggml_cuda_init: found 1 CUDA devices:\n  Device 0: NVIDIA GeForce RTX 4070, "
+                       "compute capability 8.9, VMM: yes")
+    assert facts == {"gpu": {"name": "NVIDIA GeForce RTX 4070", "compute_capability": "8.9"}}
+    assert parse_line("llm_load_tensors: offloaded 29/29 layers to GPU") == {"memory": {"layers_offloaded": "29/29"}}
+
+
+def test_access_logs_and_unknown_lines_have_no_facts():
+    assert parse_line('[GIN] 2024/11/02 - 10:00:00 | 200 | 1.2s | 172.17.0.1 | POST "/api/generate" '
+                      'eval time = 1.0 ms') == {}
+    assert parse_line("time=2024-11-02T10:00:00.000Z level=INFO msg=\"starting llama server\"") == {}
+
+
+def test_follower_keeps_latest_values_and_events():
+    follower = ContainerLogFollower("ollama", max_events=2)
+    for line in (_INFERENCE_COMPUTE, "nada que ver", _OFFLOAD,
+                 "llama_print_timings:        eval time =    800.00 ms /    40 runs"):
+        follower.feed(line)
+
+    latest = follower.latest()
+    assert latest["gpu"]["total_memory"] == "11.7 GiB"
+    assert latest["memory"]["weights_total"] == "1.9 GiB"
+    assert latest["performance"] == {"eval_time": "800.00 ms"}
+    assert latest["model"] == {}
+
+    # Buffer acotado, mas nuevos primero
+    events = follower.events()
+    assert [list(event["facts"]) for event in events] == [["performance"], ["memory"]]
+    assert follower.events(category="gpu") == []
+    status = follower.get_status()
+    assert status["lines"] == 4 and status["events"] == 2 and status["error"] is None
@@ -0,0 +1,76 @@
+"""HedgeRace winner/loser decisions and the HedgePolicy delay and budget."""
+
+from src.services.hedging import HEDGE, PRIMARY, HedgePolicy, HedgeRace
+
+_TOKEN = {"type": "token", "content": "x"}
+
+
+def test_first_token_wins_and_cancels_the_other_copy():
+    race = HedgeRace()
+    assert race.feed(PRIMARY, {"type": "admitted", "backend": "http://a"}) == (True, None)
+    race.start_hedge()
+    # El admitted de la copia no llega al cliente
+    assert race.feed(HEDGE, {"type": "admitted", "backend": "http://b"}) == (False, None)
+
+    assert race.feed(HEDGE, _TOKEN) == (True, PRIMARY)
+    assert race.winner == HEDGE and race.primary_backend == "http://a"
+    # El perdedor ya no reenvia nada
+    assert race.feed(PRIMARY, _TOKEN) == (False, None)
+    assert race.feed(HEDGE, {"type": "done"}) == (True, None)
+
+    race.feed(PRIMARY, None)
+    assert not race.finished
+    race.feed(HEDGE, None)
+    assert race.finished
+
+
+def test_primary_win_without_a_hedge_cancels_nothing():
+    race = HedgeRace()
+    assert race.feed(PRIMARY, _TOKEN) == (True, None)
+    assert race.winner == PRIMARY and not race.hedged
+
+
+def test_error_of_one_copy_is_hidden_while_the_other_runs():
+    race = HedgeRace()
+    race.start_hedge()
+    assert race.feed(PRIMARY, {"type": "error", "error": "500"}) == (False, None)
+    assert race.winner is None and race.active == {HEDGE}
+
+    assert race.feed(HEDGE, _TOKEN) == (True, None)
+    assert race.winner == HEDGE
+
+
+def test_error_of_the_last_copy_reaches_the_client():
+    race = HedgeRace()
+    race.start_hedge()
+    race.feed(HEDGE, {"type": "error", "error": "timeout"})
+    assert race.feed(PRIMARY, {"type": "error", "error": "500"}) == (True, None)
+    assert race.winner == PRIMARY
+
+
+def test_finished_loser_is_not_cancelled():
+    race = HedgeRace()
+    race.start_hedge()
+    race.feed(PRIMARY, None)
+    assert race.feed(HEDGE, _TOKEN) == (True, None)
+
+
+def test_delay_is_the_ttft_percentile_once_enough_samples():
+    policy = HedgePolicy(percentile=90, min_samples=10, default_delay=2.0, min_delay=0.05)
+    for ms in range(1, 10):
+        policy.observe_ttft("m", ms / 10)
+    assert policy.delay("m") == 2.0
+
+    policy.observe_ttft("m", 1.0)
+    assert policy.delay("m") == 0.9
+    assert policy.delay("otro") == 2.0
+
+
+def test_budget_caps_the_hedge_rate():
+    policy = HedgePolicy(budget=0.1, window=1000)
+    allowed = 0
+    for _ in range(100):
+        policy.begin()
+        allowed += policy.allow()
+    assert 9 <= allowed <= 10
+    assert policy.get_stats()["hedge_rate"] <= 0.1
@@ -0,0 +1,91 @@
+"""ResponseCache: TTL, LRU eviction and disk spill."""
+
+import json
+import os
+import time
+
+from src.services.response_cache import ResponseCache
+
+
+def _value(name):
+    return {"success": True, "response": name * 100, "metrics": {"total_duration": 10}}
+
+
+# Caben dos entradas en memoria
+_MAX_BYTES = 2 * len(json.dumps(_value("a"))) + 10
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl=0.05)
+    cache.put("a", _value("a"))
+    assert cache.get("a") == _value("a")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    stats = cache.get_stats()
+    assert stats["entries"] == 0 and stats["bytes"] == 0 and stats["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_bytes=_MAX_BYTES)
+    cache.put("a", _value("a"))
+    cache.put("b", _value("b"))
+    cache.get("a")
+    cache.put("c", _value("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == _value("a") and cache.get("c") == _value("c")
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_stats()["bytes"] <= _MAX_BYTES
+
+
+def test_oversized_values_are_not_cached():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", _value("a"))
+    assert cache.get("a") is None
+
+
+def test_evicted_entries_spill_to_disk_and_come_back(tmp_path):
+    cache = ResponseCache(max_bytes=_MAX_BYTES, spill_dir=str(tmp_path))
+    for name in "abc":
+        cache.put(name, _value(name))
+    assert os.listdir(tmp_path) == ["a.json"]
+
+    # Acierto en disco: vuelve a memoria y desplaza al menos usado
+    assert cache.get("a") == _value("a")
+    assert os.listdir(tmp_path) == ["b.json"]
+    stats = cache.get_stats()
+    assert stats["disk_hits"] == 1 and stats["hits"] == 1
+    assert stats["entries"] == 2 and stats["spilled_entries"] == 1
+
+
+def test_expired_spilled_entries_are_dropped(tmp_path):
+    cache = ResponseCache(max_bytes=_MAX_BYTES, ttl=0.2, spill_dir=str(tmp_path))
+    for name in "abc":
+        cache.put(name, _value(name))
+    time.sleep(0.25)
+    assert cache.get("a") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_spill_keeps_at_most_spill_max_entries(tmp_path):
+    cache = ResponseCache(max_bytes=_MAX_BYTES, spill_dir=str(tmp_path), spill_max_entries=2)
+    for name in "abcde":
+        cache.put(name, _value(name))
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json"]
+    assert cache.get("a") is None
+
+
+def test_clear_removes_spilled_files(tmp_path):
+    cache = ResponseCache(max_bytes=_MAX_BYTES, spill_dir=str(tmp_path))
+    for name in "abc":
+        cache.put(name, _value(name))
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+    assert cache.get("c") is None
+
+
+def test_only_deterministic_options_are_cacheable():
+    assert ResponseCache.is_cacheable({"temperature": 0})
+    assert ResponseCache.is_cacheable({"temperature": 0.8, "seed": 42})
+    assert not ResponseCache.is_cacheable({})
+    assert not ResponseCache.is_cacheable({"temperature": 0.7})
@@ -0,0 +1,111 @@
+"""SemanticCache: threshold, option partitions, LRU across partitions and the IVF index."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.semantic_cache import SemanticCache  # noqa: E402
+
+_GREEDY = {"temperature": 0, "num_predict": 128}
+
+
+def _response(name):
+    return {"success": True, "response": name, "model": "m"}
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return list(vector / np.linalg.norm(vector))
+
+
+def test_similar_prompt_hits_and_distant_one_misses():
+    cache = SemanticCache(threshold=0.95)
+    cache.store("m", "general", _GREEDY, [1.0, 0.0, 0.0], _response("a"))
+
+    hit = cache.lookup("m", "general", _GREEDY, [0.99, 0.05, 0.0])
+    assert hit["response"] == "a" and hit["similarity"] >= 0.95
+    assert cache.lookup("m", "general", _GREEDY, _unit(1, 1, 0)) is None
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+
+def test_answers_are_not_reused_across_options_models_or_services():
+    cache = SemanticCache(threshold=0.9)
+    cache.store("m", "general", _GREEDY, [1.0, 0.0], _response("a"))
+
+    assert cache.lookup("m", "general", {"temperature": 0, "num_predict": 16}, [1.0, 0.0]) is None
+    assert cache.lookup("otro", "general", _GREEDY, [1.0, 0.0]) is None
+    assert cache.lookup("m", "code", _GREEDY, [1.0, 0.0]) is None
+    # El orden de las claves no cambia la particion
+    assert cache.lookup("m", "general", {"num_predict": 128, "temperature": 0}, [1.0, 0.0])["response"] == "a"
+
+
+def test_bad_vectors_are_ignored():
+    cache = SemanticCache(threshold=0.9)
+    cache.store("m", "general", _GREEDY, [0.0, 0.0], _response("cero"))
+    assert cache.get_stats()["entries"] == 0
+    cache.store("m", "general", _GREEDY, [1.0, 0.0], _response("a"))
+    assert cache.lookup("m", "general", _GREEDY, [1.0, 0.0, 0.0]) is None
+    assert cache.lookup("m", "general", _GREEDY, [0.0, 0.0]) is None
+
+
+def test_least_recently_used_entry_is_evicted_across_partitions():
+    cache = SemanticCache(threshold=0.9, max_entries=2)
+    cache.store("m", "general", _GREEDY, [1.0, 0.0], _response("a"))
+    cache.store("m", "code", _GREEDY, [0.0, 1.0], _response("b"))
+    assert cache.lookup("m", "general", _GREEDY, [1.0, 0.0])["response"] == "a"
+
+    cache.store("m", "general", _GREEDY, [0.0, 1.0], _response("c"))
+    assert cache.lookup("m", "code", _GREEDY, [0.0, 1.0]) is None
+    assert cache.lookup("m", "general", _GREEDY, [1.0, 0.0])["response"] == "a"
+    assert cache.lookup("m", "general", _GREEDY, [0.0, 1.0])["response"] == "c"
+    assert cache.get_stats()["evictions"] == 1 and cache.get_stats()["entries"] == 2
+
+
+def test_eviction_keeps_the_remaining_rows_addressable():
+    cache = SemanticCache(threshold=0.99, max_entries=3)
+    vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], _unit(1, 1, 1)]
+    for number, vector in enumerate(vectors):
+        cache.store("m", "general", _GREEDY, vector, _response(str(number)))
+
+    # La fila 0 se borro moviendo la ultima a su lugar: cada vector sigue dando su respuesta
+    assert cache.lookup("m", "general", _GREEDY, vectors[0]) is None
+    for number, vector in enumerate(vectors[1:], start=1):
+        assert cache.lookup("m", "general", _GREEDY, vector)["response"] == str(number)
+
+
+def _clustered(rng, count, dim=32, clusters=8, spread=0.3):
+    centers = rng.normal(size=(clusters, dim))
+    points = centers[rng.integers(clusters, size=count)] + spread * rng.normal(size=(count, dim))
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def test_ivf_index_finds_stored_prompts_after_training():
+    rng = np.random.default_rng(7)
+    vectors = _clustered(rng, 300)
+    cache = SemanticCache(threshold=0.98, nlist=8, nprobe=2, train_size=64)
+    for number, vector in enumerate(vectors):
+        cache.store("m", "general", _GREEDY, list(vector), _response(str(number)))
+
+    (index,) = cache._indexes.values()
+    assert index._centroids is not None and len(index._blocks) == 8
+
+    # Los vectores de antes y de despues del entrenamiento se encuentran sondeando solo 2 celdas
+    found = 0
+    for number, vector in enumerate(vectors):
+        query = vector + 0.01 * rng.normal(size=vector.shape)
+        hit = cache.lookup("m", "general", _GREEDY, list(query))
+        found += hit is not None and hit["response"] == str(number)
+    assert found == len(vectors)
+
+
+def test_ivf_index_evicts_from_its_cells():
+    rng = np.random.default_rng(11)
+    vectors = _clustered(rng, 200)
+    cache = SemanticCache(threshold=0.98, max_entries=150, nlist=8, nprobe=2, train_size=64)
+    for number, vector in enumerate(vectors):
+        cache.store("m", "general", _GREEDY, list(vector), _response(str(number)))
+
+    assert cache.get_stats()["entries"] == 150
+    assert all(cache.lookup("m", "general", _GREEDY, list(v)) is None for v in vectors[:50])
+    assert all(cache.lookup("m", "general", _GREEDY, list(v))["response"] == str(number)
+               for number, v in enumerate(vectors[50:], start=50))
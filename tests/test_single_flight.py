@@ -0,0 +1,129 @@
+"""SingleFlight: a failing leader with followers attached."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class _UpstreamError(Exception):
+    pass
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_leader_error_reaches_every_follower():
+    flight = SingleFlight()
+    followers_in = threading.Event()
+    calls = []
+
+    def _failing():
+        calls.append(1)
+        followers_in.wait(2)
+        raise _UpstreamError("backend caido")
+
+    errors = []
+
+    def _call():
+        try:
+            flight.do("k", _failing)
+        except _UpstreamError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_call, daemon=True) for _ in range(3)]
+    threads[0].start()
+    _wait_until(lambda: flight.get_stats()["leaders"] == 1)
+    for thread in threads[1:]:
+        thread.start()
+    _wait_until(lambda: flight.get_stats()["followers"] == 2)
+    followers_in.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+    # El fallo no queda guardado: la siguiente peticion vuelve a generar
+    assert flight.get_stats()["in_flight"] == 0
+    assert flight.do("k", lambda: {"success": True}) == {"success": True}
+
+
+def test_stream_leader_error_is_replayed_to_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def _factory():
+        yield {"type": "token", "content": "a"}
+        release.wait(2)
+        raise _UpstreamError("se corto")
+
+    leader = flight.stream("k", _factory)
+    assert next(leader)["content"] == "a"
+    follower = flight.stream("k", _factory)
+    assert next(follower) == {"type": "token", "content": "a", "coalesced": True}
+    release.set()
+
+    for events in (list(leader), list(follower)):
+        assert events[-1]["type"] == "error" and events[-1]["error"] == "se corto"
+    assert flight.get_stats() == {"leaders": 1, "followers": 1, "in_flight": 0, "coalescing_rate": 0.5}
+
+
+def test_async_leader_error_reaches_every_follower():
+    async def _ok():
+        return {"success": True}
+
+    async def _scenario():
+        flight = AsyncSingleFlight()
+        started = asyncio.Event()
+        release = asyncio.Event()
+        calls = []
+
+        async def _failing():
+            calls.append(1)
+            started.set()
+            await release.wait()
+            raise _UpstreamError("backend caido")
+
+        leader = asyncio.ensure_future(flight.do("k", _failing))
+        await started.wait()
+        followers = [asyncio.ensure_future(flight.do("k", _failing)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(leader, *followers, return_exceptions=True)
+
+        assert len(calls) == 1
+        assert all(isinstance(result, _UpstreamError) for result in results)
+        assert flight.get_stats()["in_flight"] == 0
+        assert await flight.do("k", _ok) == {"success": True}
+
+    asyncio.run(_scenario())
+
+
+def test_async_leader_disconnect_does_not_cancel_followers():
+    async def _scenario():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def _slow():
+            await release.wait()
+            return {"success": True}
+
+        leader = asyncio.ensure_future(flight.do("k", _slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", _slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+
+        assert await follower == {"success": True, "coalesced": True}
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(_scenario())
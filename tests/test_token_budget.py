@@ -0,0 +1,54 @@
+"""TokenBudget.fit: context trimming and rejection."""
+
+import pytest
+
+from src.services.token_budget import ContextBudgetError, TokenBudget
+
+_PROMPT = "a" * 360
+_PROMPT_TOKENS = TokenBudget([], 0).estimate("llama3.2:3b", _PROMPT)
+
+
+def _payload(context=None, num_predict=100, model="llama3.2:3b"):
+    return {"model": model, "prompt": _PROMPT, "options": {"num_predict": num_predict}, "context": context}
+
+
+def test_request_that_fits_is_left_alone():
+    budget = TokenBudget([2048, 4096], max_ctx=4096)
+    payload = _payload(context=list(range(1000)))
+    assert budget.fit(payload) == _PROMPT_TOKENS + 100 + 1000
+    assert payload["context"] == list(range(1000))
+
+
+def test_long_conversation_keeps_its_most_recent_context():
+    budget = TokenBudget([2048], max_ctx=2048)
+    payload = _payload(context=list(range(5000)))
+    assert budget.fit(payload) == 2048
+    own = _PROMPT_TOKENS + 100
+    assert payload["context"] == list(range(5000 - (2048 - own), 5000))
+
+
+def test_prompt_that_cannot_fit_is_rejected_with_413():
+    budget = TokenBudget([2048], max_ctx=2048, model_max_ctx={"llama3.2:3b": 200})
+    with pytest.raises(ContextBudgetError) as rejected:
+        budget.fit(_payload())
+    assert rejected.value.status_code == 413
+    assert budget.get_stats()["rejected"] == 1
+
+
+def test_caller_num_ctx_is_the_limit():
+    budget = TokenBudget([2048], max_ctx=8192)
+    payload = _payload(context=list(range(1000)))
+    assert budget.fit(payload, {"num_ctx": 512}) == 512
+    assert len(payload["context"]) == 512 - _PROMPT_TOKENS - 100
+
+
+def test_context_is_dropped_when_the_prompt_fills_the_window():
+    budget = TokenBudget([2048], max_ctx=8192)
+    payload = _payload(context=[1, 2, 3])
+    assert budget.fit(payload, {"num_ctx": _PROMPT_TOKENS + 100}) == _PROMPT_TOKENS + 100
+    assert payload["context"] == []
+
+
+def test_unbounded_num_predict_reserves_a_fixed_amount():
+    budget = TokenBudget([2048], max_ctx=8192)
+    assert budget.fit(_payload(num_predict=-1)) == _PROMPT_TOKENS + 512